@@ -1,9 +1,12 @@
 import os
 import asyncio
 import dataclasses
+import time
 
-from langchain_core.messages import AnyMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
 from langgraph.prebuilt.chat_agent_executor import AgentState
 from langchain_openai import ChatOpenAI
 
@@ -18,16 +21,40 @@ from tools import (
     calculator,
     load_file_or_url,
     web_search_tool,
+    search_archive,
+    page_archive,
     run_python,
     get_browser_tools,
     semantic_tools,
     unzip,
+    load_zip_member,
+    query_table,
+    prefetcher,
+    workspace,
+    memoize_tools,
+    tool_cache,
+    tracer,
 )
+from tools.tables import TABULAR_EXTENSIONS
+from debug import MetricsCallbackHandler, TraceCallbackHandler
 from utils import format_messages
 
 
 DEBUG = True
 
+TABULAR_FILE_EXTENSIONS = tuple(f".{extension}" for extension in TABULAR_EXTENSIONS)
+
+# Tools whose identical calls are run again: they have side effects, or depend on the
+# state of the browser or of the page archive
+UNCACHED_TOOLS = {
+    "run_python",
+    "navigate_browser",
+    "extract_markdown",
+    "search_archive",
+}
+# Time to live of the results of identical calls, for the tools whose results change
+TOOL_CACHE_TTL_S = {"web_search": 600}
+
 BASE_PROMPT_OLD = """
 You are an expert multi-tool reasoning agent.
 
@@ -101,47 +128,82 @@ class AgentResponse:
     final_answer: str
     num_steps: int
     tools_used: list[str]
+    prefetch_stats: dict = dataclasses.field(default_factory=dict)
+    tool_cache_stats: dict = dataclasses.field(default_factory=dict)
+    archive_stats: dict = dataclasses.field(default_factory=dict)
+    # Latency and tokens of the LLM calls, latency of the tool calls (QuestionMetrics)
+    metrics: dict = dataclasses.field(default_factory=dict)
+    # Tool calls, with their arguments and observations, in the order of tools_used
+    trajectory: list[dict] = dataclasses.field(default_factory=list)
 
 
 class Agent:
-    def __init__(self, debug=False):
+    def __init__(
+        self,
+        debug=False,
+        chat_model: BaseChatModel | None = None,
+        tools: list[BaseTool] | None = None,
+    ):
+        """Build the agent.
+
+        Args:
+            debug (bool, optional): Whether to print the messages of each question.
+            chat_model (BaseChatModel | None, optional): The chat model, e.g. a fake
+                model for offline benchmarks. Defaults to OpenAI o3.
+            tools (list[BaseTool] | None, optional): The tools. Defaults to the tools
+                of the agent.
+        """
         self.debug = debug
         # Add callbacks to the LLM if debug is enabled
         self.callbacks = None
         # if self.debug:
         #     self.callbacks = [PromptLoggingHandler()]
 
-        # Use OpenAI 4o
-        chat_model = ChatOpenAI(
-            model_name="o3",
-            # model_name="o4-mini",
-            callbacks=self.callbacks,
-            api_key=os.getenv("OPENAI_KEY"),
-        )
+        if chat_model is None:
+            chat_model = ChatOpenAI(
+                model_name="o3",
+                # model_name="o4-mini",
+                callbacks=self.callbacks,
+                api_key=os.getenv("OPENAI_KEY"),
+            )
 
-        tools = [
-            analyze_audio,
-            analyze_image,
-            chess,
-            convert_unit,
-            get_video_transcript,
-            load_file_or_url,
-            calculator,
-            run_python,
-            web_search_tool,
-            *get_browser_tools(use_async_browser=True),
-            *semantic_tools,
-            unzip,
-        ]
+        if tools is None:
+            tools = [
+                analyze_audio,
+                analyze_image,
+                chess,
+                convert_unit,
+                get_video_transcript,
+                load_file_or_url,
+                calculator,
+                run_python,
+                search_archive,
+                web_search_tool,
+                *get_browser_tools(),
+                *semantic_tools,
+                unzip,
+                load_zip_member,
+                query_table,
+            ]
+        # Identical tool calls within a question reuse the previous result
+        tools = memoize_tools(tools, exclude=UNCACHED_TOOLS, ttl_s=TOOL_CACHE_TTL_S)
 
         def prompt(state: AgentState, config: RunnableConfig) -> list[AnyMessage]:
+            start_time = time.perf_counter()
             # Build the scratchpad from the messages
             scratchpad = format_messages(state["messages"])
 
             if state["file_path"]:
                 if state["file_path"].endswith(".zip"):
                     scratchpad = (
-                        f"Provided zip file: {state['file_path']}\nUse the unzip tool to process it.\n\n"
+                        f"Provided zip file: {state['file_path']}\n"
+                        "Use the unzip tool to list its files, and load_zip_member to read them.\n\n"
+                        + scratchpad
+                    )
+                elif state["file_path"].lower().endswith(TABULAR_FILE_EXTENSIONS):
+                    scratchpad = (
+                        f"Provided file: {state['file_path']}\n"
+                        "Use the query_table tool to run SQL queries on it.\n\n"
                         + scratchpad
                     )
                 else:
@@ -152,6 +214,9 @@ class Agent:
                 messages=scratchpad,
             )
 
+            metrics = config.get("configurable", {}).get("metrics")
+            if metrics is not None:
+                metrics.add_prompt_time(time.perf_counter() - start_time)
             return system_prompt
 
         self.agent = create_react_agent(
@@ -183,7 +248,38 @@ class Agent:
         except RuntimeError:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(self.agent.ainvoke(invoke_kwargs))
+        metrics = MetricsCallbackHandler()
+        config = {"callbacks": [metrics], "configurable": {"metrics": metrics}}
+        if tracer.enabled:
+            config["callbacks"].append(TraceCallbackHandler())
+        workspace.begin_question()
+        try:
+            response = loop.run_until_complete(
+                self.agent.ainvoke(invoke_kwargs, config=config)
+            )
+        finally:
+            # Cancel the prefetches that were not used for this question
+            prefetch_stats = prefetcher.reset()
+            tool_cache_stats = tool_cache.reset()
+            archive_stats = page_archive.reset()
+            workspace.end_question()
+        if self.debug and prefetch_stats.scheduled:
+            print(
+                f"Prefetch: {prefetch_stats.used}/{prefetch_stats.scheduled} pages used, "
+                f"{prefetch_stats.failed} failed, "
+                f"{prefetch_stats.latency_saved_s:.2f}s saved"
+            )
+        if self.debug and tool_cache_stats.hits:
+            print(
+                f"Tool cache: {tool_cache_stats.hits}/{tool_cache_stats.calls} "
+                f"identical calls reused {tool_cache_stats.hits_by_tool}"
+            )
+        if self.debug and archive_stats.lookups + archive_stats.searches:
+            print(
+                f"Page archive: {archive_stats.hits}/{archive_stats.lookups} pages "
+                f"served, {archive_stats.searches_with_results}/"
+                f"{archive_stats.searches} searches with results"
+            )
 
         if self.debug:
             print("\n=== ALL MESSAGES ===")
@@ -201,20 +297,40 @@ class Agent:
 
         step_count = 0
         tool_steps = []
+        trajectory = []
+        observations = {
+            msg.tool_call_id: msg.content
+            for msg in response["messages"]
+            if isinstance(msg, ToolMessage)
+        }
         for msg in response["messages"]:
-            if msg["role"] == "assistant":
+            if isinstance(msg, AIMessage):
                 step_count += 1
-            if msg.tool_calls:
                 for tool_call in msg.tool_calls:
                     tool_name = tool_call.get("name", "")
                     kwargs = tool_call.get("args", {})
                     pretty_kwargs = ",".join([f"{k}={v}" for k, v in kwargs.items()])
                     tool_steps.append(f"<{tool_name}>[{pretty_kwargs}]")
+                    observation = observations.get(tool_call.get("id"))
+                    trajectory.append(
+                        {
+                            "tool": tool_name,
+                            "arguments": kwargs,
+                            "observation": None
+                            if observation is None
+                            else str(observation),
+                        }
+                    )
 
         return AgentResponse(
             final_answer=final_answer,
             num_steps=step_count,
             tools_used=tool_steps,
+            prefetch_stats=dataclasses.asdict(prefetch_stats),
+            tool_cache_stats=dataclasses.asdict(tool_cache_stats),
+            archive_stats=dataclasses.asdict(archive_stats),
+            metrics=dataclasses.asdict(metrics.metrics),
+            trajectory=trajectory,
         )
 
 
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the agent and its tools.
+
+Each benchmark is a script, run from the root of the repository with:
+
+python -m benchmarks.<name> --help
+"""
@@ -0,0 +1,286 @@
+"""Measure the overhead of the agent framework, with a scripted fake chat model.
+
+To use it:
+
+python -m benchmarks.agent_overhead [--questions 20] [--runs 3] [--tolerance 0.5]
+    [--update-baseline]
+
+The agent is built with a chat model replaying a scripted trajectory, and with fake
+tools returning generated observations of a given size, so that no time is spent on
+the network: what is measured is the time of the framework itself (prompt building,
+message formatting, graph dispatch, tool invocation, answer extraction).
+
+Each scenario is a trajectory with a number of tool calls and a size of observations.
+For each of them, the script reports, for the best of the runs:
+- the overhead per step (LLM call), and the part of it spent building the prompt,
+- the throughput in questions per second,
+- the growth of the memory allocated by Python per question, once warm, measured in
+  a separate pass with tracemalloc, which would otherwise slow down the timings.
+
+The measures are compared with benchmarks/agent_overhead_baseline.json, and the
+script exits with an error when a scenario is slower, or leaks more memory, than the
+baseline by more than the tolerance. The baseline depends on the machine: update it
+with --update-baseline after an intended change.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool, tool
+
+from .fixtures import sentence
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "agent_overhead_baseline.json")
+
+# Tool calls per question, and characters per observation. The graph of the agent
+# stops after 25 steps, i.e. 11 tool calls and the answer.
+SCENARIOS = [(3, 2_000), (6, 5_000), (11, 5_000), (6, 50_000)]
+
+# Questions run before measuring, to import and build everything lazily built
+WARMUP_QUESTIONS = 2
+
+# Differences smaller than these are measurement noise, whatever the tolerance
+MIN_REGRESSION_MS = 0.5
+MIN_GROWTH_KB = 50
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model calling the fake tools a given number of times, then answering.
+
+    The calls alternate between a search and the reading of a result, as in the
+    trajectories of the agent. The token usage is estimated from the prompt size.
+    """
+
+    nb_steps: int
+    step: int = 0
+    call_ids: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs) -> "ScriptedChatModel":
+        return self
+
+    def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+        if self.call_ids is None:
+            self.call_ids = itertools.count()
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        if self.step < self.nb_steps:
+            if self.step % 2 == 0:
+                call = {"name": "search_fixture", "args": {"query": f"q{self.step}"}}
+            else:
+                call = {
+                    "name": "read_fixture",
+                    "args": {"url": f"https://example.com/{self.step}"},
+                }
+            message = AIMessage(
+                content="", tool_calls=[{**call, "id": f"call_{next(self.call_ids)}"}]
+            )
+            self.step += 1
+        else:
+            message = AIMessage(content="FINAL ANSWER: 42")
+            self.step = 0
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": 20,
+            "total_tokens": prompt_chars // 4 + 20,
+        }
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(
+            generations=[ChatGeneration(message=self._next_message(messages))]
+        )
+
+    async def _agenerate(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        # Answer on the event loop, as a chat model with a native async client does
+        return self._generate(messages, stop, **kwargs)
+
+
+def fixture_tools(observation_chars: int) -> list[BaseTool]:
+    """Build tools returning generated observations of about the given size."""
+    rng = random.Random(0)
+    text = ""
+    while len(text) < observation_chars:
+        text += sentence(rng) + " "
+    text = text[:observation_chars]
+    result_chars = observation_chars // 5
+
+    @tool
+    def search_fixture(query: str) -> list[dict]:
+        """Search the fixtures.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            list[dict]: The url, title and content of 5 results.
+        """
+        return [
+            {
+                "url": f"https://example.com/{query}/{rank}",
+                "title": f"Result {rank} for {query}",
+                "content": text[rank * result_chars : (rank + 1) * result_chars],
+            }
+            for rank in range(5)
+        ]
+
+    @tool
+    def read_fixture(url: str) -> str:
+        """Read a fixture page.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            str: The content of the page.
+        """
+        return f"URL: {url}\n{text}"
+
+    return [search_fixture, read_fixture]
+
+
+def run_scenario(
+    nb_steps: int, observation_chars: int, nb_questions: int, nb_runs: int
+) -> dict[str, float]:
+    """Run questions with a trajectory of nb_steps tool calls, nb_runs times.
+
+    Returns:
+        dict[str, float]: The overhead per step in ms, the part of it spent building
+            the prompt, the questions per second and the memory growth per question.
+    """
+    from agent import Agent
+
+    agent = Agent(
+        chat_model=ScriptedChatModel(nb_steps=nb_steps),
+        tools=fixture_tools(observation_chars),
+    )
+    for _ in range(WARMUP_QUESTIONS):
+        agent("What is the answer?")
+
+    duration_s = prompt_s = float("inf")
+    for _ in range(nb_runs):
+        gc.collect()
+        run_prompt_s = 0.0
+        start_time = time.perf_counter()
+        for _ in range(nb_questions):
+            response = agent("What is the answer?")
+            run_prompt_s += response.metrics["prompt_s"]
+        duration_s = min(duration_s, time.perf_counter() - start_time)
+        prompt_s = min(prompt_s, run_prompt_s)
+    nb_llm_calls = nb_questions * (nb_steps + 1)
+
+    # Memory still allocated after the questions, i.e. retained between questions
+    gc.collect()
+    tracemalloc.start()
+    agent("What is the answer?")
+    gc.collect()
+    allocated_before = tracemalloc.get_traced_memory()[0]
+    for _ in range(nb_questions):
+        agent("What is the answer?")
+    gc.collect()
+    allocated_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "step_ms": duration_s * 1000 / nb_llm_calls,
+        "prompt_ms": prompt_s * 1000 / nb_llm_calls,
+        "questions_per_s": nb_questions / duration_s,
+        "growth_kb": (allocated_after - allocated_before) / 1024 / nb_questions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--questions", type=int, default=20, help="Questions per scenario"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Runs of each scenario")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Accepted slowdown and memory growth, relative to the baseline",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Save the measures as the new baseline",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        # Use an empty workspace, not to read or grow the workspace of the agent
+        os.environ["WORKSPACE_DIR"] = folder
+        print(
+            f"{'Scenario':<22} {'Step':>9} {'Prompt':>9} {'Questions/s':>12} "
+            f"{'Growth/question':>16} {'Baseline step':>14}"
+        )
+        for nb_steps, observation_chars in SCENARIOS:
+            name = f"{nb_steps} steps, {observation_chars // 1000}k chars"
+            result = run_scenario(
+                nb_steps, observation_chars, args.questions, args.runs
+            )
+            results[name] = result
+            baseline_result = baseline.get(name)
+            baseline_step = (
+                f"{baseline_result['step_ms']:>12.2f}ms" if baseline_result else "-"
+            )
+            print(
+                f"{name:<22} {result['step_ms']:>7.2f}ms {result['prompt_ms']:>7.2f}ms "
+                f"{result['questions_per_s']:>12.1f} {result['growth_kb']:>13.1f}KB "
+                f"{baseline_step:>14}"
+            )
+            if baseline_result is None or args.update_baseline:
+                continue
+            tolerance = 1 + args.tolerance
+            if (
+                result["step_ms"] > baseline_result["step_ms"] * tolerance
+                and result["step_ms"] - baseline_result["step_ms"] > MIN_REGRESSION_MS
+            ):
+                failures.append(f"{name}: the steps are slower than the baseline")
+            if (
+                result["growth_kb"] > baseline_result["growth_kb"] * tolerance
+                and result["growth_kb"] - baseline_result["growth_kb"] > MIN_GROWTH_KB
+            ):
+                failures.append(f"{name}: the memory grows more than the baseline")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(
+                {
+                    name: {key: round(value, 2) for key, value in result.items()}
+                    for name, result in results.items()
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
@@ -0,0 +1,93 @@
+"""Measure the throughput of the browser tools on a local static site.
+
+To use it:
+
+python -m benchmarks.browser --pages 50
+
+Add --playwright to also measure the Playwright path on the same pages. The pages are
+then visited again, served by the page archive of the workspace.
+"""
+
+import argparse
+import functools
+import os
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import write_static_site
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_folder(folder: str) -> ThreadingHTTPServer:
+    """Serve a folder over HTTP on a random local port, in a background thread."""
+    handler = functools.partial(QuietHandler, directory=folder)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(session, urls: list[str]) -> float:
+    """Navigate to each URL and extract its markdown.
+
+    Returns:
+        float: The number of pages processed per second.
+    """
+    from tools.browser import ExtractMarkdownTool, NavigateTool
+
+    navigate = NavigateTool(session=session)
+    extract = ExtractMarkdownTool(session=session)
+    start_time = time.perf_counter()
+    for url in urls:
+        navigate.run({"url": url})
+        extract.run({})
+    return len(urls) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50, help="Number of pages")
+    parser.add_argument(
+        "--playwright",
+        action="store_true",
+        help="Also measure the Playwright path",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Use an empty workspace, for the page archive
+        os.environ["WORKSPACE_DIR"] = os.path.join(folder, "workspace")
+        from tools.archive import page_archive
+        from tools.browser import BrowserSession
+
+        class PlaywrightOnlySession(BrowserSession):
+            """Browser session that never uses the HTTP fast path."""
+
+            def fetch_static(self, url: str) -> str | None:
+                return None
+
+        filenames = write_static_site(folder, args.pages)
+        server = serve_folder(folder)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base_url}/{filename}" for filename in filenames]
+
+        # The pages are archived, but not served from the archive
+        max_age_s = page_archive.max_age_s
+        page_archive.max_age_s = 0
+        pages_per_s = measure(BrowserSession(), urls)
+        print(f"HTTP fast path:  {pages_per_s:.1f} pages/s")
+
+        if args.playwright:
+            pages_per_s = measure(PlaywrightOnlySession(), urls)
+            print(f"Playwright:      {pages_per_s:.1f} pages/s")
+
+        page_archive.max_age_s = max_age_s
+        pages_per_s = measure(BrowserSession(), urls)
+        print(f"Archived copies: {pages_per_s:.1f} pages/s")
+
+        server.shutdown()
@@ -0,0 +1,235 @@
+"""Measure the document converters of tools.files on a corpus of generated files.
+
+To use it:
+
+python -m benchmarks.converters [--formats pdf docx] [--sizes small typical]
+    [--corpus /tmp/corpus] [--runs 3] [--output results.json]
+    [--compare previous.json]
+
+The corpus has three sizes per format: a small file, a file of the size of a typical
+GAIA attachment, and a pathological one, much larger than the attachments seen so
+far. It is generated deterministically, so that the same corpus is measured across
+commits, and kept in the corpus folder: only the missing files are generated.
+
+Each conversion runs in a fresh process, after the conversion of the small file of
+the same format, so that the import of the dependencies of the converter is not
+measured. The best of the runs is kept for the time and the peak memory.
+
+The results are written as JSON, with the commit they were measured on, by default
+to benchmarks/results/converters-<commit>.json. With --compare, the time and memory
+of each conversion are compared with a previous result file.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from typing import Callable
+
+from benchmarks.fixtures import (
+    write_csv,
+    write_docx,
+    write_html,
+    write_pdf,
+    write_pptx,
+    write_text,
+    write_xml_records,
+)
+from benchmarks.measure import MeasurementError, run_isolated
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+SIZES = ["small", "typical", "pathological"]
+
+# The writer of each file of the corpus, by extension and size
+CORPUS: dict[str, dict[str, Callable[[str], None]]] = {
+    "html": {
+        "small": lambda path: write_html(path, nb_sections=3, table_rows=5),
+        "typical": lambda path: write_html(path, nb_sections=40, table_rows=50),
+        "pathological": lambda path: write_html(
+            path, nb_sections=2_000, table_rows=20_000
+        ),
+    },
+    "txt": {
+        "small": lambda path: write_text(path, size_mb=0.005),
+        "typical": lambda path: write_text(path, size_mb=0.2),
+        "pathological": lambda path: write_text(path, size_mb=100),
+    },
+    "pdf": {
+        "small": lambda path: write_pdf(path, nb_pages=1),
+        "typical": lambda path: write_pdf(path, nb_pages=15),
+        "pathological": lambda path: write_pdf(path, nb_pages=300),
+    },
+    "docx": {
+        "small": lambda path: write_docx(path, nb_pages=1),
+        "typical": lambda path: write_docx(path, nb_pages=15),
+        "pathological": lambda path: write_docx(path, nb_pages=500),
+    },
+    "pptx": {
+        "small": lambda path: write_pptx(path, nb_slides=2),
+        "typical": lambda path: write_pptx(path, nb_slides=25),
+        "pathological": lambda path: write_pptx(path, nb_slides=400),
+    },
+    "xml": {
+        "small": lambda path: write_xml_records(path, size_mb=0.005),
+        "typical": lambda path: write_xml_records(path, size_mb=0.5),
+        "pathological": lambda path: write_xml_records(path, size_mb=200),
+    },
+    "csv": {
+        "small": lambda path: write_csv(path, nb_rows=20),
+        "typical": lambda path: write_csv(path, nb_rows=5_000),
+        "pathological": lambda path: write_csv(path, nb_rows=2_000_000),
+    },
+}
+
+
+def corpus_file(folder: str, extension: str, size: str) -> str:
+    """Return the path of a file of the corpus, generating it if it is missing."""
+    path = os.path.join(folder, f"{size}.{extension}")
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        # Generate to a temporary file, so that an interrupted generation is not kept
+        temporary_path = os.path.join(folder, f"partial_{size}.{extension}")
+        CORPUS[extension][size](temporary_path)
+        os.replace(temporary_path, path)
+    return path
+
+
+def convert(path: str, warmup_path: str) -> int:
+    """Convert a file with the converter of its extension.
+
+    Returns:
+        int: The number of characters of the conversion.
+    """
+    from tools.files import converter_factory
+
+    converter = converter_factory.get_converter(path.rsplit(".", 1)[-1])
+    return len(str(converter.convert(path)))
+
+
+def warm_up(path: str, warmup_path: str) -> None:
+    """Convert a small file of the same format, to import the dependencies."""
+    convert(warmup_path, warmup_path)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(path: str, warmup_path: str, nb_runs: int) -> dict:
+    """Return the best duration and peak memory increase of the conversion of a file.
+
+    If the process of the conversion dies or times out, the error is returned instead.
+    """
+    input_mb = round(os.path.getsize(path) / 1024 / 1024, 3)
+    durations_s, memories_mb = [], []
+    for _ in range(nb_runs):
+        try:
+            output_chars, duration_s, memory_mb = run_isolated(
+                convert, path, warmup_path, setup=warm_up
+            )
+        except MeasurementError as e:
+            return {"input_mb": input_mb, "error": str(e)}
+        durations_s.append(duration_s)
+        memories_mb.append(memory_mb)
+    return {
+        "input_mb": input_mb,
+        "duration_s": round(min(durations_s), 6),
+        "peak_rss_mb": round(min(memories_mb), 1),
+        "output_chars": output_chars,
+    }
+
+
+def compare(results: dict, previous: dict) -> None:
+    """Print the change of the time and the memory of each conversion."""
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('date')}):")
+    print(
+        f"{'Conversion':<20} {'Time':>10} {'Before':>10} {'Memory':>9} {'Before':>9} "
+        f"{'Change':>8}"
+    )
+    for name, result in results["conversions"].items():
+        before = previous["conversions"].get(name)
+        if before is None or "error" in result or "error" in before:
+            continue
+        change = (
+            f"{result['duration_s'] / before['duration_s'] - 1:>+8.0%}"
+            if before["duration_s"]
+            else f"{'-':>8}"
+        )
+        print(
+            f"{name:<20} {result['duration_s']:>9.3f}s {before['duration_s']:>9.3f}s "
+            f"{result['peak_rss_mb']:>7.1f}MB {before['peak_rss_mb']:>7.1f}MB {change}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(CORPUS), default=list(CORPUS)
+    )
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=SIZES)
+    parser.add_argument(
+        "--corpus",
+        default=os.path.join(tempfile.gettempdir(), "gaia_converter_corpus"),
+        help="Folder of the corpus, generated on first use",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Runs of each conversion")
+    parser.add_argument("--output", default=None, help="Path of the JSON results")
+    parser.add_argument(
+        "--compare", default=None, help="Previous JSON results to compare with"
+    )
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "conversions": {},
+    }
+    print(
+        f"{'Conversion':<20} {'Input':>10} {'Time':>10} {'Peak RSS':>10} {'Output':>12}"
+    )
+    for extension in args.formats:
+        warmup_path = corpus_file(args.corpus, extension, "small")
+        for size in args.sizes:
+            path = corpus_file(args.corpus, extension, size)
+            name = f"{extension} {size}"
+            result = measure(path, warmup_path, args.runs)
+            results["conversions"][name] = result
+            if "error" in result:
+                print(
+                    f"{name:<20} {result['input_mb']:>8.2f}MB failed: {result['error']}"
+                )
+                continue
+            print(
+                f"{name:<20} {result['input_mb']:>8.2f}MB {result['duration_s']:>9.3f}s "
+                f"{result['peak_rss_mb']:>8.1f}MB {result['output_chars']:>12,}"
+            )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"converters-{commit or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,306 @@
+"""Generators for the synthetic files used by the benchmarks."""
+
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+
+def sentence(rng: random.Random, nb_words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(nb_words)).capitalize() + "."
+
+
+def html_page(rng: random.Random, nb_sections: int = 10, table_rows: int = 20) -> str:
+    """Build a page shaped like a Wikipedia article: navigation, sections and a table."""
+    parts = [
+        "<!DOCTYPE html><html><head><title>Benchmark page</title>",
+        "<style>body { font-family: sans-serif; }</style>",
+        "<script>var tracking = {};</script></head><body>",
+        "<nav><ul>",
+        *(f'<li><a href="/page_{i}.html">Link {i}</a></li>' for i in range(30)),
+        "</ul></nav><main><h1>Benchmark page</h1>",
+    ]
+    for section in range(nb_sections):
+        parts.append(f"<h2>Section {section}</h2>")
+        for _ in range(3):
+            parts.append(
+                "<p>"
+                + " ".join(sentence(rng) for _ in range(4))
+                + ' <a href="https://example.com">reference</a></p>'
+            )
+    parts.append("<table><tr><th>Name</th><th>Value</th><th>Comment</th></tr>")
+    for row in range(table_rows):
+        parts.append(
+            f"<tr><td>Item {row}</td><td>{rng.randint(0, 10_000)}</td>"
+            f"<td>{sentence(rng, 5)}</td></tr>"
+        )
+    parts.append("</table></main><footer><p>Footer content</p></footer></body></html>")
+    return "\n".join(parts)
+
+
+def write_static_site(folder: str, nb_pages: int = 50, seed: int = 0) -> list[str]:
+    """Write a set of static HTML pages to a folder.
+
+    Returns:
+        list[str]: The file names of the pages, relative to the folder.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    filenames = []
+    for i in range(nb_pages):
+        filename = f"page_{i}.html"
+        with open(os.path.join(folder, filename), "w") as f:
+            f.write(html_page(rng))
+        filenames.append(filename)
+    return filenames
+
+
+def write_html(
+    path: str, nb_sections: int = 10, table_rows: int = 20, seed: int = 0
+) -> None:
+    """Write an HTML page shaped like a Wikipedia article."""
+    with open(path, "w") as f:
+        f.write(html_page(random.Random(seed), nb_sections, table_rows))
+
+
+def write_text(path: str, size_mb: float, seed: int = 0) -> None:
+    """Write a plain text file of about the given size, in paragraphs."""
+    rng = random.Random(seed)
+    max_size = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        while f.tell() < max_size:
+            f.write(" ".join(sentence(rng) for _ in range(5)) + "\n\n")
+
+
+def write_pdf(path: str, nb_pages: int, seed: int = 0) -> None:
+    """Write a PDF document with a heading and 45 lines of text per page.
+
+    The file is written in the PDF 1.4 syntax, with the standard Helvetica font, so
+    that no PDF library is needed.
+    """
+    rng = random.Random(seed)
+    # Objects 1 to 3 are the catalog, the page tree and the font, followed by a
+    # page and its content stream for each page
+    page_ids = [4 + 2 * page for page in range(nb_pages)]
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {nb_pages} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page, page_id in enumerate(page_ids):
+        lines = [f"Chapter {page + 1}"] + [sentence(rng, 10) for _ in range(45)]
+        stream = (
+            "BT /F1 11 Tf 14 TL 50 800 Td "
+            + " ".join(f"({line}) Tj T*" for line in lines)
+            + " ET"
+        )
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for object_id, content in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{object_id} 0 obj\n{content}\nendobj\n".encode("latin-1"))
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010} 00000 n \n".encode())
+        f.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n".encode()
+        )
+
+
+def write_csv(path: str, nb_rows: int, seed: int = 0) -> None:
+    """Write a CSV file with numeric, text and date columns."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("id,name,category,price,quantity,date\n")
+        for i in range(nb_rows):
+            f.write(
+                f"{i},{rng.choice(WORDS)} {rng.choice(WORDS)},{rng.choice(WORDS[:8])},"
+                f"{rng.uniform(0, 1000):.2f},{rng.randint(1, 100)},"
+                f"2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}\n"
+            )
+
+
+def write_wordml(path: str, size_mb: float, seed: int = 0) -> None:
+    """Write a WordML (Word 2003 XML) document of about the given size."""
+    rng = random.Random(seed)
+    max_size = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        f.write(
+            '<?xml version="1.0"?>\n<w:wordDocument '
+            'xmlns:w="http://schemas.microsoft.com/office/word/2003/wordml"><w:body>\n'
+        )
+        while f.tell() < max_size:
+            runs = "".join(
+                f"<w:r><w:rPr><w:b/></w:rPr><w:t>{sentence(rng)} </w:t></w:r>"
+                for _ in range(4)
+            )
+            f.write(f"<w:p><w:pPr><w:jc w:val='left'/></w:pPr>{runs}</w:p>\n")
+        f.write("</w:body></w:wordDocument>\n")
+
+
+def write_xml_records(path: str, size_mb: float, seed: int = 0) -> None:
+    """Write a record-style XML export of about the given size."""
+    rng = random.Random(seed)
+    max_size = size_mb * 1024 * 1024
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0"?>\n<export><records>\n')
+        i = 0
+        while f.tell() < max_size:
+            f.write(
+                f'<record id="{i}"><name>{rng.choice(WORDS)} {rng.choice(WORDS)}</name>'
+                f"<price>{rng.uniform(0, 1000):.2f}</price>"
+                f"<quantity>{rng.randint(1, 100)}</quantity>"
+                f"<comment>{sentence(rng)}</comment></record>\n"
+            )
+            i += 1
+        f.write("</records></export>\n")
+
+
+_DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>
+</Types>"""
+
+_DOCX_PACKAGE_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_DOCX_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" Target="numbering.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink" Target="https://example.com" TargetMode="External"/>
+</Relationships>"""
+
+_W_NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+
+_DOCX_STYLES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles {_W_NAMESPACES}>
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/></w:style>
+</w:styles>"""
+
+_DOCX_NUMBERING = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:numbering {_W_NAMESPACES}>
+<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/><w:lvlText w:val="-"/></w:lvl></w:abstractNum>
+<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+</w:numbering>"""
+
+
+def _docx_paragraph(text: str, style: str | None = None, bold_words: int = 0) -> str:
+    properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    words = text.split(" ")
+    runs = "".join(
+        f'<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{escape(word)} </w:t></w:r>'
+        for word in words[:bold_words]
+    )
+    runs += f'<w:r><w:t xml:space="preserve">{escape(" ".join(words[bold_words:]))}</w:t></w:r>'
+    return f"<w:p>{properties}{runs}</w:p>"
+
+
+def write_docx(path: str, nb_pages: int, seed: int = 0) -> None:
+    """Write a Word document with about the given number of pages.
+
+    Each page has a heading, paragraphs with bold text and a hyperlink, a bulleted
+    list and a table.
+    """
+    rng = random.Random(seed)
+    body = []
+    for page in range(nb_pages):
+        body.append(_docx_paragraph(f"Chapter {page + 1}", style="Heading1"))
+        for _ in range(6):
+            body.append(
+                _docx_paragraph(" ".join(sentence(rng) for _ in range(5)), bold_words=3)
+            )
+        body.append(
+            '<w:p><w:r><w:t xml:space="preserve">See </w:t></w:r>'
+            '<w:hyperlink r:id="rId3"><w:r><w:t>the reference</w:t></w:r></w:hyperlink></w:p>'
+        )
+        for _ in range(3):
+            body.append(
+                '<w:p><w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr></w:pPr>'
+                f"<w:r><w:t>{escape(sentence(rng, 6))}</w:t></w:r></w:p>"
+            )
+        rows = "".join(
+            "<w:tr>"
+            + "".join(
+                f"<w:tc><w:p><w:r><w:t>{escape(value)}</w:t></w:r></w:p></w:tc>"
+                for value in (
+                    f"Item {row}",
+                    str(rng.randint(0, 1000)),
+                    sentence(rng, 4),
+                )
+            )
+            + "</w:tr>"
+            for row in range(5)
+        )
+        body.append(f"<w:tbl>{rows}</w:tbl>")
+        body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f"<w:document {_W_NAMESPACES}><w:body>{''.join(body)}</w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _DOCX_PACKAGE_RELATIONSHIPS)
+        archive.writestr("word/_rels/document.xml.rels", _DOCX_RELATIONSHIPS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/styles.xml", _DOCX_STYLES)
+        archive.writestr("word/numbering.xml", _DOCX_NUMBERING)
+
+
+def write_pptx(path: str, nb_slides: int, seed: int = 0) -> None:
+    """Write a PowerPoint deck, each slide with a title, bullets, a table and notes.
+
+    Requires python-pptx.
+    """
+    import pptx
+    from pptx.util import Inches
+
+    rng = random.Random(seed)
+    presentation = pptx.Presentation()
+    layout = presentation.slide_layouts[5]  # Title only
+    for number in range(nb_slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number + 1}: {sentence(rng, 4)}"
+        text_box = slide.shapes.add_textbox(
+            Inches(0.5), Inches(1.5), Inches(9), Inches(2)
+        )
+        text_box.text_frame.text = sentence(rng)
+        for _ in range(4):
+            text_box.text_frame.add_paragraph().text = sentence(rng)
+        table = slide.shapes.add_table(
+            4, 3, Inches(0.5), Inches(4), Inches(9), Inches(2)
+        ).table
+        for row in range(4):
+            for column in range(3):
+                table.cell(row, column).text = (
+                    f"Header {column}" if row == 0 else str(rng.randint(0, 1000))
+                )
+        slide.notes_slide.notes_text_frame.text = sentence(rng, 20)
+    presentation.save(path)
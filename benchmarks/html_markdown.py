@@ -0,0 +1,101 @@
+"""Compare the lxml HTML to markdown converter with the former BeautifulSoup pipeline.
+
+To use it:
+
+python -m benchmarks.html_markdown [--corpus <folder>]
+
+The corpus is a folder of saved HTML pages. If not provided, a corpus of generated
+pages, some of them with large tables, is used. Each converter runs in a fresh process
+so that its peak memory usage can be measured.
+"""
+
+import argparse
+import glob
+import os
+import random
+import tempfile
+
+from benchmarks.fixtures import html_page
+from benchmarks.measure import MeasurementError, run_isolated
+
+
+def legacy_html_to_markdown(html_content: str) -> str:
+    """The pipeline previously used by HtmlConverter and ExtractMarkdownTool."""
+    from bs4 import BeautifulSoup
+    import markdownify
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    for script in soup(["script", "style"]):
+        script.extract()
+    body_elm = soup.find("body")
+    return markdownify.MarkdownConverter().convert_soup(body_elm or soup)
+
+
+def lxml_html_to_markdown(html_content: str) -> str:
+    from tools.html_markdown import html_to_markdown
+
+    return html_to_markdown(html_content)[1]
+
+
+CONVERTERS = {
+    "beautifulsoup+markdownify": legacy_html_to_markdown,
+    "lxml": lxml_html_to_markdown,
+}
+
+
+def write_corpus(folder: str, nb_pages: int = 20, seed: int = 0) -> None:
+    """Write typical pages, and a few large pages dominated by tables."""
+    rng = random.Random(seed)
+    for i in range(nb_pages):
+        large = i % 5 == 0
+        page = html_page(
+            rng,
+            nb_sections=40 if large else 10,
+            table_rows=3000 if large else 20,
+        )
+        with open(os.path.join(folder, f"page_{i}.html"), "w") as f:
+            f.write(page)
+
+
+def warm_up(name: str, paths: list[str]) -> None:
+    CONVERTERS[name]("<html><body><p>warm up</p></body></html>")
+
+
+def run_converter(name: str, paths: list[str]) -> int:
+    """Convert all the pages of the corpus, and return the size of the output."""
+    converter = CONVERTERS[name]
+    output_chars = 0
+    for path in paths:
+        with open(path, errors="replace") as f:
+            output_chars += len(converter(f.read()))
+    return output_chars
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=None, help="Folder of saved HTML pages")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = folder
+            write_corpus(corpus)
+        paths = sorted(glob.glob(os.path.join(corpus, "*.htm*")))
+        size_mb = sum(os.path.getsize(path) for path in paths) / 1024**2
+        print(f"Corpus: {len(paths)} pages, {size_mb:.1f} MB\n")
+
+        for name in CONVERTERS:
+            try:
+                output_chars, duration_s, peak_mb = run_isolated(
+                    run_converter, name, paths, setup=warm_up
+                )
+            except MeasurementError as e:
+                print(f"{name}: failed ({e})")
+                continue
+            print(f"{name}:")
+            print(
+                f"  Duration: {duration_s:.2f}s ({len(paths) / duration_s:.1f} pages/s)"
+            )
+            print(f"  Peak memory increase: {peak_mb:.1f} MB")
+            print(f"  Output size: {output_chars} characters")
@@ -0,0 +1,93 @@
+"""Measure the duration and peak memory of a function, in a fresh process."""
+
+import multiprocessing
+import queue
+import resource
+import time
+from typing import Any, Callable
+
+# Maximum duration of a measurement, setup included
+TIMEOUT_S = 3600
+
+# Interval between the checks that the process is still running
+POLL_INTERVAL_S = 1.0
+
+
+class MeasurementError(Exception):
+    """Raised when the process of a measurement dies or does not end in time."""
+
+
+def _run(
+    func: Callable, args: tuple, setup: Callable | None, results: multiprocessing.Queue
+) -> None:
+    try:
+        if setup is not None:
+            setup(*args)
+        rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start_time = time.perf_counter()
+        result = func(*args)
+        duration_s = time.perf_counter() - start_time
+        rss_after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception as e:
+        # Send the error to the parent process, which would otherwise wait forever
+        results.put(e)
+        return
+    results.put((result, duration_s, (rss_after_kb - rss_before_kb) / 1024))
+
+
+def _wait_result(
+    process: multiprocessing.Process, results: multiprocessing.Queue, timeout_s: float
+) -> Any:
+    """Wait for the result sent by the process, while it is running."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            return results.get(timeout=POLL_INTERVAL_S)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # The result may have been sent just before the process ended
+            try:
+                return results.get(timeout=POLL_INTERVAL_S)
+            except queue.Empty:
+                raise MeasurementError(
+                    f"The process ended with exit code {process.exitcode} without "
+                    "a result, e.g. killed for lack of memory"
+                ) from None
+        if time.monotonic() > deadline:
+            raise MeasurementError(f"The measurement did not end within {timeout_s}s")
+
+
+def run_isolated(
+    func: Callable, *args, setup: Callable | None = None, timeout_s: float = TIMEOUT_S
+) -> tuple[Any, float, float]:
+    """Run a function in a fresh process.
+
+    The functions and the arguments must be picklable. The setup function, called
+    with the same arguments, is excluded from the measures: use it to do the imports.
+
+    Raises:
+        MeasurementError: If the process dies, e.g. killed for lack of memory, or
+            does not end within timeout_s seconds.
+        Exception: The exception raised by the setup function or the function.
+
+    Returns:
+        tuple[Any, float, float]: The result of the function, its duration in seconds
+            and the increase of the peak memory usage (RSS) of the process in MB.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run, args=(func, args, setup, results))
+    process.start()
+    try:
+        result = _wait_result(process, results, timeout_s)
+    except BaseException:
+        process.kill()
+        process.join()
+        raise
+    process.join()
+    if isinstance(result, Exception):
+        raise result
+    if process.exitcode != 0:
+        raise MeasurementError(f"The process ended with exit code {process.exitcode}")
+    return result
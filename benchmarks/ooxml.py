@@ -0,0 +1,163 @@
+"""Compare the direct DOCX/PPTX converters with the former HTML round-trip.
+
+To use it:
+
+python -m benchmarks.ooxml [--pages 300] [--slides 200]
+
+A Word document and a PowerPoint deck are generated (python-pptx is needed for the
+deck). The former converters (mammoth to HTML, then markdown for Word documents, and
+python-pptx with HTML tables for decks) are compared with the converters of
+tools.ooxml. Each converter runs in a fresh process. mammoth is no longer a
+requirement: install it to measure the former converters, which are skipped otherwise.
+"""
+
+import argparse
+import os
+import re
+import tempfile
+
+from benchmarks.fixtures import write_docx, write_pptx
+from benchmarks.measure import MeasurementError, run_isolated
+
+
+def legacy_docx_to_markdown(path: str) -> int:
+    """The pipeline previously used by DocxConverter."""
+    import mammoth
+    from tools.html_markdown import html_to_markdown
+
+    with open(path, "rb") as docx_file:
+        html_content = mammoth.convert_to_html(docx_file).value
+    return len(html_to_markdown(html_content)[1])
+
+
+def legacy_pptx_to_markdown(path: str) -> int:
+    """The conversion previously done by PptxConverter."""
+    import html
+
+    import pptx
+    from tools.html_markdown import html_to_markdown
+
+    md_content = ""
+    presentation = pptx.Presentation(path)
+    for slide_num, slide in enumerate(presentation.slides, start=1):
+        md_content += f"\n\n<!-- Slide number: {slide_num} -->\n"
+        title = slide.shapes.title
+        for shape in slide.shapes:
+            if shape.shape_type == pptx.enum.shapes.MSO_SHAPE_TYPE.PICTURE:
+                filename = re.sub(r"\W", "", shape.name) + ".jpg"
+                md_content += f"\n![{shape.name}]({filename})\n"
+            if shape.shape_type == pptx.enum.shapes.MSO_SHAPE_TYPE.TABLE:
+                html_table = "<html><body><table>"
+                first_row = True
+                for row in shape.table.rows:
+                    html_table += "<tr>"
+                    for cell in row.cells:
+                        cell_tag = "th" if first_row else "td"
+                        html_table += (
+                            f"<{cell_tag}>{html.escape(cell.text)}</{cell_tag}>"
+                        )
+                    html_table += "</tr>"
+                    first_row = False
+                html_table += "</table></body></html>"
+                md_content += "\n" + html_to_markdown(html_table)[1].strip() + "\n"
+            elif shape.has_text_frame:
+                if shape == title:
+                    md_content += "# " + shape.text.lstrip() + " "
+                else:
+                    md_content += shape.text + " "
+        md_content = md_content.strip()
+        if slide.has_notes_slide:
+            md_content += "\n\n### Notes:\n"
+            md_content += slide.notes_slide.notes_text_frame.text
+            md_content = md_content.strip()
+    return len(md_content)
+
+
+def import_legacy_converters(path: str) -> None:
+    import mammoth  # noqa: F401
+    import pptx  # noqa: F401
+    import tools.html_markdown  # noqa: F401
+
+
+def import_converters(path: str) -> None:
+    import tools.ooxml  # noqa: F401
+
+
+def docx_to_markdown(path: str) -> int:
+    from tools.ooxml import docx_to_markdown
+
+    return len(docx_to_markdown(path))
+
+
+def pptx_single_thread(path: str) -> int:
+    from tools.ooxml import pptx_to_markdown
+
+    return len(pptx_to_markdown(path, max_workers=1))
+
+
+def pptx_default_workers(path: str) -> int:
+    from tools.ooxml import pptx_to_markdown
+
+    return len(pptx_to_markdown(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300, help="Pages of the document")
+    parser.add_argument("--slides", type=int, default=200, help="Slides of the deck")
+    args = parser.parse_args()
+    print(f"CPUs: {os.cpu_count()}\n")
+
+    with tempfile.TemporaryDirectory() as folder:
+        docx_path = os.path.join(folder, "fixture.docx")
+        write_docx(docx_path, args.pages)
+        pptx_path = os.path.join(folder, "fixture.pptx")
+        try:
+            write_pptx(pptx_path, args.slides)
+        except ImportError as e:
+            print(f"Deck skipped ({e})\n")
+            pptx_path = None
+
+        docx_converters = [
+            (
+                "mammoth + HTML to markdown",
+                legacy_docx_to_markdown,
+                import_legacy_converters,
+            ),
+            ("tools.ooxml", docx_to_markdown, import_converters),
+        ]
+        pptx_converters = [
+            (
+                "python-pptx + HTML tables",
+                legacy_pptx_to_markdown,
+                import_legacy_converters,
+            ),
+            ("tools.ooxml, 1 thread", pptx_single_thread, import_converters),
+            ("tools.ooxml, default threads", pptx_default_workers, import_converters),
+        ]
+        benchmarks = [
+            (f"Word document, {args.pages} pages", docx_path, docx_converters)
+        ]
+        if pptx_path is not None:
+            benchmarks.append(
+                (f"Deck, {args.slides} slides", pptx_path, pptx_converters)
+            )
+
+        for title, path, converters in benchmarks:
+            print(f"{title} ({os.path.getsize(path) / 1024:.0f} KB):")
+            for label, func, setup in converters:
+                try:
+                    output_chars, duration_s, peak_mb = run_isolated(
+                        func, path, setup=setup
+                    )
+                except ImportError as e:
+                    print(f"  {label:<30} skipped ({e})")
+                    continue
+                except MeasurementError as e:
+                    print(f"  {label:<30} failed ({e})")
+                    continue
+                print(
+                    f"  {label:<30} {duration_s:>7.2f}s {peak_mb:>8.1f} MB peak increase "
+                    f"{output_chars:>10} chars"
+                )
+            print()
@@ -0,0 +1,109 @@
+"""Measure the throughput of the multi-query web search, on a fake search backend.
+
+To use it:
+
+python -m benchmarks.search [--questions 20] [--queries 4] [--latency-s 0.5]
+
+Each question is searched with several phrasings, on a local search backend with a
+simulated latency per request. The phrasings searched one at a time, as with a
+single-query search tool, are compared with the phrasings searched concurrently by
+one call of the web search tool, with an empty cache and then with a warm cache.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+TOPICS = [
+    "eiffel tower height",
+    "mercedes sosa studio albums",
+    "nobel prize physics 1921",
+    "python release date",
+    "mount everest first ascent",
+]
+PHRASINGS = [
+    "{}",
+    "what is the {}",
+    "{} wikipedia",
+    "{} official source",
+    "{} history facts",
+    "{} latest news",
+]
+
+
+def questions(nb_questions: int, nb_queries: int) -> list[list[str]]:
+    return [
+        [
+            phrasing.format(f"{TOPICS[index % len(TOPICS)]} {index}")
+            for phrasing in PHRASINGS[:nb_queries]
+        ]
+        for index in range(nb_questions)
+    ]
+
+
+def run(name: str, search, all_queries: list[list[str]]) -> None:
+    """Search the queries of each question, and print the throughput."""
+    start_time = time.perf_counter()
+    nb_results = nb_unique = 0
+    for queries in all_queries:
+        results = search(queries)
+        nb_results += sum(len(result["queries"]) for result in results)
+        nb_unique += len(results)
+    duration_s = time.perf_counter() - start_time
+    nb_queries = sum(map(len, all_queries))
+    print(
+        f"{name:<24} {duration_s:>8.2f}s {nb_queries / duration_s:>10.1f} "
+        f"{nb_results:>9} {nb_unique:>8}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20, help="Questions")
+    parser.add_argument(
+        "--queries", type=int, default=4, help="Phrasings searched per question"
+    )
+    parser.add_argument(
+        "--latency-s", type=float, default=0.5, help="Latency of the fake backend"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Use an empty workspace, for the cache of the search responses
+        os.environ["WORKSPACE_DIR"] = folder
+        from tools.search import FakeSearchBackend, SearchCache, WebSearch
+
+        all_queries = questions(args.questions, args.queries)
+        print(
+            f"{args.questions} questions, {args.queries} queries each, "
+            f"{args.latency_s}s per request\n"
+        )
+        print(
+            f"{'Search':<24} {'Time':>9} {'Queries/s':>10} {'Results':>9} {'Unique':>8}"
+        )
+
+        uncached = WebSearch(FakeSearchBackend(args.latency_s), SearchCache(ttl_s=0))
+        run(
+            "One query per call",
+            lambda queries: [
+                result
+                for query in queries
+                for result in uncached.search([query])["results"]
+            ],
+            all_queries,
+        )
+
+        backend = FakeSearchBackend(args.latency_s)
+        web_search = WebSearch(backend, SearchCache())
+        run(
+            "Concurrent, cold cache",
+            lambda queries: web_search.search(queries)["results"],
+            all_queries,
+        )
+        run(
+            "Concurrent, warm cache",
+            lambda queries: web_search.search(queries)["results"],
+            all_queries,
+        )
+        print(f"\nBackend requests with the cache: {backend.nb_calls}")
@@ -0,0 +1,67 @@
+"""Measure the memory used to summarize a large CSV file.
+
+To use it:
+
+python -m benchmarks.spreadsheet --rows 1000000
+
+The streaming SpreadsheetConverter is compared with loading the file with pandas,
+which is what the agent used to do through run_python.
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.fixtures import write_csv
+from benchmarks.measure import MeasurementError, run_isolated
+
+
+def import_converter(path: str) -> None:
+    import tools.files  # noqa: F401
+
+
+def streaming_converter(path: str) -> int:
+    from tools.files import SpreadsheetConverter
+
+    return len(SpreadsheetConverter().convert(path).text_content)
+
+
+def import_pandas(path: str) -> None:
+    import pandas  # noqa: F401
+
+
+def pandas_full_load(path: str) -> int:
+    import pandas
+
+    df = pandas.read_csv(path)
+    return len(df.describe(include="all").to_string() + df.head().to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "fixture.csv")
+        write_csv(path, args.rows)
+        print(f"Fixture: {args.rows} rows, {os.path.getsize(path) / 1024**2:.1f} MB\n")
+
+        for name, func, setup in [
+            ("SpreadsheetConverter (streaming)", streaming_converter, import_converter),
+            ("pandas.read_csv (full load)", pandas_full_load, import_pandas),
+        ]:
+            try:
+                output_chars, duration_s, peak_mb = run_isolated(
+                    func, path, setup=setup
+                )
+            except ImportError as e:
+                print(f"{name}: skipped ({e})")
+                continue
+            except MeasurementError as e:
+                print(f"{name}: failed ({e})")
+                continue
+            print(f"{name}:")
+            print(f"  Duration: {duration_s:.2f}s")
+            print(f"  Peak memory increase: {peak_mb:.1f} MB")
+            print(f"  Output size: {output_chars} characters")
@@ -0,0 +1,168 @@
+"""Measure the startup time of the agent, and check it against a baseline.
+
+To use it:
+
+python -m benchmarks.startup [--runs 5] [--tolerance 0.5] [--update-baseline]
+
+Each measure is done in a fresh Python process, and the best of the runs is kept:
+- the import time of the tools package and of the agent module, as reported by
+  `python -X importtime`,
+- the construction time of Agent(), once the agent module is imported.
+
+The tools import their heavy dependencies on first use, so the script also checks
+that importing them does not load any of HEAVY_MODULES.
+
+The measures are compared with benchmarks/startup_baseline.json, and the script exits
+with an error when one of them is slower than the baseline by more than the
+tolerance, or when a heavy module is loaded at import time. The baseline depends on
+the machine: update it with --update-baseline after an intended change.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+
+# Dependencies that are only imported when a tool is called
+HEAVY_MODULES = [
+    "langchain_experimental",
+    "markdownify",
+    "openpyxl",
+    "pandas",
+    "pdfplumber",
+    "PIL",
+    "pint",
+    "playwright",
+    "stockfish",
+    "youtube_transcript_api",
+    "yt_dlp",
+]
+
+# Slowdowns smaller than this are measurement noise, whatever the tolerance
+MIN_REGRESSION_MS = 50
+
+AGENT_CONSTRUCTION = """
+import time
+import agent
+
+start_time = time.perf_counter()
+agent.Agent()
+print((time.perf_counter() - start_time) * 1000)
+"""
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a fresh Python process from the root of the repository."""
+    return subprocess.run(
+        [sys.executable, "-W", "ignore", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+
+def import_times(module: str) -> tuple[float, dict[str, float]]:
+    """Import a module with -X importtime.
+
+    Returns:
+        tuple[float, dict[str, float]]: The cumulative import time of the module in
+            ms, and the cumulative import time of every imported module.
+    """
+    process = run_python("-X", "importtime", "-c", f"import {module}")
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        times[name.strip()] = int(cumulative_us) / 1000
+    return times[module], times
+
+
+def loaded_heavy_modules(module: str) -> list[str]:
+    """The modules of HEAVY_MODULES that are loaded when importing a module."""
+    process = run_python(
+        "-c",
+        f"import sys, {module}; print(' '.join(sys.modules))",
+    )
+    loaded = set(process.stdout.split())
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def measure(nb_runs: int) -> tuple[dict[str, float], dict[str, float]]:
+    """Return the best time of each measure, and the import time of each tool module."""
+    results = {"import tools": [], "import agent": [], "Agent()": []}
+    tool_modules: dict[str, float] = {}
+    for _ in range(nb_runs):
+        duration_ms, times = import_times("tools")
+        results["import tools"].append(duration_ms)
+        results["import agent"].append(import_times("agent")[0])
+        results["Agent()"].append(float(run_python("-c", AGENT_CONSTRUCTION).stdout))
+        for name, module_ms in times.items():
+            if name.startswith("tools."):
+                tool_modules[name] = min(module_ms, tool_modules.get(name, module_ms))
+    return {name: min(values) for name, values in results.items()}, tool_modules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Runs of each measure")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Accepted slowdown, relative to the baseline",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Save the measures as the new baseline",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for module in ["tools", "agent"]:
+        heavy_modules = loaded_heavy_modules(module)
+        if heavy_modules:
+            failures.append(f"import {module} loads {', '.join(heavy_modules)}")
+
+    durations, tool_modules = measure(args.runs)
+    print("Modules imported by the tools package:")
+    for name, duration_ms in sorted(tool_modules.items(), key=lambda item: -item[1]):
+        print(f"  {name:<24} {duration_ms:>8.1f}ms")
+    print()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    print(f"{'Measure':<16} {'Time':>10} {'Baseline':>10}")
+    for name, duration_ms in durations.items():
+        baseline_ms = baseline.get(name)
+        if baseline_ms is None:
+            print(f"{name:<16} {duration_ms:>8.1f}ms {'-':>10}")
+            continue
+        print(f"{name:<16} {duration_ms:>8.1f}ms {baseline_ms:>8.1f}ms")
+        if (
+            not args.update_baseline
+            and duration_ms > baseline_ms * (1 + args.tolerance)
+            and duration_ms - baseline_ms > MIN_REGRESSION_MS
+        ):
+            failures.append(f"{name} is slower than the baseline")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(
+                {name: round(ms, 1) for name, ms in durations.items()}, f, indent=2
+            )
+            f.write("\n")
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""Measure the latency of repeated SQL queries over a large CSV file.
+
+To use it:
+
+python -m benchmarks.tabular --rows 1000000 --runs 3
+
+The query_table tool, which loads the file once into a cached SQLite database, is
+compared with parsing the file with pandas for every query, which is what the agent
+does when it answers with run_python. The best time of each query is reported.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fixtures import write_csv
+
+QUERIES = [
+    (
+        "SELECT category, COUNT(*), AVG(price) FROM data GROUP BY category",
+        lambda df: df.groupby("category")["price"].agg(["count", "mean"]),
+    ),
+    (
+        "SELECT SUM(price * quantity) FROM data WHERE date >= '2024-06-01'",
+        lambda df: (df.price * df.quantity)[df.date >= "2024-06-01"].sum(),
+    ),
+    (
+        "SELECT * FROM data WHERE category = 'lorem' AND quantity = 5",
+        lambda df: df[(df.category == "lorem") & (df.quantity == 5)],
+    ),
+    (
+        "SELECT MAX(price) FROM data WHERE name = 'lorem ipsum'",
+        lambda df: df[df.name == "lorem ipsum"].price.max(),
+    ),
+]
+
+
+def measure_sqlite(path: str, nb_runs: int) -> tuple[float, list[float]]:
+    """Return the loading time of the file, and the best time of each query."""
+    from tools.tabular import load_database, run_query
+
+    start_time = time.perf_counter()
+    load_database(path)
+    load_duration_s = time.perf_counter() - start_time
+
+    durations = []
+    for sql, _ in QUERIES:
+        best_s = float("inf")
+        for _ in range(nb_runs):
+            start_time = time.perf_counter()
+            run_query(load_database(path), sql)
+            best_s = min(best_s, time.perf_counter() - start_time)
+        durations.append(best_s)
+    return load_duration_s, durations
+
+
+def measure_pandas(path: str, nb_runs: int) -> list[float]:
+    """Return the best time of each query, parsing the file every time."""
+    import pandas
+
+    durations = []
+    for _, query in QUERIES:
+        best_s = float("inf")
+        for _ in range(nb_runs):
+            start_time = time.perf_counter()
+            query(pandas.read_csv(path))
+            best_s = min(best_s, time.perf_counter() - start_time)
+        durations.append(best_s)
+    return durations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of rows")
+    parser.add_argument("--runs", type=int, default=3, help="Runs of each query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Use an empty workspace, so that the file is loaded by the benchmark
+        os.environ["WORKSPACE_DIR"] = os.path.join(folder, "workspace")
+        path = os.path.join(folder, "fixture.csv")
+        write_csv(path, args.rows)
+        print(f"Fixture: {args.rows} rows, {os.path.getsize(path) / 1024**2:.1f} MB\n")
+
+        load_duration_s, sqlite_durations = measure_sqlite(path, args.runs)
+        print(f"query_table: file loaded once in {load_duration_s:.2f}s\n")
+        try:
+            pandas_durations = measure_pandas(path, args.runs)
+        except ImportError as e:
+            print(f"pandas: skipped ({e})")
+            pandas_durations = [float("nan")] * len(QUERIES)
+
+        print(f"{'Query':<68} {'query_table':>12} {'pandas':>10}")
+        for (sql, _), sqlite_s, pandas_s in zip(
+            QUERIES, sqlite_durations, pandas_durations
+        ):
+            print(f"{sql:<68} {sqlite_s * 1000:>10.1f}ms {pandas_s * 1000:>8.1f}ms")
@@ -0,0 +1,114 @@
+"""Measure the wall-clock time of the chunked transcription of a long audio file.
+
+To use it:
+
+python -m benchmarks.transcription [--minutes 60] [--latency-s-per-minute 1]
+
+ffmpeg is needed. An audio file of tones separated by silences is generated, and
+transcribed with a simulated transcription API, whose latency is proportional to the
+duration of the audio it receives. A single request for the whole file is compared
+with the chunks transcribed concurrently by tools.transcription, whose time should be
+close to the time of the longest chunk, plus the ffmpeg passes.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def media_duration_s(path: str) -> float:
+    process = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True
+    )
+    hours, minutes, seconds = DURATION_PATTERN.search(process.stderr).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def write_audio(path: str, minutes: float) -> None:
+    """Write an MP3 file of 6 second tones separated by 1 second silences."""
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "aevalsrc='if(lt(mod(t,7),6),0.5*sin(440*2*PI*t),0)'"
+            f":s=44100:d={minutes * 60}",
+            "-ac",
+            "2",
+            "-b:a",
+            "128k",
+            "-y",
+            path,
+        ],
+        check=True,
+    )
+
+
+class SimulatedApi:
+    """A transcription API whose latency is proportional to the audio duration."""
+
+    def __init__(self, latency_s_per_minute: float):
+        self.latency_s_per_minute = latency_s_per_minute
+        self.latencies_s: list[float] = []
+
+    def transcribe(self, path: str) -> list:
+        from tools.transcription import Segment
+
+        duration_s = media_duration_s(path)
+        latency_s = duration_s / 60 * self.latency_s_per_minute
+        self.latencies_s.append(latency_s)
+        time.sleep(latency_s)
+        return [
+            Segment(start, start + 6, "tone") for start in range(0, int(duration_s), 7)
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=60, help="Audio duration")
+    parser.add_argument(
+        "--latency-s-per-minute",
+        type=float,
+        default=1,
+        help="Simulated API latency per minute of audio",
+    )
+    args = parser.parse_args()
+    if shutil.which("ffmpeg") is None:
+        raise SystemExit("ffmpeg is needed by this benchmark")
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Use an empty workspace, for the scratch folder of the chunks
+        os.environ["WORKSPACE_DIR"] = os.path.join(folder, "workspace")
+        from tools.transcription import transcribe_media
+
+        path = os.path.join(folder, "fixture.mp3")
+        write_audio(path, args.minutes)
+        print(
+            f"Fixture: {args.minutes:.0f} minutes, "
+            f"{os.path.getsize(path) / 1024**2:.1f} MB\n"
+        )
+
+        api = SimulatedApi(args.latency_s_per_minute)
+        start_time = time.perf_counter()
+        api.transcribe(path)
+        print(f"{'Single request':<20} {time.perf_counter() - start_time:>8.1f}s")
+
+        api = SimulatedApi(args.latency_s_per_minute)
+        start_time = time.perf_counter()
+        segments = transcribe_media(path, api.transcribe)
+        duration_s = time.perf_counter() - start_time
+        print(
+            f"{'Chunked':<20} {duration_s:>8.1f}s "
+            f"({len(api.latencies_s)} chunks, longest {max(api.latencies_s):.1f}s, "
+            f"{len(segments)} segments)"
+        )
@@ -0,0 +1,92 @@
+"""Compare the streaming XML converter with the former in-memory XmlConverter.
+
+To use it:
+
+python -m benchmarks.xml_markdown [--size-mb 500] [--legacy-max-mb 100]
+
+Two files of the given size are generated: a WordML document and a record-style
+export. The streaming converter is measured with the default character budget, and
+on the whole file (without keeping its output). The former converter loads the whole
+document in memory, so it is only measured on files up to --legacy-max-mb, and only
+on the WordML document (it does not handle record-style XML). Each converter runs in
+a fresh process.
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.fixtures import write_wordml, write_xml_records
+from benchmarks.measure import MeasurementError, run_isolated
+
+
+def legacy_wordml_to_markdown(path: str) -> int:
+    """The WordML branch previously used by XmlConverter."""
+    import xml.etree.ElementTree as ET
+
+    with open(path) as fh:
+        xml_string = fh.read()
+    root = ET.fromstring(xml_string)
+    namespace = {"w": "http://schemas.microsoft.com/office/word/2003/wordml"}
+    body = root.find("w:body", namespace)
+    text_content = []
+    for para in body.findall(".//w:p", namespace):
+        for text in para.findall(".//w:t", namespace):
+            text_content.append(text.text)
+    return len("\n".join(text_content).strip())
+
+
+def import_converter(path: str) -> None:
+    import tools.xml_markdown  # noqa: F401
+
+
+def streaming_with_budget(path: str) -> int:
+    from tools.xml_markdown import xml_to_markdown
+
+    return len(xml_to_markdown(path))
+
+
+def streaming_whole_file(path: str) -> int:
+    from tools.xml_markdown import iter_xml_lines
+
+    # The lines are counted instead of joined, to measure the parser alone
+    return sum(len(line) + 1 for line in iter_xml_lines(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=500, help="Size of the files")
+    parser.add_argument(
+        "--legacy-max-mb",
+        type=float,
+        default=100,
+        help="Largest file given to the former converter",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name, write in [("WordML", write_wordml), ("Records", write_xml_records)]:
+            path = os.path.join(folder, f"{name.lower()}.xml")
+            write(path, args.size_mb)
+            print(f"{name} fixture: {os.path.getsize(path) / 1024**2:.0f} MB")
+
+            converters = [
+                ("Streaming, default budget", streaming_with_budget, import_converter),
+                ("Streaming, whole file", streaming_whole_file, import_converter),
+            ]
+            if name == "WordML" and args.size_mb <= args.legacy_max_mb:
+                converters.append(("Former converter", legacy_wordml_to_markdown, None))
+            for label, func, setup in converters:
+                try:
+                    output_chars, duration_s, peak_mb = run_isolated(
+                        func, path, setup=setup
+                    )
+                except MeasurementError as e:
+                    print(f"  {label:<28} failed ({e})")
+                    continue
+                print(
+                    f"  {label:<28} {duration_s:>8.2f}s "
+                    f"{peak_mb:>9.1f} MB peak increase {output_chars:>12} chars"
+                )
+            os.remove(path)
+            print()
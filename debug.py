@@ -1,8 +1,13 @@
+import dataclasses
+import threading
 import time
 from typing import Any, Dict, List
+from uuid import UUID
 
 from langchain_core.callbacks.base import BaseCallbackHandler
 
+from tools.tracing import tracer
+
 
 class PromptLoggingHandler(BaseCallbackHandler):
     """Callback Handler for logging prompts sent to the LLM."""
@@ -46,3 +51,194 @@ class PromptLoggingHandler(BaseCallbackHandler):
         """Log when a tool finishes running."""
         print(f"Tool output: {output}")
         print("--- TOOL EXECUTION END ---\n")
+
+
+@dataclasses.dataclass
+class LlmCallMetrics:
+    latency_s: float
+    input_tokens: int = 0
+    # Input tokens read from the prompt cache of the provider
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclasses.dataclass
+class ToolCallMetrics:
+    name: str
+    latency_s: float
+    output_chars: int
+    error: bool = False
+
+
+@dataclasses.dataclass
+class QuestionMetrics:
+    """Where the time and the tokens of a question went."""
+
+    llm_calls: list[LlmCallMetrics] = dataclasses.field(default_factory=list)
+    tool_calls: list[ToolCallMetrics] = dataclasses.field(default_factory=list)
+    # Time spent building the prompts of the steps
+    prompt_s: float = 0.0
+
+    @property
+    def llm_latency_s(self) -> float:
+        return sum(call.latency_s for call in self.llm_calls)
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(call.input_tokens for call in self.llm_calls)
+
+    @property
+    def cached_tokens(self) -> int:
+        return sum(call.cached_tokens for call in self.llm_calls)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(call.output_tokens for call in self.llm_calls)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Callback Handler recording the latency and the tokens of the LLM calls, and
+    the latency and output size of the tool calls, of a question.
+
+    Tools called by another tool (e.g. the tool wrapped by a memoized tool) are
+    counted as part of their caller.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.metrics = QuestionMetrics()
+        self._start_times: dict[UUID, float] = {}
+        self._tool_names: dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def add_prompt_time(self, duration_s: float) -> None:
+        with self._lock:
+            self.metrics.prompt_s += duration_s
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs
+    ) -> None:
+        self._start_times[run_id] = time.perf_counter()
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs
+    ) -> None:
+        self._start_times[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the latency of the call, and the tokens of its generations."""
+        call = LlmCallMetrics(
+            latency_s=time.perf_counter() - self._start_times.pop(run_id)
+        )
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if not usage:
+                    continue
+                call.input_tokens += usage.get("input_tokens", 0)
+                call.output_tokens += usage.get("output_tokens", 0)
+                details = usage.get("input_token_details") or {}
+                call.cached_tokens += details.get("cache_read", 0) or 0
+        with self._lock:
+            self.metrics.llm_calls.append(call)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._start_times.pop(run_id, None)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        if parent_run_id in self._tool_names:
+            return
+        self._tool_names[run_id] = serialized.get("name", "Unknown tool")
+        self._start_times[run_id] = time.perf_counter()
+
+    def _end_tool(self, run_id: UUID, output_chars: int, error: bool) -> None:
+        name = self._tool_names.pop(run_id, None)
+        if name is None:
+            return
+        call = ToolCallMetrics(
+            name=name,
+            latency_s=time.perf_counter() - self._start_times.pop(run_id),
+            output_chars=output_chars,
+            error=error,
+        )
+        with self._lock:
+            self.metrics.tool_calls.append(call)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        # Tools called by the agent return a ToolMessage
+        content = getattr(output, "content", output)
+        self._end_tool(run_id, len(str(content)), error=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end_tool(run_id, 0, error=True)
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Callback Handler recording the LLM and tool calls of a question as spans of
+    the tracer, tagged with the task_id and the level of the question.
+
+    The tags are read when the handler is created, since the callbacks may be run
+    on threads which do not know the current question.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tags = tracer.tags()
+        self._spans: dict[UUID, tuple[int | None, str, str]] = {}
+
+    def _begin(self, run_id: UUID, name: str, category: str, **args: Any) -> None:
+        span_id = tracer.begin(name, category, **self.tags, **args)
+        self._spans[run_id] = (span_id, name, category)
+
+    def _end(self, run_id: UUID, **args: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            tracer.end(*span, **args)
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs
+    ) -> None:
+        self._begin(run_id, "llm", "llm", messages=sum(map(len, messages)))
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs
+    ) -> None:
+        self._begin(run_id, "llm", "llm")
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=str(error))
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Tools called by another tool are part of the span of their caller
+        if parent_run_id in self._spans:
+            return
+        name = serialized.get("name", "Unknown tool")
+        self._begin(run_id, name, "tool", input=input_str[:200])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        content = getattr(output, "content", output)
+        self._end(run_id, output_chars=len(str(content)))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=str(error))
@@ -1,12 +1,14 @@
+import collections
 import dataclasses
+import math
 from typing import Literal
-import json
-import os
 import time
 
-from agent import Agent
+from agent import Agent, AgentResponse
+from tools import cassette, tracer
 from scorer import question_scorer
 from dataset import select_questions_to_run
+from results import results_store
 
 
 @dataclasses.dataclass
@@ -18,9 +20,25 @@ class Answer:
     submitted_answer: str
     expected_answer: str
     score: int
-    duration_s: float
+    # None for the imported legacy runs and the interrupted runs
+    duration_s: float | None
     tools: list[str]
     number_of_steps: int
+    # Number of tool calls answered with the result of an identical call, by tool
+    tool_cache_hits: dict[str, int] = dataclasses.field(default_factory=dict)
+    # Latency and tokens of the LLM calls, latency of the tool calls (QuestionMetrics)
+    metrics: dict = dataclasses.field(default_factory=dict)
+    # Tool calls, with their arguments and observations, in the order of tools
+    trajectory: list[dict] = dataclasses.field(default_factory=list)
+
+    def token_totals(self) -> tuple[int, int, int]:
+        """Return the input, cached and output tokens of the question."""
+        llm_calls = self.metrics.get("llm_calls", [])
+        return (
+            sum(call["input_tokens"] for call in llm_calls),
+            sum(call["cached_tokens"] for call in llm_calls),
+            sum(call["output_tokens"] for call in llm_calls),
+        )
 
     def pprint(self):
         print(f"Task ID: {self.task_id}")
@@ -30,12 +48,47 @@ class Answer:
         print(f"Submitted answer: {self.submitted_answer}")
         print(f"Expected answer: {self.expected_answer}")
         print(f"Score: {self.score}")
-        print(f"Duration: {self.duration_s:.2f} seconds")
+        if self.duration_s is not None:
+            print(f"Duration: {self.duration_s:.2f} seconds")
         print(f"Tools: {self.tools}")
         print(f"Number of steps: {self.number_of_steps}")
+        if self.tool_cache_hits:
+            print(f"Reused tool calls: {self.tool_cache_hits}")
+        if self.metrics:
+            print_metrics(self.metrics)
         print(f"Level: {self.level}")
 
 
+def percentile(values: list[float], p: float) -> float:
+    """Return the p-th percentile of values, with the nearest-rank method."""
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def print_metrics(metrics: dict) -> None:
+    """Show where the time and the tokens of a question went."""
+    llm_calls = metrics["llm_calls"]
+    latencies = ", ".join(f"{call['latency_s']:.1f}" for call in llm_calls)
+    print(
+        f"LLM calls: {len(llm_calls)}, "
+        f"{sum(call['latency_s'] for call in llm_calls):.2f} seconds ({latencies})"
+    )
+    print(
+        f"Tokens: {sum(call['input_tokens'] for call in llm_calls)} input "
+        f"({sum(call['cached_tokens'] for call in llm_calls)} cached), "
+        f"{sum(call['output_tokens'] for call in llm_calls)} output"
+    )
+    tool_latencies = collections.defaultdict(float)
+    for call in metrics["tool_calls"]:
+        tool_latencies[call["name"]] += call["latency_s"]
+    if tool_latencies:
+        print(
+            "Tool latency: "
+            + ", ".join(f"{name} {s:.2f}s" for name, s in tool_latencies.items())
+        )
+    print(f"Prompt construction: {metrics['prompt_s']:.3f} seconds")
+
+
 def print_scores(answers: list[Answer]) -> None:
     """Show the total score, and the breakdown per level.
 
@@ -44,12 +97,20 @@ def print_scores(answers: list[Answer]) -> None:
 
     """
     total_score: int = 0
-    stats_per_level = {i: {"nb_questions": 0, "total_score": 0} for i in range(1, 4)}
+    stats_per_level = {
+        i: {"nb_questions": 0, "total_score": 0, "durations": [], "tokens": [0, 0, 0]}
+        for i in range(1, 4)
+    }
 
     for answer in answers:
         total_score += answer.score
-        stats_per_level[answer.level]["nb_questions"] += 1
-        stats_per_level[answer.level]["total_score"] += answer.score
+        stats = stats_per_level[answer.level]
+        stats["nb_questions"] += 1
+        stats["total_score"] += answer.score
+        if answer.duration_s is not None:
+            stats["durations"].append(answer.duration_s)
+        for i, tokens in enumerate(answer.token_totals()):
+            stats["tokens"][i] += tokens
 
     print(
         f"Total score: {total_score}/{len(answers)} ({total_score / len(answers) * 100:.2f}%)"
@@ -65,6 +126,41 @@ def print_scores(answers: list[Answer]) -> None:
         print(
             f"  Average score: {100 * stats['total_score'] / stats['nb_questions']:.2f}%"
         )
+        if stats["durations"]:
+            print(
+                f"  Latency: p50 {percentile(stats['durations'], 50):.2f}s, "
+                f"p95 {percentile(stats['durations'], 95):.2f}s"
+            )
+        input_tokens, cached_tokens, output_tokens = stats["tokens"]
+        print(
+            f"  Tokens: {input_tokens} input ({cached_tokens} cached), "
+            f"{output_tokens} output"
+        )
+
+
+def print_archive_stats(stats: dict) -> None:
+    """Show the hit rate of the page archive, and the network I/O it saved.
+
+    Args:
+        stats (dict): The statistics of the archive, summed over the questions.
+    """
+    if not stats["lookups"] and not stats["searches"]:
+        return
+    print("\nPage archive:")
+    if stats["lookups"]:
+        print(
+            f"  Pages served: {stats['hits']}/{stats['lookups']} "
+            f"({100 * stats['hits'] / stats['lookups']:.2f}%)"
+        )
+        print(
+            f"  Network saved: {stats['bytes_saved'] / 1024**2:.1f} MB, "
+            f"{stats['latency_saved_s']:.1f} seconds"
+        )
+    if stats["searches"]:
+        print(
+            f"  Searches with results: "
+            f"{stats['searches_with_results']}/{stats['searches']}"
+        )
 
 
 def evaluate_agent(
@@ -86,6 +182,8 @@ def evaluate_agent(
     """
     agent = Agent(debug=debug)
     answers = []
+    # Statistics of the page archive, summed over the questions
+    archive_stats = collections.Counter()
 
     for question in select_questions_to_run(dataset, level, task_id):
         print("\n" + "-" * 30 + f"Question {question.task_id}" + "-" * 30 + "\n")
@@ -96,11 +194,16 @@ def evaluate_agent(
 
         start_time = time.time()
         try:
-            agent_response = agent(question.question, question.file_path)
+            with tracer.question(question.task_id, question.level):
+                agent_response = agent(question.question, question.file_path)
             response = agent_response.final_answer
+            archive_stats.update(agent_response.archive_stats)
         except Exception as e:
             print(f"Error: {str(e)}")
             response = "Error: " + str(e)
+            agent_response = AgentResponse(
+                final_answer=response, num_steps=0, tools_used=[]
+            )
         duration_s = time.time() - start_time
         score = int(question_scorer(response, question.expected_answer))
         print("Response: " + response)
@@ -122,6 +225,9 @@ def evaluate_agent(
                 duration_s=duration_s,
                 tools=agent_response.tools_used,
                 number_of_steps=agent_response.num_steps,
+                tool_cache_hits=agent_response.tool_cache_stats.get("hits_by_tool", {}),
+                metrics=agent_response.metrics,
+                trajectory=agent_response.trajectory,
             )
         )
 
@@ -134,6 +240,13 @@ def evaluate_agent(
     else:
         print("  Level: All")
     print_scores(answers)
+    print_archive_stats(archive_stats)
+    if cassette.enabled:
+        print(
+            f"\nCassette ({cassette.mode}): {cassette.stats.replayed} responses "
+            f"replayed, {cassette.stats.recorded} recorded, "
+            f"{cassette.stats.missing} not recorded"
+        )
 
     return answers
 
@@ -144,7 +257,7 @@ def save_answers(
     level: int | None = None,
     task_id: str | None = None,
 ) -> None:
-    """Save the answers to a JSON file.
+    """Save the answers as a run of the results store.
 
     Args:
         answers (list[Answer]): List of answers.
@@ -152,14 +265,17 @@ def save_answers(
         level (int | None, optional): Level of the questions to run. Defaults to None.
         task_id (str | None, optional): ID of the task to run. Defaults to None.
     """
-    date = time.strftime("%Y%m%d")
-    base_filename = f"{date}_{dataset}_answers"
+    name = f"{time.strftime('%Y%m%d_%H%M%S')}_{dataset}_answers"
     if level:
-        base_filename += f"_level_{level}"
+        name += f"_level_{level}"
     if task_id:
-        base_filename += f"_task_{task_id}"
-    filename = base_filename + ".json"
-    with open(os.path.join("data", "answers", filename), "w") as f:
-        json.dump([dataclasses.asdict(answer) for answer in answers], f, indent=4)
+        name += f"_task_{task_id}"
+    results_store.add_run(
+        name,
+        [dataclasses.asdict(answer) for answer in answers],
+        dataset=dataset,
+        level=level,
+        task_id=task_id,
+    )
 
-    print(f"\nSaved answers to {filename}")
+    print(f"\nSaved answers to run {name} of {results_store.path}")
@@ -0,0 +1,401 @@
+"""Store of the results of the evaluation runs, in a SQLite database.
+
+Each run is stored with its answers, and the tool calls of each answer with their
+arguments and observations. The answers are indexed by task, level and run, and the
+tool calls by tool, so that runs can be compared, and a task followed across runs,
+without loading them in full. The observations, and the metrics of the answers, are
+compressed with zlib.
+
+The runs saved as JSON files in data/answers, before this store, are imported with
+`import_json_files`.
+"""
+
+import contextlib
+import dataclasses
+import datetime
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import settings
+
+ANSWERS_DIR = os.path.join("data", "answers")
+
+# The tool of a call, as summarized in the tools of an answer: <tool>[arguments]
+_CALL_TOOL_RE = re.compile(r"^<([^>]*)>")
+
+
+@dataclasses.dataclass
+class RunSummary:
+    id: int
+    name: str
+    dataset: str | None
+    created_at: float
+    nb_answers: int
+    score: int
+    # Average score by level
+    level_scores: dict[int, float]
+
+
+def _compress_json(value) -> bytes:
+    return zlib.compress(json.dumps(value).encode("utf-8"))
+
+
+def _decompress_json(data: bytes | None):
+    return None if data is None else json.loads(zlib.decompress(data))
+
+
+class ResultsStore:
+    """The runs, answers and tool calls of the evaluations.
+
+    The answers are given and returned as dicts with the fields of evaluation.Answer.
+    """
+
+    def __init__(self, path: str = settings.RESULTS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a transaction on the store, creating it on first use."""
+        with self._lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA foreign_keys = ON")
+            try:
+                if not self._initialized:
+                    self._create_tables(connection)
+                    self._initialized = True
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection) -> None:
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                dataset TEXT,
+                level INTEGER,
+                task_id TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+                task_id TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                file_path TEXT,
+                submitted_answer TEXT,
+                expected_answer TEXT,
+                score INTEGER NOT NULL,
+                duration_s REAL,
+                number_of_steps INTEGER,
+                tool_cache_hits TEXT,
+                metrics BLOB
+            );
+            CREATE INDEX IF NOT EXISTS answers_run_level ON answers (run, level);
+            CREATE INDEX IF NOT EXISTS answers_task ON answers (task_id);
+            CREATE INDEX IF NOT EXISTS answers_level ON answers (level);
+            -- The tool calls of the answers. The arguments and the observation are
+            -- unknown for the runs imported from JSON files.
+            CREATE TABLE IF NOT EXISTS steps (
+                answer INTEGER NOT NULL REFERENCES answers (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                tool TEXT NOT NULL,
+                call TEXT NOT NULL,
+                arguments TEXT,
+                observation BLOB,
+                observation_chars INTEGER,
+                PRIMARY KEY (answer, position)
+            );
+            CREATE INDEX IF NOT EXISTS steps_tool ON steps (tool);
+            """
+        )
+
+    def add_run(
+        self,
+        name: str,
+        answers: list[dict],
+        dataset: str | None = None,
+        level: int | None = None,
+        task_id: str | None = None,
+        created_at: float | None = None,
+    ) -> int:
+        """Store a run and its answers.
+
+        Args:
+            name (str): The unique name of the run.
+            answers (list[dict]): The answers, as dicts of evaluation.Answer fields.
+            dataset (str | None, optional): The dataset of the run.
+            level (int | None, optional): The level the run was restricted to.
+            task_id (str | None, optional): The task the run was restricted to.
+            created_at (float | None, optional): The time of the run. Defaults to now.
+
+        Raises:
+            ValueError: If a run with this name is already stored.
+
+        Returns:
+            int: The id of the run.
+        """
+        with self._connect() as connection:
+            try:
+                run = connection.execute(
+                    "INSERT INTO runs (name, dataset, level, task_id, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (name, dataset, level, task_id, created_at or time.time()),
+                ).lastrowid
+            except sqlite3.IntegrityError:
+                raise ValueError(f"A run named {name} is already stored")
+            for answer in answers:
+                self._add_answer(connection, run, answer)
+        return run
+
+    @staticmethod
+    def _add_answer(connection: sqlite3.Connection, run: int, answer: dict) -> None:
+        answer_id = connection.execute(
+            "INSERT INTO answers (run, task_id, level, question, file_path, "
+            "submitted_answer, expected_answer, score, duration_s, number_of_steps, "
+            "tool_cache_hits, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run,
+                answer["task_id"],
+                answer["level"],
+                answer["question"],
+                answer.get("file_path"),
+                answer["submitted_answer"],
+                answer["expected_answer"],
+                answer["score"],
+                answer.get("duration_s"),
+                answer.get("number_of_steps"),
+                json.dumps(answer.get("tool_cache_hits") or {}),
+                _compress_json(answer["metrics"]) if answer.get("metrics") else None,
+            ),
+        ).lastrowid
+        trajectory = answer.get("trajectory") or []
+        steps = []
+        for position, call in enumerate(answer.get("tools") or []):
+            step = trajectory[position] if position < len(trajectory) else None
+            match = _CALL_TOOL_RE.match(call)
+            tool = step["tool"] if step else match.group(1) if match else call
+            observation = step.get("observation") if step else None
+            steps.append(
+                (
+                    answer_id,
+                    position,
+                    tool,
+                    call,
+                    json.dumps(step["arguments"]) if step else None,
+                    None
+                    if observation is None
+                    else zlib.compress(observation.encode("utf-8")),
+                    None if observation is None else len(observation),
+                )
+            )
+        connection.executemany(
+            "INSERT INTO steps (answer, position, tool, call, arguments, observation, "
+            "observation_chars) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            steps,
+        )
+
+    def find_run(self, run: str | int) -> int | None:
+        """Return the id of a run given by name or by id, if it is stored.
+
+        The name is tried first, so that a run named after a number is not mistaken
+        for the run with that id.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id FROM runs WHERE name = ?", (str(run),)
+            ).fetchone()
+            if row is None:
+                row = connection.execute(
+                    "SELECT id FROM runs WHERE CAST(id AS TEXT) = ?", (str(run),)
+                ).fetchone()
+        return None if row is None else row["id"]
+
+    def runs(self) -> list[RunSummary]:
+        """Return the runs, from the oldest to the latest, with their scores."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                """
+                SELECT runs.id, runs.name, runs.dataset, runs.created_at,
+                    COUNT(answers.id) AS nb_answers,
+                    COALESCE(SUM(answers.score), 0) AS score,
+                    AVG(CASE WHEN answers.level = 1 THEN answers.score END) AS level_1,
+                    AVG(CASE WHEN answers.level = 2 THEN answers.score END) AS level_2,
+                    AVG(CASE WHEN answers.level = 3 THEN answers.score END) AS level_3
+                FROM runs LEFT JOIN answers ON answers.run = runs.id
+                GROUP BY runs.id
+                ORDER BY runs.created_at, runs.id
+                """
+            ).fetchall()
+        return [
+            RunSummary(
+                id=row["id"],
+                name=row["name"],
+                dataset=row["dataset"],
+                created_at=row["created_at"],
+                nb_answers=row["nb_answers"],
+                score=row["score"],
+                level_scores={
+                    level: row[f"level_{level}"]
+                    for level in (1, 2, 3)
+                    if row[f"level_{level}"] is not None
+                },
+            )
+            for row in rows
+        ]
+
+    def load_answers(
+        self,
+        run: int,
+        level: int | None = None,
+        tool: str | None = None,
+        observations: bool = False,
+    ) -> list[dict]:
+        """Return the answers of a run.
+
+        Args:
+            run (int): The id of the run.
+            level (int | None, optional): Only return the answers of this level.
+            tool (str | None, optional): Only return the answers calling this tool.
+            observations (bool, optional): Whether to load the observations of the
+                tool calls in the trajectories. Defaults to False.
+
+        Returns:
+            list[dict]: The answers, as dicts of evaluation.Answer fields.
+        """
+        conditions = ["run = ?"]
+        params: list = [run]
+        if level is not None:
+            conditions.append("level = ?")
+            params.append(level)
+        if tool is not None:
+            conditions.append("id IN (SELECT answer FROM steps WHERE tool = ?)")
+            params.append(tool)
+        observation_column = "observation" if observations else "NULL"
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT * FROM answers WHERE {' AND '.join(conditions)} ORDER BY id",
+                params,
+            ).fetchall()
+            steps_by_answer: dict[int, list[sqlite3.Row]] = {}
+            for step in connection.execute(
+                f"SELECT answer, tool, call, arguments, {observation_column} "
+                "AS observation FROM steps WHERE answer IN "
+                f"(SELECT id FROM answers WHERE {' AND '.join(conditions)}) "
+                "ORDER BY answer, position",
+                params,
+            ):
+                steps_by_answer.setdefault(step["answer"], []).append(step)
+
+        answers = []
+        for row in rows:
+            steps = steps_by_answer.get(row["id"], [])
+            answers.append(
+                {
+                    "task_id": row["task_id"],
+                    "question": row["question"],
+                    "file_path": row["file_path"],
+                    "level": row["level"],
+                    "submitted_answer": row["submitted_answer"],
+                    "expected_answer": row["expected_answer"],
+                    "score": row["score"],
+                    "duration_s": row["duration_s"],
+                    "tools": [step["call"] for step in steps],
+                    "number_of_steps": row["number_of_steps"],
+                    "tool_cache_hits": json.loads(row["tool_cache_hits"] or "{}"),
+                    "metrics": _decompress_json(row["metrics"]) or {},
+                    "trajectory": [
+                        {
+                            "tool": step["tool"],
+                            "arguments": json.loads(step["arguments"]),
+                            "observation": None
+                            if step["observation"] is None
+                            else zlib.decompress(step["observation"]).decode("utf-8"),
+                        }
+                        for step in steps
+                        if step["arguments"] is not None
+                    ],
+                }
+            )
+        return answers
+
+    def task_history(self, task_id: str) -> list[dict]:
+        """Return the answers to a task in every run, from the oldest run."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                """
+                SELECT runs.name AS run, runs.created_at, answers.submitted_answer,
+                    answers.expected_answer, answers.score, answers.duration_s,
+                    answers.number_of_steps,
+                    (SELECT GROUP_CONCAT(tool, ', ') FROM
+                        (SELECT tool FROM steps WHERE answer = answers.id
+                         ORDER BY position)) AS tools
+                FROM answers JOIN runs ON runs.id = answers.run
+                WHERE answers.task_id = ?
+                ORDER BY runs.created_at, runs.id
+                """,
+                (task_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_json(self, path: str) -> int | None:
+        """Import a run saved as a JSON file by a former version of save_answers.
+
+        The run is named after the file, and the file name gives its date, dataset,
+        level and task. Files already imported are skipped.
+
+        Returns:
+            int | None: The id of the run, or None if it was already imported.
+        """
+        name = os.path.splitext(os.path.basename(path))[0]
+        if self.find_run(name) is not None:
+            return None
+        with open(path) as f:
+            answers = json.load(f)
+        try:
+            created_at = datetime.datetime.strptime(name[:8], "%Y%m%d").timestamp()
+        except ValueError:
+            created_at = os.path.getmtime(path)
+        dataset = next(
+            (dataset for dataset in ("validation", "test") if dataset in name), None
+        )
+        level = re.search(r"_level_(\d)", name)
+        task_id = re.search(r"_task_(.+)$", name)
+        return self.add_run(
+            name,
+            answers,
+            dataset=dataset,
+            level=int(level.group(1)) if level else None,
+            task_id=task_id.group(1) if task_id else None,
+            created_at=created_at,
+        )
+
+    def import_json_files(self, folder: str = ANSWERS_DIR) -> list[str]:
+        """Import the runs saved as JSON files in a folder, skipping those imported.
+
+        Returns:
+            list[str]: The names of the runs imported.
+        """
+        imported = []
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            if self.import_json(path) is not None:
+                imported.append(os.path.splitext(os.path.basename(path))[0])
+        return imported
+
+
+results_store = ResultsStore()
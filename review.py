@@ -1,16 +1,103 @@
-"""Explore the results of the agent"""
+"""Explore the results of the agent, from the results store.
+
+To use it:
+
+python review.py                        # list the runs, with their scores by level
+python review.py <run>                  # scores and wrong answers of a run
+python review.py <run> --tool web_search --level 2
+python review.py --task <task_id>       # answers to a task across the runs
+python review.py --import-json          # import the runs saved in data/answers
+
+A run is given by its name, or by its id if no run has that name.
+"""
 
 import argparse
-import json
-import os
+import dataclasses
+import datetime
 
 from evaluation import Answer, print_scores
+from results import results_store
+from scorer import score_batch
+
+
+def load_answers(
+    run: str, level: int | None = None, tool: str | None = None
+) -> list[Answer]:
+    """Load the answers of a run from the results store.
+
+    Args:
+        run (str): The name or the id of the run. A name may end with .json, for the
+            runs imported from JSON files.
+        level (int | None, optional): Only load the answers of this level.
+        tool (str | None, optional): Only load the answers calling this tool.
+
+    Raises:
+        ValueError: If the run is not stored.
+
+    Returns:
+        list[Answer]: The answers.
+    """
+    run_id = results_store.find_run(run.removesuffix(".json"))
+    if run_id is None:
+        raise ValueError(f"No run {run} in {results_store.path}")
+    return [
+        Answer(**answer)
+        for answer in results_store.load_answers(run_id, level=level, tool=tool)
+    ]
+
+
+def rescore_answers(answers: list[Answer]) -> list[Answer]:
+    """Score the answers again with the current scorer, e.g. after changing it.
+
+    Returns:
+        list[Answer]: The answers, with their new scores.
+    """
+    results = score_batch(
+        (answer.submitted_answer, answer.expected_answer) for answer in answers
+    )
+    rescored = []
+    for answer, result in zip(answers, results):
+        if int(result.score) != answer.score:
+            print(
+                f"Score of {answer.task_id} changed: {answer.score} -> {int(result.score)}"
+            )
+        rescored.append(dataclasses.replace(answer, score=int(result.score)))
+    return rescored
+
+
+def print_runs() -> None:
+    print(
+        f"{'Id':>4}  {'Run':<48} {'Date':<16} {'Answers':>8} {'Score':>7} "
+        f"{'Level 1':>8} {'Level 2':>8} {'Level 3':>8}"
+    )
+    for run in results_store.runs():
+        date = datetime.datetime.fromtimestamp(run.created_at).strftime(
+            "%Y-%m-%d %H:%M"
+        )
+        levels = " ".join(
+            f"{run.level_scores[level]:>8.1%}"
+            if level in run.level_scores
+            else f"{'-':>8}"
+            for level in (1, 2, 3)
+        )
+        score = run.score / run.nb_answers if run.nb_answers else 0
+        print(
+            f"{run.id:>4}  {run.name:<48} {date:<16} {run.nb_answers:>8} "
+            f"{score:>7.1%} {levels}"
+        )
 
 
-def load_answers(filepath: str) -> list[Answer]:
-    with open(os.path.join("data", "answers", filepath)) as f:
-        answers_dict = json.load(f)
-        return [Answer(**answer) for answer in answers_dict]
+def print_task_history(task_id: str) -> None:
+    print("*" * 30 + f"Task {task_id}" + "*" * 30)
+    for answer in results_store.task_history(task_id):
+        print(f"\nRun: {answer['run']}")
+        print(f"Submitted answer: {answer['submitted_answer']}")
+        print(f"Expected answer: {answer['expected_answer']}")
+        print(f"Score: {answer['score']}")
+        # Unknown for the imported legacy runs and the interrupted runs
+        if answer["duration_s"] is not None:
+            print(f"Duration: {answer['duration_s']:.2f} seconds")
+        print(f"Tools: {answer['tools'] or ''}")
 
 
 def print_wrong_answers(answers: list[Answer], level: int | None = None) -> None:
@@ -24,10 +111,10 @@ def print_wrong_answers(answers: list[Answer], level: int | None = None) -> None
 
 
 if __name__ == "__main__":
-    # take the name of a answer file as argument
-
     parser = argparse.ArgumentParser()
-    parser.add_argument("answer_file", type=str, help="Name of the answer file")
+    parser.add_argument(
+        "run", type=str, nargs="?", default=None, help="Id or name of the run"
+    )
 
     # option to print the wrong answers or not, default to True
     parser.add_argument(
@@ -44,10 +131,40 @@ if __name__ == "__main__":
         type=int,
         help="Optional: Level of the questions to run. Runs all if not specified.",
     )
+    parser.add_argument(
+        "--tool",
+        default=None,
+        help="Optional: Only review the answers calling this tool",
+    )
+    parser.add_argument(
+        "--rescore",
+        action="store_true",
+        help="Score the answers again with the current scorer",
+    )
+    parser.add_argument(
+        "--task", default=None, help="Show the answers to a task across the runs"
+    )
+    parser.add_argument(
+        "--import-json",
+        action="store_true",
+        help="Import the runs saved as JSON files in data/answers",
+    )
 
     args = parser.parse_args()
-    answers = load_answers(args.answer_file)
+    if args.import_json:
+        imported = results_store.import_json_files()
+        print(f"Imported {len(imported)} runs: {', '.join(imported)}")
+    if args.task:
+        print_task_history(args.task)
+    elif args.run is None:
+        print_runs()
+    else:
+        answers = load_answers(args.run, level=args.level, tool=args.tool)
+        if not answers:
+            parser.exit(message="No answers match the run, level and tool given\n")
+        if args.rescore:
+            answers = rescore_answers(answers)
 
-    print_scores(answers)
-    if not args.no_print_wrong:
-        print_wrong_answers(answers, args.level)
+        print_scores(answers)
+        if not args.no_print_wrong:
+            print_wrong_answers(answers, args.level)
@@ -10,11 +10,16 @@ python run.py --dataset <dataset> --level <level> <task_id>
 
 Where <task_id> is the ID of the task to run. Runs all if not specified.
 
+To record a timeline of the run, viewable in Perfetto (https://ui.perfetto.dev):
+
+python run.py --dataset <dataset> --level <level> --trace trace.json
+
 """
 
 import argparse
 
 from evaluation import evaluate_agent, save_answers
+from tools import tracer
 
 
 if __name__ == "__main__":
@@ -46,8 +51,20 @@ if __name__ == "__main__":
     parser.add_argument(
         "--nosave", action="store_true", help="If set, do not save results"
     )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="Optional: Save a timeline of the run as a Chrome trace JSON file.",
+    )
     args = parser.parse_args()
 
-    answers = evaluate_agent(args.dataset, args.level, args.task_id, debug=True)
+    if args.trace:
+        tracer.start()
+    try:
+        answers = evaluate_agent(args.dataset, args.level, args.task_id, debug=True)
+    finally:
+        if args.trace:
+            tracer.save(args.trace)
     if not args.nosave:
         save_answers(answers, args.dataset, args.level, args.task_id)
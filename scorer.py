@@ -2,9 +2,12 @@
 https://huggingface.co/spaces/gaia-benchmark/leaderboard/blob/main/scorer.py
 """
 
+import dataclasses
+import functools
 import re
 import string
 import warnings
+from typing import Iterable, Literal
 
 
 def normalize_number_str(number_str: str) -> float:
@@ -50,56 +53,138 @@ def normalize_str(input_str, remove_punct=True) -> str:
         return no_spaces.lower()
 
 
+# Scoring. score_answer gives the scores of the official scorer, with the normalizers
+# compiled and the ground truths parsed once; question_scorer adds its printing on top.
+
+_WHITESPACE_RE = re.compile(r"\s")
+_SPLIT_RE = re.compile("[,;]")
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+_NUMBER_TABLE = str.maketrans("", "", "$%,")
+
+
+@dataclasses.dataclass(frozen=True)
+class GroundTruth:
+    """A ground truth, classified and normalized as the official scorer does."""
+
+    kind: Literal["number", "list", "string"]
+    # The number, for a number
+    number: float | None = None
+    # The number, or the normalized string, of each element, for a list
+    elements: tuple[float | str, ...] = ()
+    # The normalized string, for a string
+    normalized: str | None = None
+
+
+@dataclasses.dataclass
+class ScoreResult:
+    score: bool
+    # How the answer was compared with the ground truth
+    kind: Literal["number", "list", "string"]
+
+
+def _parse_float(element: str) -> float | None:
+    try:
+        return float(element)
+    except ValueError:
+        return None
+
+
+def _to_number(number_str: str) -> float:
+    """normalize_number_str, without printing."""
+    number = _parse_float(number_str.translate(_NUMBER_TABLE))
+    return float("inf") if number is None else number
+
+
+def _normalize(input_str: str, remove_punct: bool = True) -> str:
+    no_spaces = _WHITESPACE_RE.sub("", input_str).lower()
+    return no_spaces.translate(_PUNCTUATION_TABLE) if remove_punct else no_spaces
+
+
+# The benchmark has a few hundred distinct ground truths: the bound only keeps a
+# long-lived process scoring arbitrary strings from growing its memory without limit
+@functools.lru_cache(maxsize=4096)
+def classify_ground_truth(ground_truth: str) -> GroundTruth:
+    """Classify a ground truth, once per distinct ground truth."""
+    number = _parse_float(ground_truth)
+    if number is not None:
+        return GroundTruth(kind="number", number=number)
+    if "," in ground_truth or ";" in ground_truth:
+        elements = []
+        for element in _SPLIT_RE.split(ground_truth):
+            number = _parse_float(element)
+            elements.append(
+                number if number is not None else _normalize(element, False)
+            )
+        return GroundTruth(kind="list", elements=tuple(elements))
+    return GroundTruth(kind="string", normalized=_normalize(ground_truth))
+
+
+def score_answer(model_answer: str | None, ground_truth: str) -> ScoreResult:
+    """Score an answer as the official scorer does, without printing or warning."""
+    if model_answer is None:
+        model_answer = "None"
+    truth = classify_ground_truth(ground_truth)
+    if truth.kind == "number":
+        return ScoreResult(_to_number(model_answer) == truth.number, "number")
+    if truth.kind == "string":
+        return ScoreResult(_normalize(model_answer) == truth.normalized, "string")
+    answer_elements = _SPLIT_RE.split(model_answer)
+    if len(answer_elements) != len(truth.elements):
+        return ScoreResult(False, "list")
+    return ScoreResult(
+        all(
+            _to_number(answer_element) == truth_element
+            if isinstance(truth_element, float)
+            else _normalize(answer_element, False) == truth_element
+            for answer_element, truth_element in zip(answer_elements, truth.elements)
+        ),
+        "list",
+    )
+
+
 def question_scorer(
     model_answer: str,
     ground_truth: str,
 ) -> bool:
-    def is_float(element: any) -> bool:
-        try:
-            float(element)
-            return True
-        except ValueError:
-            return False
-
+    """Score an answer, printing how it is compared, as the official scorer does."""
     if model_answer is None:
         model_answer = "None"
-
-    # if gt is a number
-    if is_float(ground_truth):
+    truth = classify_ground_truth(ground_truth)
+    if truth.kind == "number":
         print(f"Evaluating {model_answer} as a number.")
-        normalized_answer = normalize_number_str(model_answer)
-        return normalized_answer == float(ground_truth)
-
-    # if gt is a list
-    elif any(char in ground_truth for char in [",", ";"]):
+        answer_numbers = [model_answer]
+    elif truth.kind == "list":
         print(f"Evaluating {model_answer} as a comma separated list.")
-        # question with the fish: normalization removes punct
-
-        gt_elems = split_string(ground_truth)
-        ma_elems = split_string(model_answer)
-
-        # check length is the same
-        if len(gt_elems) != len(ma_elems):
+        answer_elements = split_string(model_answer)
+        if len(answer_elements) != len(truth.elements):
             warnings.warn(
                 "Answer lists have different lengths, returning False.", UserWarning
             )
-            return False
-
-        # compare each element as float or str
-        comparisons = []
-        for ma_elem, gt_elem in zip(ma_elems, gt_elems):
-            if is_float(gt_elem):
-                normalized_ma_elem = normalize_number_str(ma_elem)
-                comparisons.append(normalized_ma_elem == float(gt_elem))
-            else:
-                # we do not remove punct since comparisons can include punct
-                comparisons.append(
-                    normalize_str(ma_elem, remove_punct=False)
-                    == normalize_str(gt_elem, remove_punct=False)
+            answer_numbers = []
+        else:
+            answer_numbers = [
+                answer_element
+                for answer_element, truth_element in zip(
+                    answer_elements, truth.elements
                 )
-        return all(comparisons)
-
-    # if gt is a str
+                if isinstance(truth_element, float)
+            ]
     else:
         print(f"Evaluating {model_answer} as a string.")
-        return normalize_str(model_answer) == normalize_str(ground_truth)
+        answer_numbers = []
+    for answer_number in answer_numbers:
+        if _parse_float(answer_number.translate(_NUMBER_TABLE)) is None:
+            print(f"String {answer_number} cannot be normalized to number str.")
+    return score_answer(model_answer, ground_truth).score
+
+
+def score_batch(pairs: Iterable[tuple[str | None, str]]) -> list[ScoreResult]:
+    """Score (answer, ground truth) pairs, e.g. to re-score the answers of past runs.
+
+    Args:
+        pairs (Iterable[tuple[str | None, str]]): The answers and their ground truths.
+
+    Returns:
+        list[ScoreResult]: The result of each pair, as given by question_scorer.
+    """
+    return [score_answer(answer, ground_truth) for answer, ground_truth in pairs]
@@ -1,7 +1,8 @@
 """
 settings.py
 
-Loads environment variables from a .env file and sets API keys for OpenAI and Tavily.
+Loads environment variables from a .env file and sets API keys for OpenAI and Tavily,
+as well as the tuning knobs of the tools.
 """
 
 from typing import Optional
@@ -12,3 +13,90 @@ load_dotenv()
 
 OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY: Optional[str] = os.getenv("TAVILY_API_KEY")
+
+# HTTP client shared by the tools
+HTTP_CONNECT_TIMEOUT_S: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "5"))
+HTTP_READ_TIMEOUT_S: float = float(os.getenv("HTTP_READ_TIMEOUT_S", "30"))
+HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_MAX_DOWNLOAD_BYTES: int = int(
+    os.getenv("HTTP_MAX_DOWNLOAD_BYTES", str(500 * 1024 * 1024))
+)
+
+# Workspace of the files downloaded and produced by the tools
+WORKSPACE_DIR: str = os.getenv("WORKSPACE_DIR", os.path.join("data", "workspace"))
+WORKSPACE_MAX_BYTES: int = int(
+    os.getenv("WORKSPACE_MAX_BYTES", str(5 * 1024 * 1024 * 1024))
+)
+# Time a download without ETag or Last-Modified, nor Cache-Control max-age, is reused
+WORKSPACE_MAX_AGE_S: float = float(os.getenv("WORKSPACE_MAX_AGE_S", str(24 * 3600)))
+
+# Limits applied when extracting files from zip archives
+ZIP_MAX_MEMBER_BYTES: int = int(
+    os.getenv("ZIP_MAX_MEMBER_BYTES", str(200 * 1024 * 1024))
+)
+ZIP_MAX_COMPRESSION_RATIO: float = float(os.getenv("ZIP_MAX_COMPRESSION_RATIO", "100"))
+
+# Maximum size of the markdown converted from XML files
+XML_MAX_CHARS: int = int(os.getenv("XML_MAX_CHARS", "20000"))
+
+# SQL queries over tabular files
+TABULAR_QUERY_TIMEOUT_S: float = float(os.getenv("TABULAR_QUERY_TIMEOUT_S", "10"))
+TABULAR_MAX_ROWS: int = int(os.getenv("TABULAR_MAX_ROWS", "200"))
+
+# Images sent to the vision model
+IMAGE_MAX_TILES: int = int(os.getenv("IMAGE_MAX_TILES", "4"))
+IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Transcription of long audio and video files, in chunks transcribed concurrently
+TRANSCRIPTION_MAX_WORKERS: int = int(os.getenv("TRANSCRIPTION_MAX_WORKERS", "8"))
+TRANSCRIPTION_CHUNK_MIN_S: float = float(os.getenv("TRANSCRIPTION_CHUNK_MIN_S", "120"))
+TRANSCRIPTION_CHUNK_MAX_S: float = float(os.getenv("TRANSCRIPTION_CHUNK_MAX_S", "900"))
+
+# Web search: "tavily", or "fake" for tests and offline benchmarks
+SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "tavily")
+SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+SEARCH_MAX_QUERIES: int = int(os.getenv("SEARCH_MAX_QUERIES", "5"))
+SEARCH_MAX_WORKERS: int = int(os.getenv("SEARCH_MAX_WORKERS", "5"))
+# Time to live of the cached search responses, 0 to disable the cache
+SEARCH_CACHE_TTL_S: float = float(os.getenv("SEARCH_CACHE_TTL_S", str(24 * 3600)))
+
+# Archive of the fetched pages: pages archived more recently than this are served
+# from the archive instead of being fetched again, 0 to always fetch them
+ARCHIVE_MAX_AGE_S: float = float(os.getenv("ARCHIVE_MAX_AGE_S", str(7 * 24 * 3600)))
+# Whether the pages archived by previous runs are served too, instead of only those
+# archived by the current run (opt-in: they may be stale for time-sensitive questions)
+ARCHIVE_REUSE_PREVIOUS_RUNS: bool = os.getenv(
+    "ARCHIVE_REUSE_PREVIOUS_RUNS", "false"
+).lower() in ("1", "true", "yes")
+# Size of the text of the archive, beyond which the oldest pages are deleted
+ARCHIVE_MAX_BYTES: int = int(os.getenv("ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Record and replay of the network I/O: "off", "record", "replay" or "offline"
+CASSETTE_MODE: str = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_DIR: str = os.getenv(
+    "CASSETTE_DIR", os.path.join("data", "cassettes", "default")
+)
+# Whether replayed responses take as long as when they were recorded
+CASSETTE_REPLAY_LATENCY: bool = os.getenv(
+    "CASSETTE_REPLAY_LATENCY", "false"
+).lower() in ("1", "true", "yes")
+
+# Browser
+BROWSER_NAVIGATION_TIMEOUT_MS: int = int(
+    os.getenv("BROWSER_NAVIGATION_TIMEOUT_MS", "15000")
+)
+BROWSER_HTTP_TIMEOUT_S: float = float(os.getenv("BROWSER_HTTP_TIMEOUT_S", "10"))
+
+# Speculative prefetch of the top web search results (opt-in)
+PREFETCH_SEARCH_RESULTS: bool = os.getenv(
+    "PREFETCH_SEARCH_RESULTS", "false"
+).lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PREFETCH_TOP_N: int = int(os.getenv("PREFETCH_TOP_N", "3"))
+PREFETCH_MAX_BYTES: int = int(os.getenv("PREFETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Results of the evaluation runs
+RESULTS_DB: str = os.getenv("RESULTS_DB", os.path.join("data", "results.db"))
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from tools.archive import PageArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PageArchive(path=str(tmp_path / "archive.db"), max_age_s=3600)
+
+
+def test_get_returns_the_archived_page(archive):
+    archive.add("https://example.com", "Example", "Some archived text", 1000, 0.5)
+    page = archive.get("https://example.com")
+    assert page.title == "Example"
+    assert page.text == "Some archived text"
+    assert archive.stats.hits == 1
+    assert archive.stats.bytes_saved == 1000
+    assert archive.get("https://example.com/other") is None
+
+
+def test_get_ignores_pages_older_than_max_age(archive):
+    archive.add("https://example.com", "Example", "Some archived text")
+    archive.max_age_s = 0
+    assert archive.get("https://example.com") is None
+
+
+def test_get_ignores_pages_of_previous_runs(archive):
+    archive.add("https://example.com", "Example", "Some archived text")
+    archive.run_started_at = time.time() + 1
+    assert archive.get("https://example.com") is None
+    archive.reuse_previous_runs = True
+    page = archive.get("https://example.com")
+    assert page.describe().startswith("archived copy, fetched at ")
+
+
+def test_search_ranks_the_matching_documents(archive):
+    archive.add("https://a.example.com", "Zebras", "Zebras live in Africa.")
+    archive.add("https://b.example.com", "Penguins", "Penguins live in Antarctica.")
+    results = archive.search("zebra Africa")
+    assert [result.url for result in results] == ["https://a.example.com"]
+    assert "Zebras live in Africa" in results[0].snippet
+    assert archive.search("!!!") == []
+
+
+def test_readding_a_url_replaces_its_content(archive):
+    archive.add("https://example.com", "T", "alpha beta old content")
+    archive.add("https://example.com", "T", "alpha gamma new content")
+    assert archive.get("https://example.com").text == "alpha gamma new content"
+    results = archive.search("alpha")
+    assert [(result.url, result.snippet) for result in results] == [
+        ("https://example.com", "alpha gamma new content...")
+    ]
+    assert archive.search("old") == []
+
+
+def test_shared_document_is_kept_while_a_url_points_to_it(archive):
+    archive.add("https://a.example.com", "T", "shared content")
+    archive.add("https://b.example.com", "T", "shared content")
+    archive.add("https://a.example.com", "T", "changed content")
+    assert [result.url for result in archive.search("shared")] == [
+        "https://b.example.com"
+    ]
+
+
+def test_size_limit_drops_the_oldest_pages(tmp_path):
+    archive = PageArchive(
+        path=str(tmp_path / "archive.db"), max_age_s=3600, max_bytes=2500
+    )
+    for i in range(5):
+        archive.add(f"https://example.com/{i}", f"Page {i}", f"page{i} " + "x" * 995)
+    assert [archive.get(f"https://example.com/{i}") is None for i in range(5)] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert archive.search("page0") == []
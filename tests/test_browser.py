@@ -0,0 +1,16 @@
+from tools.browser import is_static_html
+
+ARTICLE = " ".join(f"Sentence {i} of a long article about browsers." for i in range(50))
+
+
+def test_is_static_html():
+    assert is_static_html(f"<html><body><p>{ARTICLE}</p></body></html>")
+    # Rendered client-side
+    assert not is_static_html('<html><body><div id="app"></div></body></html>')
+    notice = "Please enable JavaScript to use this site. " * 5
+    assert not is_static_html(f"<html><body><p>{notice}</p></body></html>")
+
+
+def test_article_mentioning_javascript_is_static():
+    html = f"<p>{ARTICLE} Some sites require JavaScript to render. {ARTICLE}</p>"
+    assert is_static_html(html)
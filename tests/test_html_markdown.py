@@ -0,0 +1,77 @@
+from tools.html_markdown import (
+    decode_html,
+    html_to_markdown,
+    markdown_headings,
+    markdown_section,
+)
+
+PAGE = """<html><head><title> My page </title><script>var x = 1</script></head><body>
+<nav>Menu</nav>
+<h1>Title</h1>
+<p>Some <b>bold</b> and <i>italic</i> text, with a <a href="https://x.com/a">link</a>.</p>
+<h2>List</h2>
+<ul><li>one</li><li>two<ul><li>nested</li></ul></li></ul>
+<ol><li>first</li></ol>
+<h2>Table</h2>
+<table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2|3</td></tr></table>
+<pre>code
+  indented</pre>
+<!-- comment -->
+<footer>Footer</footer>
+</body></html>"""
+
+
+def test_html_to_markdown():
+    title, markdown = html_to_markdown(PAGE)
+    assert title == "My page"
+    assert markdown == (
+        "# Title\n\n"
+        "Some **bold** and *italic* text, with a [link](https://x.com/a).\n\n"
+        "## List\n\n"
+        "- one\n- two\n  - nested\n\n"
+        "1. first\n\n"
+        "## Table\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2\\|3 |\n\n"
+        "```\ncode\n  indented\n```"
+    )
+
+
+def test_boilerplate_is_removed():
+    markdown = html_to_markdown(PAGE)[1]
+    for boilerplate in ("Menu", "Footer", "var x", "comment"):
+        assert boilerplate not in markdown
+
+
+def test_empty_and_encoded_documents():
+    assert html_to_markdown("") == (None, "")
+    assert html_to_markdown("   ") == (None, "")
+    declaration = '<?xml version="1.0" encoding="utf-8"?>'
+    assert html_to_markdown(f"{declaration}<html><body><p>x</p></body></html>") == (
+        None,
+        "x",
+    )
+    page = f"{declaration}<html><body><p>café</p></body></html>".encode()
+    assert html_to_markdown(page) == (None, "café")
+
+
+def test_markdown_section():
+    markdown = html_to_markdown(PAGE)[1]
+    assert markdown_headings(markdown) == ["# Title", "## List", "## Table"]
+    assert markdown_section(markdown, "list") == (
+        "## List\n\n- one\n- two\n  - nested\n\n1. first"
+    )
+    assert markdown_section(markdown, "title") == markdown
+    assert markdown_section(markdown, "missing") is None
+
+
+def test_decode_html():
+    text = "Café – 10 €"
+    page = f"<html><body><p>{text}</p></body></html>"
+    meta_page = f'<html><head><meta charset="utf-8"></head><body>{text}</body></html>'
+    # The charset of the header first, then the one of the document
+    assert text in decode_html(page.encode("cp1252"), "text/html; charset=cp1252")
+    assert text in decode_html(meta_page.encode(), "text/html")
+    # Without any charset: UTF-8 if valid, instead of ISO-8859-1
+    assert text in decode_html(page.encode(), "text/html")
+    assert text in decode_html(page.encode("cp1252"), "text/html")
+    assert text in decode_html(page.encode(), "text/html; charset=unknown-charset")
@@ -0,0 +1,52 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from tools import images
+from tools.workspace import Workspace
+
+
+class FakeVisionModel:
+    """Answers with the number of the call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        text = f"answer {self.calls}"
+        return type("Response", (), {"text": lambda self: text})()
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    workspace = Workspace(root=str(tmp_path / "workspace"))
+    monkeypatch.setattr(images, "workspace", workspace)
+    return workspace
+
+
+def write_text_image(path, text: str) -> str:
+    img = Image.new("RGB", (1200, 800), "white")
+    ImageDraw.Draw(img).text((100, 350), text, fill="black")
+    img.save(path)
+    return str(path)
+
+
+def test_similar_images_do_not_share_an_answer(tmp_path):
+    first = write_text_image(tmp_path / "first.png", "Total: 1,234,567")
+    second = write_text_image(tmp_path / "second.png", "Total: 7,654,321")
+    llm = FakeVisionModel()
+    assert images.analyze_image_file(first, "Total?", llm=llm) == "answer 1"
+    assert images.analyze_image_file(second, "Total?", llm=llm) == "answer 2"
+
+
+def test_the_answer_is_cached_by_pixels_and_prompt(tmp_path):
+    first = write_text_image(tmp_path / "first.png", "Total: 1,234,567")
+    # The same pixels, in another file with other metadata
+    with Image.open(first) as img:
+        img.save(tmp_path / "copy.png", optimize=True)
+    llm = FakeVisionModel()
+    assert images.analyze_image_file(first, "Total?", llm=llm) == "answer 1"
+    copy = str(tmp_path / "copy.png")
+    assert images.analyze_image_file(copy, "Total?", llm=llm) == "answer 1"
+    assert images.analyze_image_file(first, "Other?", llm=llm) == "answer 2"
+    assert llm.calls == 2
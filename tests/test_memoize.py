@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.tools import tool
+
+from tools.memoize import ToolCallCache, memoize_tools
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def tools(calls):
+    @tool
+    def search(query: str, limit: int = 5) -> str:
+        """Search.
+
+        Args:
+            query (str): The query.
+            limit (int, optional): The number of results.
+        """
+        calls.append(("search", query, limit))
+        return f"results of {query.strip()} ({limit})"
+
+    @tool
+    def fail(query: str) -> str:
+        """Fail.
+
+        Args:
+            query (str): The query.
+        """
+        calls.append(("fail", query))
+        return "Error: failed"
+
+    @tool
+    def clock() -> str:
+        """Tell the time."""
+        calls.append(("clock",))
+        return str(len(calls))
+
+    return [search, fail, clock]
+
+
+def test_identical_calls_reuse_the_result(tools, calls):
+    cache = ToolCallCache()
+    search, _, _ = memoize_tools(tools, cache=cache)
+    first = search.invoke({"query": "cats"})
+    # Same canonical arguments: default filled in, strings stripped
+    assert search.invoke({"query": " cats ", "limit": 5}) == first
+    assert search.invoke({"query": "cats", "limit": 3}) == "results of cats (3)"
+    assert calls == [("search", "cats", 5), ("search", "cats", 3)]
+    assert cache.stats.calls == 3
+    assert cache.stats.hits_by_tool == {"search": 1}
+
+
+def test_async_calls_share_the_cache(tools, calls):
+    search, _, _ = memoize_tools(tools, cache=ToolCallCache())
+    assert search.invoke({"query": "cats"}) == asyncio.run(
+        search.ainvoke({"query": "cats"})
+    )
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached(tools, calls):
+    _, fail, _ = memoize_tools(tools, cache=ToolCallCache())
+    fail.invoke({"query": "x"})
+    fail.invoke({"query": "x"})
+    assert len(calls) == 2
+
+
+def test_excluded_tools_are_not_wrapped(tools, calls):
+    _, _, clock = memoize_tools(tools, exclude={"clock"}, cache=ToolCallCache())
+    assert clock is tools[2]
+    assert clock.invoke({}) != clock.invoke({})
+
+
+def test_scopes_and_time_to_live(tools, calls):
+    cache = ToolCallCache()
+    search, _, clock = memoize_tools(
+        tools, ttl_s={"clock": 0.05}, run_scoped={"search"}, cache=cache
+    )
+    search.invoke({"query": "cats"})
+    clock.invoke({})
+    clock.invoke({})
+    assert len(calls) == 2
+    time.sleep(0.1)
+    clock.invoke({})
+    assert len(calls) == 3
+
+    stats = cache.reset()
+    assert stats.hits == 1 and cache.stats.calls == 0
+    # The run-scoped results are kept across questions, the others dropped
+    search.invoke({"query": "cats"})
+    clock.invoke({})
+    assert len(calls) == 4
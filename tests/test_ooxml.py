@@ -0,0 +1,102 @@
+import zipfile
+
+import pytest
+
+from tools.ooxml import docx_to_markdown, pptx_to_markdown
+
+W_NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+
+DOCUMENT = f"""<w:document {W_NAMESPACES}><w:body>
+<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Report</w:t></w:r></w:p>
+<w:p>
+  <w:r><w:t xml:space="preserve">Some </w:t></w:r>
+  <w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">bold </w:t></w:r>
+  <w:r><w:rPr><w:b/></w:rPr><w:t>text</w:t></w:r>
+  <w:r><w:t xml:space="preserve">, </w:t></w:r>
+  <w:del><w:r><w:t>deleted</w:t></w:r></w:del>
+  <w:hyperlink r:id="rId1"><w:r><w:t>a link</w:t></w:r></w:hyperlink>
+</w:p>
+<w:p><w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr></w:pPr>
+  <w:r><w:t>first</w:t></w:r></w:p>
+<w:p><w:pPr><w:numPr><w:ilvl w:val="1"/><w:numId w:val="1"/></w:numPr></w:pPr>
+  <w:r><w:t>nested</w:t></w:r></w:p>
+<w:p><w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="2"/></w:numPr></w:pPr>
+  <w:r><w:t>numbered</w:t></w:r></w:p>
+<w:tbl>
+  <w:tr><w:tc><w:p><w:r><w:t>Name</w:t></w:r></w:p></w:tc>
+    <w:tc><w:p><w:r><w:t>Value</w:t></w:r></w:p></w:tc></w:tr>
+  <w:tr><w:tc><w:tcPr><w:gridSpan w:val="2"/></w:tcPr>
+    <w:p><w:r><w:t>merged</w:t></w:r></w:p></w:tc></w:tr>
+</w:tbl>
+</w:body></w:document>"""
+
+STYLES = f"""<w:styles {W_NAMESPACES}>
+<w:style w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+</w:styles>"""
+
+NUMBERING = f"""<w:numbering {W_NAMESPACES}>
+<w:abstractNum w:abstractNumId="0">
+  <w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/></w:lvl>
+  <w:lvl w:ilvl="1"><w:numFmt w:val="bullet"/></w:lvl>
+</w:abstractNum>
+<w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl>
+</w:abstractNum>
+<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+<w:num w:numId="2"><w:abstractNumId w:val="1"/></w:num>
+</w:numbering>"""
+
+RELATIONSHIPS = """<Relationships
+xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Target="https://example.com" TargetMode="External"
+Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"/>
+</Relationships>"""
+
+
+def test_docx_to_markdown(tmp_path):
+    path = tmp_path / "document.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", DOCUMENT)
+        archive.writestr("word/styles.xml", STYLES)
+        archive.writestr("word/numbering.xml", NUMBERING)
+        archive.writestr("word/_rels/document.xml.rels", RELATIONSHIPS)
+    assert docx_to_markdown(str(path)) == (
+        "# Report\n\n"
+        "Some **bold text**, [a link](https://example.com)\n\n"
+        "- first\n  - nested\n1. numbered\n\n"
+        "| Name | Value |\n|---|---|\n| merged |  |"
+    )
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_pptx_to_markdown(tmp_path, monkeypatch, max_workers):
+    pptx = pytest.importorskip("pptx")
+    from pptx.util import Inches
+
+    from tools import ooxml
+
+    # Convert the slides in parallel, with several workers
+    monkeypatch.setattr(ooxml, "PARALLEL_MIN_SLIDES", 2)
+    presentation = pptx.Presentation()
+    for number in range(1, 4):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {number}"
+        text_box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(1))
+        text_box.text_frame.text = f"Text {number}"
+        table = slide.shapes.add_table(
+            2, 2, Inches(1), Inches(4), Inches(4), Inches(1)
+        ).table
+        for row in range(2):
+            for column in range(2):
+                table.cell(row, column).text = f"{row}{column}"
+        slide.notes_slide.notes_text_frame.text = f"Notes {number}"
+    path = tmp_path / "deck.pptx"
+    presentation.save(path)
+
+    assert pptx_to_markdown(str(path), max_workers=max_workers) == "\n\n".join(
+        f"<!-- Slide number: {number} -->\n# Slide {number}\nText {number}\n"
+        f"| 00 | 01 |\n|---|---|\n| 10 | 11 |\n### Notes:\nNotes {number}"
+        for number in range(1, 4)
+    )
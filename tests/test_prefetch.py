@@ -0,0 +1,72 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from tools.prefetch import Prefetcher
+
+PAGE = "<html><body><h1>Café</h1><p>A prefetched page.</p></body></html>".encode()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves an HTML page without charset, after a delay on /slow."""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.3)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def wait(prefetcher: Prefetcher) -> None:
+    for future in list(prefetcher._futures.values()):
+        future.result()
+
+
+def test_prefetched_page_is_used(server):
+    prefetcher = Prefetcher(enabled=True, timeout_s=5)
+    prefetcher.schedule([f"{server}/page"])
+    wait(prefetcher)
+    page = prefetcher.pop(f"{server}/page")
+    assert "# Café" in page.markdown
+    assert prefetcher.stats.used == 1
+    assert prefetcher.stats.latency_saved_s == pytest.approx(
+        page.fetch_duration_s, abs=0.01
+    )
+    assert prefetcher.pop(f"{server}/page") is None
+
+
+def test_pop_waits_for_a_running_fetch(server):
+    prefetcher = Prefetcher(enabled=True, timeout_s=5)
+    prefetcher.schedule([f"{server}/slow"])
+    time.sleep(0.1)
+    page = prefetcher.pop(f"{server}/slow")
+    assert page is not None
+    # Only the part of the fetch that was not waited for is saved
+    assert prefetcher.stats.latency_saved_s < page.fetch_duration_s - 0.1
+
+
+def test_failed_fetches_are_counted_and_give_back_the_budget(server):
+    prefetcher = Prefetcher(enabled=True, timeout_s=5, max_bytes=len(PAGE) - 1)
+    # An invalid URL fails at once, the page is over the budget
+    prefetcher.schedule(["http://", f"{server}/too-large"])
+    wait(prefetcher)
+    assert prefetcher.stats.failed == 1
+    assert prefetcher.stats.fetched == 0
+    assert prefetcher._budget_used == 0
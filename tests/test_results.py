@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from results import ResultsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / "results.db"))
+
+
+def answer(task_id: str, level: int, score: int, **fields) -> dict:
+    return {
+        "task_id": task_id,
+        "question": f"Question {task_id}?",
+        "file_path": None,
+        "level": level,
+        "submitted_answer": "42",
+        "expected_answer": "42" if score else "43",
+        "score": score,
+        "duration_s": 1.5,
+        "tools": [],
+        "number_of_steps": 1,
+        **fields,
+    }
+
+
+SEARCH_ANSWER = answer(
+    "t1",
+    1,
+    1,
+    tools=["<web_search>[query]", "<calculator>[6*7]"],
+    number_of_steps=5,
+    tool_cache_hits={"web_search": 1},
+    metrics={"llm_calls": []},
+    trajectory=[
+        {"tool": "web_search", "arguments": {"query": "q"}, "observation": "found"},
+        {"tool": "calculator", "arguments": {"expression": "6*7"}, "observation": "42"},
+    ],
+)
+
+
+def test_answers_are_loaded_as_stored(store):
+    run = store.add_run("run", [SEARCH_ANSWER, answer("t2", 2, 0)])
+    loaded = store.load_answers(run, observations=True)
+    assert loaded[0] == SEARCH_ANSWER
+    assert loaded[1]["tools"] == [] and loaded[1]["trajectory"] == []
+    assert store.load_answers(run)[0]["trajectory"][0]["observation"] is None
+
+
+def test_load_answers_filters_by_level_and_tool(store):
+    run = store.add_run("run", [SEARCH_ANSWER, answer("t2", 2, 0)])
+    assert [a["task_id"] for a in store.load_answers(run, level=2)] == ["t2"]
+    assert [a["task_id"] for a in store.load_answers(run, tool="web_search")] == ["t1"]
+    assert store.load_answers(run, tool="run_python") == []
+
+
+def test_runs_are_found_by_id_or_name(store):
+    run = store.add_run("run", [])
+    assert store.find_run("run") == run
+    assert store.find_run(run) == run
+    assert store.find_run("other") is None
+    with pytest.raises(ValueError):
+        store.add_run("run", [])
+
+
+def test_runs_are_found_by_name_before_id(store):
+    first = store.add_run("first", [])
+    numeric = store.add_run(str(first), [])
+    assert store.find_run(str(first)) == numeric
+    assert store.find_run(str(numeric)) == numeric
+
+
+def test_runs_are_summarized_with_their_scores(store):
+    store.add_run("first", [answer("t1", 1, 1), answer("t2", 1, 0)], created_at=1)
+    store.add_run("second", [answer("t3", 3, 1)], created_at=2)
+    first, second = store.runs()
+    assert (first.name, first.nb_answers, first.score) == ("first", 2, 1)
+    assert first.level_scores == {1: 0.5}
+    assert second.level_scores == {3: 1.0}
+
+
+def test_task_history_follows_a_task_across_runs(store):
+    store.add_run("first", [answer("t1", 1, 0)], created_at=1)
+    store.add_run("second", [SEARCH_ANSWER], created_at=2)
+    history = store.task_history("t1")
+    assert [(row["run"], row["score"]) for row in history] == [
+        ("first", 0),
+        ("second", 1),
+    ]
+    assert history[1]["tools"] == "web_search, calculator"
+
+
+def test_import_json_files(store, tmp_path):
+    folder = tmp_path / "answers"
+    folder.mkdir()
+    name = "20250101_120000_validation_level_2"
+    with open(folder / f"{name}.json", "w") as f:
+        json.dump([answer("t1", 2, 1, tools=["<web_search>[query]"])], f)
+
+    assert store.import_json_files(str(folder)) == [name]
+    assert store.import_json_files(str(folder)) == []
+    (run,) = store.runs()
+    assert (run.name, run.dataset) == (name, "validation")
+    loaded = store.load_answers(run.id, tool="web_search")
+    assert loaded[0]["tools"] == ["<web_search>[query]"]
+
+
+def test_answers_without_duration_are_reviewed(store, monkeypatch, capsys):
+    import review
+    from evaluation import print_scores
+
+    monkeypatch.setattr(review, "results_store", store)
+    store.add_run("legacy", [answer("t1", 1, 0, duration_s=None)])
+    answers = review.load_answers("legacy")
+    assert answers[0].duration_s is None
+    print_scores(answers)
+    review.print_wrong_answers(answers)
+    review.print_task_history("t1")
+    assert "Duration" not in capsys.readouterr().out
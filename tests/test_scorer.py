@@ -0,0 +1,122 @@
+import itertools
+import warnings
+
+import pytest
+
+from scorer import (
+    classify_ground_truth,
+    normalize_number_str,
+    normalize_str,
+    question_scorer,
+    score_answer,
+    score_batch,
+    split_string,
+)
+
+GROUND_TRUTHS = [
+    "42",
+    "3.5",
+    "-7",
+    "sea gull",
+    "St. Petersburg",
+    "apple, banana, cherry",
+    "1, 2.5; 3",
+    "a; b",
+    "",
+]
+ANSWERS = [
+    None,
+    "42",
+    "$42",
+    "42%",
+    "1,000",
+    "3.50",
+    "-7",
+    "seagull",
+    "Sea Gull!",
+    "st petersburg",
+    "apple,banana,cherry",
+    "Apple, Banana, Cherry.",
+    "apple, banana",
+    "1; 2.50, 3",
+    "1, two, 3",
+    "a;b",
+    "",
+    "not a number",
+]
+
+
+def official_scorer(model_answer: str | None, ground_truth: str) -> bool:
+    """The comparison rules of the official scorer, as published."""
+
+    def is_float(element) -> bool:
+        try:
+            float(element)
+            return True
+        except ValueError:
+            return False
+
+    if model_answer is None:
+        model_answer = "None"
+    if is_float(ground_truth):
+        return normalize_number_str(model_answer) == float(ground_truth)
+    if any(char in ground_truth for char in [",", ";"]):
+        gt_elems = split_string(ground_truth)
+        ma_elems = split_string(model_answer)
+        if len(gt_elems) != len(ma_elems):
+            return False
+        return all(
+            normalize_number_str(ma_elem) == float(gt_elem)
+            if is_float(gt_elem)
+            else normalize_str(ma_elem, remove_punct=False)
+            == normalize_str(gt_elem, remove_punct=False)
+            for ma_elem, gt_elem in zip(ma_elems, gt_elems)
+        )
+    return normalize_str(model_answer) == normalize_str(ground_truth)
+
+
+def test_scores_match_the_official_scorer():
+    pairs = list(itertools.product(ANSWERS, GROUND_TRUTHS))
+    expected = [official_scorer(answer, truth) for answer, truth in pairs]
+    assert [result.score for result in score_batch(pairs)] == expected
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert [question_scorer(answer, truth) for answer, truth in pairs] == expected
+
+
+def test_question_scorer_prints_the_comparison(capsys):
+    assert not question_scorer("n/a", "42")
+    assert capsys.readouterr().out == (
+        "Evaluating n/a as a number.\nString n/a cannot be normalized to number str.\n"
+    )
+    with pytest.warns(UserWarning, match="different lengths"):
+        assert not question_scorer("a", "a, b")
+    assert question_scorer("Sea Gull", "seagull")
+    assert capsys.readouterr().out == (
+        "Evaluating a as a comma separated list.\nEvaluating Sea Gull as a string.\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "ground_truth, kind",
+    [("42", "number"), ("1e3", "number"), ("a, b", "list"), ("a; b", "list")]
+    + [("Paris", "string"), ("", "string")],
+)
+def test_classify_ground_truth(ground_truth, kind):
+    assert classify_ground_truth(ground_truth).kind == kind
+
+
+def test_score_answer():
+    assert score_answer("$1,000", "1000").score
+    assert score_answer("Sea Gull", "seagull").score
+    assert not score_answer("apple, banana", "apple, banana, cherry").score
+    assert not score_answer(None, "42").score
+    assert score_answer(None, "None").score
+
+
+def test_score_answer_does_not_print(capsys):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        score_answer("not a number", "42")
+        score_answer("a", "a, b")
+    assert capsys.readouterr().out == ""
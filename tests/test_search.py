@@ -0,0 +1,96 @@
+import pytest
+
+from tools import search
+from tools.search import (
+    SearchBackend,
+    SearchCache,
+    WebSearch,
+    normalize_query,
+    normalize_url,
+)
+from tools.workspace import Workspace
+
+
+class StubBackend(SearchBackend):
+    """Returns the given results for each query, and fails on "fail"."""
+
+    name = "stub"
+
+    def __init__(self, results: dict[str, list[dict]]):
+        self.results = results
+        self.queries: list[str] = []
+
+    def search(self, query: str, max_results: int, topic: str) -> dict:
+        self.queries.append(query)
+        if query == "fail":
+            raise ValueError("backend down")
+        return {"query": query, "results": self.results.get(query, [])[:max_results]}
+
+
+def result(url: str, score: float, content: str = "") -> dict:
+    return {"url": url, "title": url, "content": content or url, "score": score}
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    workspace = Workspace(root=str(tmp_path / "workspace"))
+    monkeypatch.setattr(search, "workspace", workspace)
+    return workspace
+
+
+def test_normalize():
+    assert normalize_query("  capital   of\tFrance ") == "capital of France"
+    assert normalize_url("HTTPS://Example.com/Page/?q=1#top") == (
+        "https://example.com/Page?q=1"
+    )
+    assert normalize_url("https://example.com") == "https://example.com/"
+
+
+def test_results_are_merged_by_url():
+    backend = StubBackend(
+        {
+            "a": [
+                result("https://x.com/1", 0.5, "from a"),
+                result("https://x.com/2", 0.9),
+            ],
+            "b": [
+                result("https://X.com/1/", 0.8, "from b"),
+                result("https://x.com/3", 0.7),
+            ],
+        }
+    )
+    web_search = WebSearch(backend=backend, cache=SearchCache(ttl_s=0))
+    results = web_search.search(["a", "b"])["results"]
+    assert [(r["url"], r["queries"], r["content"]) for r in results] == [
+        # The best rank first, then the best score
+        ("https://x.com/1", ["a", "b"], "from b"),
+        ("https://x.com/2", ["a"], "https://x.com/2"),
+        ("https://x.com/3", ["b"], "https://x.com/3"),
+    ]
+    assert results[0]["score"] == 0.8
+
+
+def test_duplicate_queries_are_searched_once():
+    backend = StubBackend({"cats": [result("https://x.com/cats", 1)]})
+    web_search = WebSearch(backend=backend, cache=SearchCache(ttl_s=0))
+    response = web_search.search(["cats", " Cats ", "", "CATS"])
+    assert response["queries"] == ["cats"]
+    assert backend.queries == ["cats"]
+
+
+def test_failed_queries_are_reported():
+    backend = StubBackend({"ok": [result("https://x.com/ok", 1)]})
+    web_search = WebSearch(backend=backend, cache=SearchCache(ttl_s=0))
+    response = web_search.search(["ok", "fail"])
+    assert [r["url"] for r in response["results"]] == ["https://x.com/ok"]
+    assert response["errors"] == {"fail": "backend down"}
+
+
+def test_responses_are_cached():
+    backend = StubBackend({"cats": [result("https://x.com/cats", 1)]})
+    web_search = WebSearch(backend=backend, cache=SearchCache(ttl_s=3600))
+    first = web_search.search(["cats", "dogs"])["results"]
+    second = web_search.search(["Cats", "dogs"])["results"]
+    assert [r["url"] for r in second] == [r["url"] for r in first]
+    # Empty responses are not cached
+    assert backend.queries == ["cats", "dogs", "dogs"]
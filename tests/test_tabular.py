@@ -0,0 +1,110 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from tools import tabular
+from tools.tabular import (
+    QueryTimeoutError,
+    _sql_value,
+    load_database,
+    query_table,
+    run_query,
+)
+from tools.workspace import Workspace
+
+CSV = 'ID,id,Name,Amount,Code\n1,10,Alice,"1,234.5",007\n2,20,Bob,12,010\n3,30,,,\n'
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    workspace = Workspace(root=str(tmp_path / "workspace"))
+    monkeypatch.setattr(tabular, "workspace", workspace)
+    return workspace
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("12", 12),
+        (" 42 ", 42),
+        ("-3.5", -3.5),
+        ("3e5", 300000.0),
+        ("1,234", 1234),
+        ("1,234.5", 1234.5),
+        ("007", "007"),
+        ("1_000", "1_000"),
+        ("1,2,3", "1,2,3"),
+        ("12 kg", "12 kg"),
+        ("", None),
+        (True, 1),
+        (2.5, 2.5),
+        (None, None),
+        (datetime.date(2024, 1, 2), "2024-01-02"),
+    ],
+)
+def test_sql_value(value, expected):
+    result = _sql_value(value)
+    assert result == expected and type(result) is type(expected)
+
+
+def test_headers_differing_by_case_are_loaded(csv_path):
+    db_path = load_database(csv_path)
+    assert run_query(db_path, 'SELECT "ID", "id_" FROM data ORDER BY 1') == (
+        "| ID | id_ |\n|---|---|\n| 1 | 10 |\n| 2 | 20 |\n| 3 | 30 |"
+    )
+
+
+def test_values_are_typed(csv_path):
+    db_path = load_database(csv_path)
+    assert run_query(
+        db_path, 'SELECT SUM("Amount"), MAX("Code"), COUNT("Name") FROM data'
+    ) == (
+        '| SUM("Amount") | MAX("Code") | COUNT("Name") |\n|---|---|---|\n'
+        "| 1246.5 | 010 | 2 |"
+    )
+
+
+def test_the_database_is_loaded_once(csv_path, workspace):
+    db_path = load_database(csv_path)
+    assert load_database(csv_path) == db_path
+    assert workspace.lookup(f"sqlite://{workspace.file_hash(csv_path)}") == db_path
+
+
+def test_rows_are_limited(csv_path):
+    result = run_query(load_database(csv_path), "SELECT * FROM data", max_rows=2)
+    assert result == (
+        "| ID | id_ | Name | Amount | Code |\n|---|---|---|---|---|\n"
+        "| 1 | 10 | Alice | 1234.5 | 007 |\n| 2 | 20 | Bob | 12 | 010 |\n\n"
+        "Only the first 2 rows are shown."
+    )
+
+
+def test_queries_are_read_only(csv_path):
+    with pytest.raises(sqlite3.Error):
+        run_query(load_database(csv_path), "DELETE FROM data")
+
+
+def test_long_queries_time_out(csv_path):
+    query = (
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+        "SELECT COUNT(*) FROM n"
+    )
+    with pytest.raises(QueryTimeoutError):
+        run_query(load_database(csv_path), query, timeout_s=0.1)
+
+
+def test_query_table(csv_path):
+    description = query_table.invoke({"file_path": csv_path})
+    assert description.startswith("## Table: data\nRows: 3")
+    assert "| Amount | integer, real |" in description
+    assert query_table.invoke({"file_path": csv_path, "sql": "SELECT x"}).startswith(
+        "The query failed:"
+    )
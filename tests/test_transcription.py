@@ -0,0 +1,92 @@
+import itertools
+import subprocess
+
+import pytest
+
+from tools import transcription
+from tools.transcription import (
+    CUT_TOLERANCE,
+    Transcript,
+    TranscriptStore,
+    detect_silences,
+    plan_chunks,
+)
+from tools.workspace import Workspace
+
+
+def assert_contiguous(chunks, duration_s):
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == duration_s
+    for (_, end), (start, _) in itertools.pairwise(chunks):
+        assert end == start
+
+
+def test_short_file_is_one_chunk():
+    assert plan_chunks(100, [], nb_chunks=1) == [(0.0, 100)]
+
+
+def test_chunks_are_cut_in_the_middle_of_silences():
+    silences = [(95, 97), (190, 192), (310, 312)]
+    chunks = plan_chunks(400, silences, nb_chunks=4, max_chunk_s=1000)
+    assert chunks == [(0.0, 96), (96, 191), (191, 311), (311, 400)]
+
+
+def test_chunks_are_cut_without_silence_when_none_is_close():
+    # The only silence is too far from the target ends
+    chunks = plan_chunks(300, [(10, 12)], nb_chunks=3, max_chunk_s=1000)
+    assert chunks == [(0.0, 100), (100, 200), (200, 300)]
+
+
+def test_chunks_do_not_exceed_the_maximum_duration():
+    chunks = plan_chunks(1000, [], nb_chunks=2, max_chunk_s=150)
+    assert_contiguous(chunks, 1000)
+    assert all(end - start <= 150 * (1 + CUT_TOLERANCE) for start, end in chunks)
+    assert all(end - start <= 150 for start, end in chunks[:-1])
+
+
+def test_silence_beyond_the_maximum_duration_is_not_used():
+    chunks = plan_chunks(400, [(215, 225)], nb_chunks=2, max_chunk_s=210)
+    assert_contiguous(chunks, 400)
+    assert chunks[0] == (0.0, 200)
+
+
+@pytest.mark.parametrize("duration_s", [61.5, 600, 3599.9])
+@pytest.mark.parametrize("nb_chunks", [1, 3, 8])
+def test_chunks_cover_the_whole_file(duration_s, nb_chunks):
+    silences = [(t, t + 1) for t in range(20, int(duration_s), 45)]
+    chunks = plan_chunks(duration_s, silences, nb_chunks, max_chunk_s=500)
+    assert_contiguous(chunks, duration_s)
+    assert all(end > start for start, end in chunks)
+
+
+def test_detect_silences(monkeypatch):
+    stderr = (
+        "  Duration: 00:01:30.50, start: 0.000000, bitrate: 128 kb/s\n"
+        "[silencedetect @ 0x1] silence_start: -0.01\n"
+        "[silencedetect @ 0x1] silence_end: 1.2 | silence_duration: 1.21\n"
+        "[silencedetect @ 0x1] silence_start: 40\n"
+        "[silencedetect @ 0x1] silence_end: 41.5 | silence_duration: 1.5\n"
+        "[silencedetect @ 0x1] silence_start: 89.9\n"
+    )
+    monkeypatch.setattr(
+        transcription,
+        "_run_ffmpeg",
+        lambda *args: subprocess.CompletedProcess(args, 0, "", stderr),
+    )
+    assert detect_silences("audio.mp3") == (
+        90.5,
+        [(0.0, 1.2), (40.0, 41.5), (89.9, 90.5)],
+    )
+
+
+def test_transcripts_are_not_evicted(tmp_path, monkeypatch):
+    workspace = Workspace(root=str(tmp_path / "workspace"), max_bytes=1000)
+    monkeypatch.setattr(transcription, "workspace", workspace)
+    store = TranscriptStore()
+    transcript = Transcript(text="Hello", srt="", source="whisper")
+    store.put(["youtube:abc", "url:https://example.com/abc"], transcript)
+    for i in range(5):
+        workspace.store(f"key://{i}", [bytes([i]) * 400])
+    assert store.get("youtube:abc") == transcript
+    assert store.get("url:https://example.com/abc") == transcript
+    assert workspace.lookup("key://0") is None
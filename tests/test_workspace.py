@@ -0,0 +1,159 @@
+import http.server
+import os
+import threading
+import time
+
+import pytest
+
+from tools import http_client
+from tools.workspace import Workspace
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return Workspace(root=str(tmp_path / "workspace"), max_bytes=1000, max_age_s=3600)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves a new body on each request, with the headers of its path."""
+
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        etag = '"v1"'
+        if self.path == "/not-modified" or (
+            self.path == "/etag" and self.headers.get("If-None-Match") == etag
+        ):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = f"body {type(self).requests}".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/etag":
+            self.send_header("ETag", etag)
+        elif self.path == "/no-cache":
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_store_and_lookup(workspace):
+    path = workspace.store("zip://a", [b"hello ", b"world"], ".txt")
+    assert read(path) == "hello world"
+    assert workspace.lookup("zip://a") == path
+    assert workspace.lookup("zip://b") is None
+
+
+def test_same_content_is_stored_once(workspace):
+    first = workspace.store("zip://a", [b"content"])
+    second = workspace.store("zip://b", [b"content"])
+    assert first == second
+    assert len(os.listdir(workspace.blobs_dir)) == 1
+
+
+def test_store_file_moves_the_file_to_the_blob_store(workspace):
+    path = workspace.new_blob_path(".db")
+    with open(path, "w") as f:
+        f.write("database")
+    stored = workspace.store_file("sqlite://a", path, ".db")
+    assert stored.endswith(".db") and read(stored) == "database"
+    assert workspace.lookup("sqlite://a") == stored
+
+
+def test_quota_evicts_the_least_recently_used_blobs(workspace):
+    workspace.store("key://a", [b"a" * 400])
+    workspace.store("key://b", [b"b" * 400])
+    # Use a, so that b is the least recently used
+    time.sleep(0.01)
+    workspace.lookup("key://a")
+    workspace.store("key://c", [b"c" * 400])
+    assert workspace.lookup("key://a") is not None
+    assert workspace.lookup("key://b") is None
+    assert workspace.lookup("key://c") is not None
+
+
+def test_quota_keeps_the_blobs_of_the_current_question(workspace):
+    workspace.begin_question()
+    a = workspace.store("key://a", [b"a" * 400])
+    workspace.store("key://b", [b"b" * 400])
+    workspace.store("key://c", [b"c" * 400])
+    # Over the quota, but the agent may still open a and b
+    assert os.path.exists(a)
+    assert workspace.lookup("key://b") is not None
+    workspace.end_question()
+
+    workspace.store("key://d", [b"d" * 400])
+    assert workspace.lookup("key://a") is None
+
+
+def blob_files(workspace) -> list[str]:
+    return sorted(os.listdir(workspace.blobs_dir))
+
+
+def test_failed_download_leaves_no_file(workspace, server, monkeypatch):
+    workspace.store("key://a", [b"a"])
+    files = blob_files(workspace)
+
+    def write_response(response, path):
+        raise http_client.DownloadTooLargeError("too large")
+
+    monkeypatch.setattr(http_client, "write_response", write_response)
+    with pytest.raises(http_client.DownloadTooLargeError):
+        workspace.fetch(f"{server}/plain")
+    assert blob_files(workspace) == files
+
+
+def test_unexpected_not_modified_is_an_error(workspace, server):
+    with pytest.raises(ValueError, match="304"):
+        workspace.fetch(f"{server}/not-modified")
+    assert workspace.lookup(f"{server}/not-modified") is None
+
+
+def test_fetch_revalidates_with_the_etag(workspace, server):
+    first = workspace.fetch(f"{server}/etag")
+    assert workspace.fetch(f"{server}/etag") == first
+    assert read(first) == "body 1"
+    assert _Handler.requests == 2
+
+
+def test_fetch_reuses_a_download_without_validators_until_it_expires(workspace, server):
+    assert read(workspace.fetch(f"{server}/plain")) == "body 1"
+    assert read(workspace.fetch(f"{server}/plain")) == "body 1"
+    assert _Handler.requests == 1
+
+    workspace.max_age_s = 0
+    assert read(workspace.fetch(f"{server}/other")) == "body 2"
+    assert read(workspace.fetch(f"{server}/other")) == "body 3"
+
+
+def test_fetch_honours_cache_control(workspace, server):
+    assert read(workspace.fetch(f"{server}/no-cache")) == "body 1"
+    assert read(workspace.fetch(f"{server}/no-cache")) == "body 2"
+
+
+def test_scratch_folder_is_removed_when_the_question_ends(workspace):
+    scratch = workspace.begin_question("task")
+    assert os.path.isdir(scratch) and workspace.scratch_dir() == scratch
+    workspace.end_question()
+    assert not os.path.exists(scratch)
@@ -0,0 +1,71 @@
+import pytest
+
+from tools.xml_markdown import xml_to_markdown
+
+WORDML = "http://schemas.microsoft.com/office/word/2003/wordml"
+
+
+@pytest.fixture
+def convert(tmp_path):
+    def convert(xml: str, **kwargs) -> str:
+        path = tmp_path / "file.xml"
+        path.write_text(xml, encoding="utf-8")
+        return xml_to_markdown(str(path), **kwargs)
+
+    return convert
+
+
+def test_records_with_fields_and_attributes(convert):
+    assert convert(
+        '<rows><row id="1"><name>a</name></row>'
+        '<row id="2"><name>b</name><extra>x</extra></row></rows>'
+    ) == (
+        "## row records\n| id | name | extra |\n|---|---|---|\n| 1 | a |  |\n| 2 | b | x |"
+    )
+
+
+def test_records_with_a_single_field(convert):
+    assert convert(
+        '<a:root xmlns:a="urn:x"><a:item><a:v>1</a:v></a:item>'
+        "<a:item><a:v>2</a:v></a:item></a:root>"
+    ) == ("## item records\n| v |\n|---|\n| 1 |\n| 2 |")
+
+
+def test_html_like_rows_are_positional(convert):
+    assert convert(
+        "<table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2</td></tr>"
+        "<tr><td>3</td></tr></table>"
+    ) == ("## tr records\n| a | b |\n|---|---|\n| 1 | 2 |\n| 3 |  |")
+
+
+def test_elements_around_the_records_are_kept(convert):
+    assert convert(
+        "<rss><channel><title>Feed</title><image><url>http://i</url></image>"
+        "<item><title>1</title><link>a</link></item>"
+        "<item><title>2</title><link>b</link></item></channel></rss>"
+    ) == (
+        "title: Feed\nurl: http://i\n"
+        "## item records\n| title | link |\n|---|---|\n| 1 | a |\n| 2 | b |"
+    )
+
+
+def test_other_documents_are_converted_as_text(convert):
+    assert convert("<doc><p>Hello</p><p>World <b>x</b></p></doc>") == (
+        "p: Hello\nb: x\np: World"
+    )
+
+
+def test_wordml_paragraphs(convert):
+    assert convert(
+        f'<w:wordDocument xmlns:w="{WORDML}"><w:body>'
+        "<w:p><w:r><w:t>Hello </w:t></w:r><w:r><w:t>world</w:t></w:r></w:p><w:p/>"
+        "<w:p><w:r><w:t>Second</w:t></w:r></w:p></w:body></w:wordDocument>"
+    ) == ("Hello world\nSecond")
+
+
+def test_the_output_is_truncated_to_the_budget(convert):
+    rows = "".join(f"<row><v>{i}</v></row>" for i in range(100))
+    markdown = convert(f"<rows>{rows}</rows>", max_chars=60)
+    assert markdown.endswith("...TRUNCATED after 60 characters")
+    assert len(markdown) < 100
+    assert convert(f"<rows>{rows}</rows>", max_chars=None).endswith("| 99 |")
@@ -1,23 +1,55 @@
-from .browser import get_browser_tools
-from .files import load_file_or_url, unzip
-from .misc import run_python, calculator, chess, convert_unit
-from .search import web_search_tool
-from .semantic import semantic_tools
-from .images import analyze_image
-from .audio import analyze_audio
-from .videos import get_video_transcript
-
-__all__ = [
-    "load_file_or_url",
-    "run_python",
-    "calculator",
-    "chess",
-    "web_search_tool",
-    "semantic_tools",
-    "analyze_image",
-    "analyze_audio",
-    "get_video_transcript",
-    "get_browser_tools",
-    "convert_unit",
-    "unzip",
-]
+"""The tools of the agent.
+
+The tools are loaded lazily: a tool module, and the dependencies it imports, are only
+imported the first time one of its names is accessed. Heavy dependencies used by a
+tool are imported when it is first called.
+"""
+
+import importlib
+
+# Shared by the tools, and light to import. The workspace is imported eagerly since
+# importing the tools.workspace module would otherwise shadow it with the module.
+from .cassette import cassette
+from .prefetch import prefetcher
+from .tracing import tracer
+from .workspace import workspace
+
+# Record or replay the network I/O of the agent and the tools, if enabled
+cassette.install()
+
+# The public names of the package, and the module defining each of them
+_REGISTRY = {
+    "get_browser_tools": ".browser",
+    "load_file_or_url": ".files",
+    "unzip": ".files",
+    "load_zip_member": ".files",
+    "query_table": ".tabular",
+    "run_python": ".misc",
+    "calculator": ".misc",
+    "chess": ".misc",
+    "convert_unit": ".misc",
+    "web_search_tool": ".search",
+    "search_archive": ".archive",
+    "page_archive": ".archive",
+    "semantic_tools": ".semantic",
+    "analyze_image": ".images",
+    "analyze_audio": ".audio",
+    "get_video_transcript": ".videos",
+    "memoize_tools": ".memoize",
+    "tool_cache": ".memoize",
+}
+
+__all__ = [*_REGISTRY, "cassette", "prefetcher", "tracer", "workspace"]
+
+
+def __getattr__(name: str):
+    if name not in _REGISTRY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_REGISTRY[name], __name__), name)
+    # Cache the value, so that this function is not called again for this name
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,335 @@
+"""Local archive of the pages and documents fetched by the tools, with a full-text index.
+
+The agent fetches the same reference pages again and again, across questions and
+runs. Every page and document converted by the browser and file tools is archived
+as text in a SQLite database of the workspace: compressed with zlib, and stored once
+per content hash, whatever the number of URLs it was fetched from. An FTS5 index of
+the archive backs the search_archive tool, which the agent can call before going to
+the network, and the pages archived earlier in the run are served from the archive
+instead of being fetched again. Serving the pages archived by previous runs is opt-in,
+since they may be stale. The tools tell the agent that a page comes from the archive,
+and when it was fetched.
+
+The hits of the archive are counted per question, with the network bytes and the
+fetch time they saved.
+"""
+
+import contextlib
+import dataclasses
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from langchain_core.tools import tool
+
+import settings
+
+# Characters of context shown around the first match of a search result
+SNIPPET_CHARS = 300
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclasses.dataclass
+class ArchivedPage:
+    url: str
+    title: str | None
+    text: str
+    fetched_at: float
+
+    def describe(self) -> str:
+        """Tell the agent that the page comes from the archive, and how old it is."""
+        fetched_at = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(self.fetched_at))
+        return f"archived copy, fetched at {fetched_at}"
+
+
+@dataclasses.dataclass
+class ArchiveSearchResult:
+    url: str
+    title: str | None
+    snippet: str
+
+
+@dataclasses.dataclass
+class ArchiveStats:
+    lookups: int = 0
+    hits: int = 0
+    searches: int = 0
+    searches_with_results: int = 0
+    bytes_saved: int = 0
+    latency_saved_s: float = 0.0
+
+
+def make_snippet(text: str, terms: list[str], size: int = SNIPPET_CHARS) -> str:
+    """Return the part of a text around the first occurrence of its rarest term."""
+    lowered = text.lower()
+    counts = {term: lowered.count(term) for term in terms}
+    found = [term for term in terms if counts[term]]
+    position = lowered.find(min(found, key=counts.get)) if found else 0
+    start = max(0, position - size // 3)
+    snippet = " ".join(text[start : start + size].split())
+    return ("..." if start > 0 else "") + snippet + "..."
+
+
+class PageArchive:
+    """Archive of the converted pages, indexed for full-text search.
+
+    The statistics are scoped to a question: call `reset` when the question ends.
+    """
+
+    def __init__(
+        self,
+        path: str = os.path.join(settings.WORKSPACE_DIR, "archive.db"),
+        max_age_s: float = settings.ARCHIVE_MAX_AGE_S,
+        max_bytes: int = settings.ARCHIVE_MAX_BYTES,
+        reuse_previous_runs: bool = settings.ARCHIVE_REUSE_PREVIOUS_RUNS,
+    ):
+        self.path = path
+        self.max_age_s = max_age_s
+        self.max_bytes = max_bytes
+        self.reuse_previous_runs = reuse_previous_runs
+        # Pages archived before are from previous runs
+        self.run_started_at = time.time()
+        self.stats = ArchiveStats()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a transaction on the archive, creating it on first use."""
+        with self._lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            try:
+                if not self._initialized:
+                    self._create_tables(connection)
+                    self._initialized = True
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection) -> None:
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                hash TEXT UNIQUE NOT NULL,
+                title TEXT,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                document INTEGER NOT NULL REFERENCES documents (id),
+                fetched_at REAL NOT NULL,
+                fetch_bytes INTEGER NOT NULL,
+                fetch_duration_s REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_document ON pages (document);
+            -- Contentless index: the text is only stored, compressed, in documents
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_index USING fts5 (
+                title, content, content='', tokenize='porter unicode61'
+            );
+            """
+        )
+
+    def add(
+        self,
+        url: str,
+        title: str | None,
+        text: str,
+        fetch_bytes: int = 0,
+        fetch_duration_s: float = 0.0,
+    ) -> None:
+        """Archive a page or a document fetched from a URL.
+
+        Args:
+            url (str): The URL it was fetched from.
+            title (str | None): Its title.
+            text (str): Its text, e.g. converted to markdown.
+            fetch_bytes (int, optional): The bytes downloaded to fetch it.
+            fetch_duration_s (float, optional): The time taken to fetch and convert it.
+        """
+        if not text.strip():
+            return
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._connect() as connection:
+            previous = connection.execute(
+                "SELECT document FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            row = connection.execute(
+                "SELECT id FROM documents WHERE hash = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                document = connection.execute(
+                    "INSERT INTO documents (hash, title, content, size) VALUES (?, ?, ?, ?)",
+                    (digest, title, zlib.compress(data), len(data)),
+                ).lastrowid
+                connection.execute(
+                    "INSERT INTO documents_index (rowid, title, content) VALUES (?, ?, ?)",
+                    (document, title or "", text),
+                )
+            else:
+                document = row[0]
+            connection.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, document, fetched_at, fetch_bytes, fetch_duration_s) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, document, time.time(), fetch_bytes, fetch_duration_s),
+            )
+            # The previous content of a page that changed is not needed anymore
+            if previous is not None and previous[0] != document:
+                self._delete_if_unused(connection, previous[0])
+            self._enforce_limit(connection)
+
+    @staticmethod
+    def _delete_if_unused(connection: sqlite3.Connection, document: int) -> int:
+        """Delete a document, and its index entry, if no page points to it anymore.
+
+        Returns:
+            int: The size of the text deleted.
+        """
+        if connection.execute(
+            "SELECT 1 FROM pages WHERE document = ? LIMIT 1", (document,)
+        ).fetchone():
+            return 0
+        row = connection.execute(
+            "SELECT title, content, size FROM documents WHERE id = ?", (document,)
+        ).fetchone()
+        if row is None:
+            return 0
+        title, content, size = row
+        # A contentless index is deleted from with the values that were indexed
+        connection.execute(
+            "INSERT INTO documents_index (documents_index, rowid, title, content) "
+            "VALUES ('delete', ?, ?, ?)",
+            (document, title or "", zlib.decompress(content).decode("utf-8")),
+        )
+        connection.execute("DELETE FROM documents WHERE id = ?", (document,))
+        return size
+
+    def _enforce_limit(self, connection: sqlite3.Connection) -> None:
+        """Delete the pages fetched least recently, until the archive fits its limit."""
+        total_size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM documents"
+        ).fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        pages = connection.execute(
+            "SELECT url, document FROM pages ORDER BY fetched_at"
+        ).fetchall()
+        for url, document in pages:
+            if total_size <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total_size -= self._delete_if_unused(connection, document)
+
+    def get(self, url: str) -> ArchivedPage | None:
+        """Return the archived copy of a URL, if it was fetched recently enough.
+
+        Only the pages archived by the current run are returned, unless
+        reuse_previous_runs is set.
+        """
+        if self.max_age_s <= 0:
+            return None
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT title, content, fetched_at, fetch_bytes, fetch_duration_s "
+                "FROM pages JOIN documents ON documents.id = pages.document "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+            self.stats.lookups += 1
+            if row is None or time.time() - row[2] > self.max_age_s:
+                return None
+            if not self.reuse_previous_runs and row[2] < self.run_started_at:
+                return None
+            title, content, fetched_at, fetch_bytes, fetch_duration_s = row
+            self.stats.hits += 1
+            self.stats.bytes_saved += fetch_bytes
+            self.stats.latency_saved_s += fetch_duration_s
+        return ArchivedPage(
+            url=url,
+            title=title,
+            text=zlib.decompress(content).decode("utf-8"),
+            fetched_at=fetched_at,
+        )
+
+    def search(self, query: str, limit: int = 5) -> list[ArchiveSearchResult]:
+        """Search the archive, ranking the documents with BM25.
+
+        A document matches when it contains any of the words of the query, the
+        documents containing more of them, or rarer ones, ranking first.
+        """
+        terms = [term.lower() for term in _WORD_RE.findall(query)]
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        with self._connect() as connection:
+            self.stats.searches += 1
+            if not terms:
+                return []
+            rows = connection.execute(
+                """
+                SELECT
+                    (SELECT url FROM pages WHERE document = documents.id
+                     ORDER BY fetched_at DESC LIMIT 1),
+                    documents.title,
+                    documents.content
+                FROM documents_index
+                JOIN documents ON documents.id = documents_index.rowid
+                WHERE documents_index MATCH ?
+                    AND EXISTS (SELECT 1 FROM pages WHERE document = documents.id)
+                ORDER BY bm25(documents_index, 4.0, 1.0)
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+            if rows:
+                self.stats.searches_with_results += 1
+        return [
+            ArchiveSearchResult(
+                url=url,
+                title=title,
+                snippet=make_snippet(zlib.decompress(content).decode("utf-8"), terms),
+            )
+            for url, title, content in rows
+        ]
+
+    def reset(self) -> ArchiveStats:
+        """Return the statistics of the question that just ended, and reset them."""
+        with self._lock:
+            stats = self.stats
+            self.stats = ArchiveStats()
+        return stats
+
+
+page_archive = PageArchive()
+
+
+@tool
+def search_archive(query: str) -> str:
+    """Search the pages and documents already fetched, in this and previous runs.
+
+    Search the archive before the web: it answers instantly, and its pages open
+    without any download. Open a result with load_file_or_url to read it in full.
+
+    Args:
+        query (str): The words to search for.
+
+    Returns:
+        str: The URL, title and an excerpt of the best matching pages.
+    """
+    results = page_archive.search(query)
+    if not results:
+        return f"No archived page matches '{query}'. Search the web instead."
+    return "\n\n".join(
+        f"URL: {result.url}\nTitle: {result.title or ''}\n{result.snippet}"
+        for result in results
+    )
@@ -1,9 +1,15 @@
 import base64
 import os
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 
 import settings
+from .transcription import compress_audio
+from .workspace import workspace
+
+# Formats accepted by the audio model
+AUDIO_FORMATS = {"mp3", "wav"}
+# Larger files are downmixed to a compact mono MP3 before being sent inline
+MAX_INLINE_BYTES = 5 * 1024 * 1024
 
 
 @tool
@@ -20,12 +26,22 @@ def analyze_audio(prompt: str, audio_file_path: str) -> str:
     if not os.path.exists(audio_file_path):
         raise ValueError(f"Audio file {audio_file_path} does not exist")
 
+    format = os.path.splitext(audio_file_path)[1].strip(".").lower()
+    if (
+        format not in AUDIO_FORMATS
+        or os.path.getsize(audio_file_path) > MAX_INLINE_BYTES
+    ):
+        compressed_path = os.path.join(
+            workspace.scratch_dir(),
+            os.path.splitext(os.path.basename(audio_file_path))[0] + ".mp3",
+        )
+        audio_file_path = compress_audio(audio_file_path, compressed_path)
+        format = os.path.splitext(audio_file_path)[1].strip(".").lower()
+
     with open(audio_file_path, "rb") as f:
-        # b64 encode it
-        audio = f.read()
-        audio_b64 = base64.b64encode(audio).decode()
+        audio_b64 = base64.b64encode(f.read()).decode()
 
-    format = os.path.splitext(audio_file_path)[1].strip(".")
+    from langchain_openai import ChatOpenAI
 
     llm = ChatOpenAI(
         model="gpt-4o-audio-preview",
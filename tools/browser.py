@@ -1,96 +1,438 @@
-from typing import Optional
-from bs4 import BeautifulSoup
-import markdownify
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Type
+from urllib.parse import urlparse
+
+from pydantic import BaseModel, Field, model_validator
 from langchain_core.callbacks import (
     CallbackManagerForToolRun,
     AsyncCallbackManagerForToolRun,
 )
-from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
-from langchain_community.tools.playwright.utils import (
-    create_sync_playwright_browser,
-    create_async_playwright_browser,
+from langchain_core.tools import BaseTool
+
+import settings
+from .archive import ArchivedPage, page_archive
+from .cassette import cassette
+from .html_markdown import (
+    decode_html,
+    html_to_markdown,
+    markdown_headings,
+    markdown_section,
 )
-from langchain_community.tools.playwright.extract_text import ExtractTextTool
-from langchain_community.tools.playwright.utils import (
-    aget_current_page,
-    get_current_page,
+from .http_client import get, read_response
+from .prefetch import prefetcher
+from .tracing import tracer
+
+# -----------------------------------------
+# Browser session
+
+# Resources that are never needed to extract the content of a page
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# Minimum amount of visible text for a plain HTTP response to be used as is
+MIN_STATIC_TEXT_CHARS = 200
+# Maximum amount of visible text of a page that only asks to enable JavaScript
+JS_NOTICE_MAX_TEXT_CHARS = 1000
+
+_SCRIPT_OR_STYLE_RE = re.compile(
+    r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
 )
+_TAG_RE = re.compile(r"<[^>]+>")
+_JS_REQUIRED_RE = re.compile(
+    r"(enable|turn on|requires?)\s+javascript|javascript\s+(is\s+)?(required|disabled)",
+    re.IGNORECASE,
+)
+
+
+def is_static_html(html_content: str) -> bool:
+    """Check whether an HTML document can be read without running its scripts.
+
+    Pages rendered client-side (single page apps, JS challenges) ship an almost
+    empty body, or a short notice asking the user to enable JavaScript. Longer
+    texts that mention JavaScript, e.g. articles, are readable as is.
+    """
+    visible_text = _TAG_RE.sub(" ", _SCRIPT_OR_STYLE_RE.sub(" ", html_content))
+    visible_text = " ".join(visible_text.split())
+    if len(visible_text) < MIN_STATIC_TEXT_CHARS:
+        return False
+    return (
+        len(visible_text) > JS_NOTICE_MAX_TEXT_CHARS
+        or _JS_REQUIRED_RE.search(visible_text) is None
+    )
+
+
+def content_hash(html_content: str) -> str:
+    return hashlib.blake2b(html_content.encode(), digest_size=16).hexdigest()
+
+
+class PageCache:
+    """LRU cache of pages converted to markdown, keyed by URL and content hash.
+
+    The hash makes sure that a page whose DOM changed since it was converted (e.g.
+    content loaded dynamically) is converted again.
+    """
+
+    def __init__(self, max_pages: int = 64):
+        self.max_pages = max_pages
+        self._pages: OrderedDict[tuple[str, str], str] = OrderedDict()
+
+    def get(self, url: str, html_hash: str) -> str | None:
+        markdown = self._pages.get((url, html_hash))
+        if markdown is not None:
+            self._pages.move_to_end((url, html_hash))
+        return markdown
+
+    def put(self, url: str, html_hash: str, markdown: str) -> None:
+        self._pages[(url, html_hash)] = markdown
+        self._pages.move_to_end((url, html_hash))
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+
+class BrowserSession:
+    """State shared by the browser tools.
+
+    Pages are first fetched with a plain HTTP request. Playwright is only launched,
+    lazily, for pages that need JavaScript to render their content.
+    """
+
+    def __init__(
+        self,
+        navigation_timeout_ms: int = settings.BROWSER_NAVIGATION_TIMEOUT_MS,
+        http_timeout_s: float = settings.BROWSER_HTTP_TIMEOUT_S,
+    ):
+        self.navigation_timeout_ms = navigation_timeout_ms
+        self.http_timeout_s = http_timeout_s
+        self.current_url: str | None = None
+        # HTML of the current page when it was obtained without Playwright
+        self.static_html: str | None = None
+        self.static_html_hash: str | None = None
+        # Copy of the current page served by the archive, instead of being fetched
+        self.archived_page: ArchivedPage | None = None
+        # Time taken to fetch the current page
+        self.fetch_duration_s = 0.0
+        self.page_cache = PageCache()
+        self._async_browser = None
+        self._sync_browser = None
+        self._routed_contexts: set[int] = set()
+
+    def fetch_static(self, url: str) -> str | None:
+        """Fetch a page with a plain HTTP GET.
+
+        Returns:
+            str | None: The HTML of the page, or None if the page needs a real browser.
+        """
+        try:
+            # Stream the response, not to download the body of non-HTML resources
+            with get(url, timeout=self.http_timeout_s, stream=True) as response:
+                content_type = response.headers.get("Content-Type", "")
+                if response.status_code != 200 or "html" not in content_type:
+                    return None
+                html_content = decode_html(read_response(response), content_type)
+        except Exception as e:
+            print(f"HTTP fetch of {url} failed, falling back to the browser: {e}")
+            return None
+        if not is_static_html(html_content):
+            return None
+        return html_content
+
+    def use_archived_page(self, url: str) -> bool:
+        """Make the archived copy of a page the current page, if it is recent enough.
+
+        Returns:
+            bool: Whether an archived page was used.
+        """
+        page = page_archive.get(url)
+        if page is None:
+            return False
+        self.current_url = url
+        self.static_html = None
+        self.static_html_hash = None
+        self.archived_page = page
+        return True
+
+    def use_prefetched_page(self, url: str) -> bool:
+        """Make a page prefetched in the background the current page, if available.
+
+        Returns:
+            bool: Whether a prefetched page was used.
+        """
+        page = prefetcher.pop(url)
+        if page is None or not is_static_html(page.html):
+            return False
+        self.set_static_page(url, page.html, page.fetch_duration_s)
+        self.page_cache.put(url, self.static_html_hash, page.markdown)
+        page_archive.add(
+            url,
+            page.title,
+            page.markdown,
+            fetch_bytes=len(page.html.encode()),
+            fetch_duration_s=page.fetch_duration_s,
+        )
+        return True
+
+    def set_static_page(
+        self, url: str, html_content: str, fetch_duration_s: float
+    ) -> None:
+        self.current_url = url
+        self.static_html = html_content
+        self.static_html_hash = content_hash(html_content)
+        self.archived_page = None
+        self.fetch_duration_s = fetch_duration_s
+
+    def set_browser_page(self, url: str, fetch_duration_s: float) -> None:
+        self.current_url = url
+        self.static_html = None
+        self.static_html_hash = None
+        self.archived_page = None
+        self.fetch_duration_s = fetch_duration_s
+
+    @staticmethod
+    async def _ablock_resources(route) -> None:
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        elif cassette.enabled:
+            await cassette.aroute(route)
+        else:
+            await route.continue_()
+
+    @staticmethod
+    def _block_resources(route) -> None:
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            route.abort()
+        elif cassette.enabled:
+            cassette.route(route)
+        else:
+            route.continue_()
+
+    async def aget_page(self):
+        """Return the current Playwright page, launching the browser if needed."""
+        # Imported here, since this module loads all the playwright tools of
+        # langchain_community
+        from langchain_community.tools.playwright.utils import (
+            aget_current_page,
+            create_async_playwright_browser,
+        )
+
+        if self._async_browser is None:
+            self._async_browser = create_async_playwright_browser()
+        page = await aget_current_page(self._async_browser)
+        if id(page.context) not in self._routed_contexts:
+            await page.context.route("**/*", self._ablock_resources)
+            self._routed_contexts.add(id(page.context))
+        return page
+
+    def get_page(self):
+        """Return the current Playwright page, launching the browser if needed."""
+        from langchain_community.tools.playwright.utils import (
+            create_sync_playwright_browser,
+            get_current_page,
+        )
+
+        if self._sync_browser is None:
+            self._sync_browser = create_sync_playwright_browser()
+        page = get_current_page(self._sync_browser)
+        if id(page.context) not in self._routed_contexts:
+            page.context.route("**/*", self._block_resources)
+            self._routed_contexts.add(id(page.context))
+        return page
+
 
 # -----------------------------------------
 # Browser tools
 
 
-class ExtractMarkdownTool(ExtractTextTool):
+class NavigateToolInput(BaseModel):
+    """Input of the navigate tool, as in langchain_community."""
+
+    url: str = Field(..., description="url to navigate to")
+
+    @model_validator(mode="before")
+    @classmethod
+    def validate_url_scheme(cls, values: dict) -> dict:
+        if urlparse(values.get("url")).scheme not in ("http", "https"):
+            raise ValueError("URL scheme must be 'http' or 'https'")
+        return values
+
+
+class NavigateTool(BaseTool):
+    name: str = "navigate_browser"
+    description: str = "Navigate a browser to the specified URL"
+    args_schema: Type[BaseModel] = NavigateToolInput
+    session: BrowserSession
+
+    def _run(
+        self, url: str, run_manager: Optional[CallbackManagerForToolRun] = None
+    ) -> str:
+        """Use the tool."""
+        if self.session.use_archived_page(url):
+            return (
+                f"Navigating to {url} returned its "
+                f"{self.session.archived_page.describe()}"
+            )
+        if self.session.use_prefetched_page(url):
+            return f"Navigating to {url} returned status code 200"
+        start_time = time.perf_counter()
+        with tracer.span("navigate static", "browser", url=url):
+            html_content = self.session.fetch_static(url)
+        if html_content is not None:
+            self.session.set_static_page(
+                url, html_content, time.perf_counter() - start_time
+            )
+            return f"Navigating to {url} returned status code 200"
+
+        page = self.session.get_page()
+        with tracer.span("navigate browser", "browser", url=url):
+            response = page.goto(
+                url,
+                wait_until="domcontentloaded",
+                timeout=self.session.navigation_timeout_ms,
+            )
+        self.session.set_browser_page(url, time.perf_counter() - start_time)
+        status = response.status if response else "unknown"
+        return f"Navigating to {url} returned status code {status}"
+
+    async def _arun(
+        self, url: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+    ) -> str:
+        """Use the tool."""
+        if self.session.use_archived_page(url):
+            return (
+                f"Navigating to {url} returned its "
+                f"{self.session.archived_page.describe()}"
+            )
+        if self.session.use_prefetched_page(url):
+            return f"Navigating to {url} returned status code 200"
+        start_time = time.perf_counter()
+        with tracer.span("navigate static", "browser", url=url):
+            html_content = await asyncio.to_thread(self.session.fetch_static, url)
+        if html_content is not None:
+            self.session.set_static_page(
+                url, html_content, time.perf_counter() - start_time
+            )
+            return f"Navigating to {url} returned status code 200"
+
+        page = await self.session.aget_page()
+        with tracer.span("navigate browser", "browser", url=url):
+            response = await page.goto(
+                url,
+                wait_until="domcontentloaded",
+                timeout=self.session.navigation_timeout_ms,
+            )
+        self.session.set_browser_page(url, time.perf_counter() - start_time)
+        status = response.status if response else "unknown"
+        return f"Navigating to {url} returned status code {status}"
+
+
+class ExtractMarkdownInput(BaseModel):
+    """Input for ExtractMarkdownTool."""
+
+    section: Optional[str] = Field(
+        default=None,
+        description="Optional heading of the section to extract, instead of the whole page",
+    )
+
+
+class ExtractMarkdownTool(BaseTool):
     name: str = "extract_markdown"
-    description: str = "Extract markdown from the current page"
-
-    def convert_html_to_markdown(self, html_content: str) -> str:
-        """Convert HTML content to markdown."""
-        # Parse the string
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Remove javascript and style blocks
-        for script in soup(["script", "style"]):
-            script.extract()
-
-        # Print only the main content
-        body_elm = soup.find("body")
-        webpage_text = ""
-        if body_elm:
-            webpage_text = markdownify.MarkdownConverter().convert_soup(body_elm)
-        else:
-            webpage_text = markdownify.MarkdownConverter().convert_soup(soup)
+    description: str = (
+        "Extract markdown from the current page. "
+        "Provide a section heading to only extract that part of the page."
+    )
+    args_schema: Type[BaseModel] = ExtractMarkdownInput
+    session: BrowserSession
 
-        return webpage_text
+    def _extract(
+        self,
+        url: str,
+        html_content: str,
+        html_hash: str,
+        section: Optional[str] = None,
+    ) -> str:
+        """Convert the page, or get it from the cache, and select the section."""
+        markdown = self.session.page_cache.get(url, html_hash)
+        if markdown is None:
+            start_time = time.perf_counter()
+            with tracer.span("convert html", "conversion", url=url):
+                title, markdown = html_to_markdown(html_content)
+            self.session.page_cache.put(url, html_hash, markdown)
+            page_archive.add(
+                url,
+                title,
+                markdown,
+                fetch_bytes=len(html_content.encode()),
+                fetch_duration_s=self.session.fetch_duration_s
+                + time.perf_counter()
+                - start_time,
+            )
+        return self._select_section(markdown, section)
 
-    def _run(self, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+    @staticmethod
+    def _select_section(markdown: str, section: Optional[str] = None) -> str:
+        if not section:
+            return markdown
+
+        section_markdown = markdown_section(markdown, section)
+        if section_markdown is None:
+            headings = "\n".join(markdown_headings(markdown))
+            return f"Section '{section}' not found. Available sections:\n{headings}"
+        return section_markdown
+
+    def _run(
+        self,
+        section: Optional[str] = None,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
         """Use the tool."""
-        if self.sync_browser is None:
-            raise ValueError(f"Synchronous browser not provided to {self.name}")
+        if self.session.archived_page is not None:
+            return self._select_section(self.session.archived_page.text, section)
+        if self.session.static_html is not None:
+            return self._extract(
+                self.session.current_url,
+                self.session.static_html,
+                self.session.static_html_hash,
+                section,
+            )
 
-        page = get_current_page(self.sync_browser)
+        page = self.session.get_page()
         html_content = page.content()
-        return self.convert_html_to_markdown(html_content)
+        return self._extract(
+            page.url, html_content, content_hash(html_content), section
+        )
 
     async def _arun(
-        self, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+        self,
+        section: Optional[str] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> str:
         """Use the tool."""
-        if self.async_browser is None:
-            raise ValueError(f"Asynchronous browser not provided to {self.name}")
-        page = await aget_current_page(self.async_browser)
+        if self.session.archived_page is not None:
+            return self._select_section(self.session.archived_page.text, section)
+        if self.session.static_html is not None:
+            return self._extract(
+                self.session.current_url,
+                self.session.static_html,
+                self.session.static_html_hash,
+                section,
+            )
+
+        page = await self.session.aget_page()
         html_content = await page.content()
-        return self.convert_html_to_markdown(html_content)
-
-
-def get_browser_tools(use_async_browser=True):
-    """Wait for application start to install playwright if required."""
-    # if required, install playwright
-
-    # subprocess.run(["playwright", "install"])
-    async_browser, sync_browser = None, None
-    if use_async_browser:
-        async_browser = create_async_playwright_browser()
-        toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=async_browser)
-    else:
-        sync_browser = create_sync_playwright_browser()
-        toolkit = PlayWrightBrowserToolkit.from_browser(sync_browser=sync_browser)
-    browser_tools = [
-        tool
-        for tool in toolkit.get_tools()
-        + [
-            ExtractMarkdownTool.from_browser(
-                async_browser=async_browser, sync_browser=sync_browser
-            ),
-        ]
-        if tool.name
-        in [
-            "navigate_browser",
-            "extract_markdown",
-            # "previous_webpage",
-            # "click_element",
-            # "extract_text",
-        ]
-    ]
+        return self._extract(
+            page.url, html_content, content_hash(html_content), section
+        )
+
 
-    return browser_tools
+def get_browser_tools():
+    """Create the browser tools, sharing a single browser session.
+
+    The Playwright browser is only launched the first time a page needs it.
+    """
+    session = BrowserSession()
+    return [
+        NavigateTool(session=session),
+        ExtractMarkdownTool(session=session),
+    ]
@@ -0,0 +1,536 @@
+"""Record and replay of the network I/O of the agent and its tools.
+
+A cassette is a folder holding the HTTP responses received during a run, so that the
+run can be replayed without the network, with stable timings. When enabled with the
+CASSETTE_MODE setting, it intercepts:
+- the requests of the `requests` library: the shared HTTP session of the tools (web
+  pages, downloads, Tavily) and the YouTube transcript API,
+- the requests of the `httpx` library: the OpenAI clients of the agent and the tools,
+- the page loads of Playwright, through the route of the browser session,
+- the downloads of yt-dlp, recorded as files.
+
+The modes are:
+- "record": every request goes to the network, and its response is recorded,
+- "replay": the recorded responses are replayed, and the requests that were not
+  recorded go to the network and are recorded,
+- "offline": only the recorded responses are replayed, the other requests fail as if
+  the network was down.
+
+Requests are matched by method, URL and body, ignoring their headers (which hold the
+API keys), so that a cassette can be shared. The n-th identical request replays the
+n-th recorded response, or the last one. Record with an empty workspace, so that all
+the resources of the run are in the cassette and not only in the download cache.
+"""
+
+import contextlib
+import dataclasses
+import hashlib
+import http.client
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+import settings
+from .http_client import CHUNK_SIZE, DownloadTooLargeError
+
+MODES = ("off", "record", "replay", "offline")
+
+# Response headers that do not apply to the recorded body, which is stored decoded
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+_BOUNDARY_RE = re.compile(r"boundary=\"?([^\";]+)\"?")
+
+
+class CassetteMissError(ConnectionError):
+    """Raised in offline mode for a request that was not recorded."""
+
+
+@dataclasses.dataclass
+class Interaction:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    duration_s: float
+
+
+@dataclasses.dataclass
+class CassetteStats:
+    replayed: int = 0
+    recorded: int = 0
+    missing: int = 0
+
+
+def request_key(
+    method: str, url: str, body: bytes | str | None, content_type: str | None
+) -> str:
+    """The key matching a request with its recording.
+
+    JSON bodies are compared with sorted keys, and multipart bodies without their
+    random boundary.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    body = body or b""
+    content_type = content_type or ""
+    if "json" in content_type:
+        with contextlib.suppress(ValueError):
+            body = json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+    elif (match := _BOUNDARY_RE.search(content_type)) is not None:
+        body = body.replace(match.group(1).encode("latin-1"), b"boundary")
+    digest = hashlib.sha256(f"{method.upper()} {url}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def recorded_headers(headers) -> dict[str, str]:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in DROPPED_HEADERS
+    }
+
+
+class Cassette:
+    """The recorded responses, in a SQLite index and a folder of bodies."""
+
+    def __init__(
+        self,
+        root: str = settings.CASSETTE_DIR,
+        mode: str = settings.CASSETTE_MODE,
+        replay_latency: bool = settings.CASSETTE_REPLAY_LATENCY,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        self.root = root
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.bodies_dir = os.path.join(root, "bodies")
+        self.index_path = os.path.join(root, "cassette.db")
+        self.stats = CassetteStats()
+        self._lock = threading.Lock()
+        # Number of times each request was made during this run
+        self._occurrences: dict[str, int] = {}
+        self._initialized = False
+        self._installed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a transaction on the index, creating the cassette on first use."""
+        if not self._initialized:
+            os.makedirs(self.bodies_dir, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            if not self._initialized:
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS interactions (
+                        key TEXT NOT NULL,
+                        occurrence INTEGER NOT NULL,
+                        method TEXT NOT NULL,
+                        url TEXT NOT NULL,
+                        status INTEGER NOT NULL,
+                        headers TEXT NOT NULL,
+                        body TEXT NOT NULL,
+                        duration_s REAL NOT NULL,
+                        PRIMARY KEY (key, occurrence)
+                    )
+                    """
+                )
+                self._initialized = True
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _next_occurrence(self, key: str) -> int:
+        with self._lock:
+            occurrence = self._occurrences.get(key, 0)
+            self._occurrences[key] = occurrence + 1
+        return occurrence
+
+    def play(self, key: str) -> Interaction | None:
+        """Return the recorded response of a request, unless in record mode.
+
+        Raises:
+            CassetteMissError: In offline mode, if the request was not recorded.
+        """
+        if self.mode == "record":
+            return None
+        occurrence = self._next_occurrence(key)
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT status, headers, body, duration_s FROM interactions "
+                "WHERE key = ? AND occurrence <= ? ORDER BY occurrence DESC LIMIT 1",
+                (key, occurrence),
+            ).fetchone()
+            if row is None:
+                self.stats.missing += 1
+            else:
+                self.stats.replayed += 1
+        if row is None:
+            if self.mode == "offline":
+                raise CassetteMissError(
+                    f"Offline: no recorded response for this request (key {key[:12]})"
+                )
+            # Recorded as the first occurrence, once fetched from the network
+            with self._lock:
+                self._occurrences[key] = 0
+            return None
+        status, headers, body, duration_s = row
+        with open(os.path.join(self.bodies_dir, body), "rb") as f:
+            interaction = Interaction(status, json.loads(headers), f.read(), duration_s)
+        if self.replay_latency:
+            time.sleep(duration_s)
+        return interaction
+
+    def _store_body(self, chunks: Iterable[bytes], max_bytes: int | None = None) -> str:
+        """Write a body to the bodies folder, chunk by chunk.
+
+        Raises:
+            DownloadTooLargeError: If the body is larger than max_bytes.
+
+        Returns:
+            str: The name of the body file, the hash of its content.
+        """
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.bodies_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise DownloadTooLargeError(
+                            f"Response larger than the limit of {max_bytes} bytes"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            body = digest.hexdigest()
+            os.replace(tmp_path, os.path.join(self.bodies_dir, body))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return body
+
+    def record(
+        self,
+        key: str,
+        method: str,
+        url: str,
+        interaction: Interaction,
+    ) -> None:
+        """Record the response of a request, as its next occurrence."""
+        body = self._store_body([interaction.body])
+        self._add_interaction(key, method, url, interaction, body)
+
+    def record_stream(
+        self,
+        key: str,
+        method: str,
+        url: str,
+        interaction: Interaction,
+        chunks: Iterable[bytes],
+        max_bytes: int | None = settings.HTTP_MAX_DOWNLOAD_BYTES,
+    ) -> str:
+        """Record a response whose body is read in chunks, not to hold it in memory.
+
+        Args:
+            key (str): The key of the request.
+            method (str): The method of the request.
+            url (str): The URL of the request.
+            interaction (Interaction): The status and headers of the response. Its
+                body is ignored, and its duration is counted until the body is read.
+            chunks (Iterable[bytes]): The chunks of the body.
+            max_bytes (int | None, optional): Maximum size of the body.
+
+        Raises:
+            DownloadTooLargeError: If the body is larger than max_bytes. Nothing is
+                recorded then.
+
+        Returns:
+            str: The path to the recorded body.
+        """
+        start_time = time.perf_counter()
+        body = self._store_body(chunks, max_bytes)
+        interaction.duration_s += time.perf_counter() - start_time
+        self._add_interaction(key, method, url, interaction, body)
+        return os.path.join(self.bodies_dir, body)
+
+    def _add_interaction(
+        self, key: str, method: str, url: str, interaction: Interaction, body: str
+    ) -> None:
+        occurrence = self._next_occurrence(key)
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO interactions "
+                "(key, occurrence, method, url, status, headers, body, duration_s) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    occurrence,
+                    method.upper(),
+                    url,
+                    interaction.status,
+                    json.dumps(interaction.headers),
+                    body,
+                    interaction.duration_s,
+                ),
+            )
+            self.stats.recorded += 1
+
+    def record_download(
+        self, key: str, download: Callable[[], tuple[str, Any]], dest_dir: str
+    ) -> tuple[str, Any]:
+        """Record a file downloaded by a library that cannot be intercepted.
+
+        Args:
+            key (str): The key of the download, e.g. its URL.
+            download (Callable[[], tuple[str, Any]]): Downloads the file, and returns
+                its path and JSON serializable metadata.
+            dest_dir (str): The folder where a replayed file is copied.
+
+        Returns:
+            tuple[str, Any]: The path to the file and its metadata.
+        """
+        if not self.enabled:
+            return download()
+        key = request_key("DOWNLOAD", key, None, None)
+        interaction = self.play(key)
+        if interaction is not None:
+            metadata = interaction.headers
+            path = os.path.join(dest_dir, metadata["filename"])
+            with open(path, "wb") as f:
+                f.write(interaction.body)
+            return path, metadata["metadata"]
+
+        start_time = time.perf_counter()
+        path, metadata = download()
+        with open(path, "rb") as f:
+            body = f.read()
+        headers = {"filename": os.path.basename(path), "metadata": metadata}
+        self.record(
+            key,
+            "DOWNLOAD",
+            key,
+            Interaction(200, headers, body, time.perf_counter() - start_time),
+        )
+        return path, metadata
+
+    def install(self) -> None:
+        """Intercept the requests of requests and httpx, if the cassette is enabled."""
+        if not self.enabled or self._installed:
+            return
+        self._installed = True
+        self._patch_requests()
+        self._patch_httpx()
+        print(f"Cassette: {self.mode} mode, in {self.root}")
+
+    def _patch_requests(self) -> None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        cassette = self
+        send = HTTPAdapter.send
+
+        def cassette_send(adapter, request, *args, **kwargs):
+            key = request_key(
+                request.method,
+                request.url,
+                request.body if isinstance(request.body, (bytes, str)) else None,
+                request.headers.get("Content-Type"),
+            )
+            try:
+                interaction = cassette.play(key)
+            except CassetteMissError as e:
+                raise requests.ConnectionError(str(e), request=request) from e
+            if interaction is None:
+                start_time = time.perf_counter()
+                response = send(adapter, request, *args, **kwargs)
+                # Stream the body to the cassette, with the limit of the downloads
+                interaction = Interaction(
+                    response.status_code,
+                    recorded_headers(response.headers),
+                    b"",
+                    time.perf_counter() - start_time,
+                )
+                try:
+                    body_path = cassette.record_stream(
+                        key,
+                        request.method,
+                        request.url,
+                        interaction,
+                        response.iter_content(chunk_size=CHUNK_SIZE),
+                    )
+                finally:
+                    response.close()
+                # The caller reads the body from the recorded file
+                response.raw = open(body_path, "rb")
+                response._content = False
+                response._content_consumed = False
+                response.headers = CaseInsensitiveDict(interaction.headers)
+                return response
+
+            response = requests.Response()
+            response.status_code = interaction.status
+            response.reason = http.client.responses.get(interaction.status, "")
+            response.headers = CaseInsensitiveDict(interaction.headers)
+            response.encoding = get_encoding_from_headers(response.headers)
+            response.raw = io.BytesIO(interaction.body)
+            response._content = interaction.body
+            response._content_consumed = True
+            response.url = request.url
+            response.request = request
+            response.connection = adapter
+            return response
+
+        HTTPAdapter.send = cassette_send
+
+    def _patch_httpx(self) -> None:
+        import httpx
+
+        cassette = self
+        handle_request = httpx.HTTPTransport.handle_request
+        handle_async_request = httpx.AsyncHTTPTransport.handle_async_request
+
+        def key_of(request: httpx.Request) -> str:
+            return request_key(
+                request.method,
+                str(request.url),
+                request.content,
+                request.headers.get("Content-Type"),
+            )
+
+        def replay(request: httpx.Request, key: str) -> httpx.Response | None:
+            try:
+                interaction = cassette.play(key)
+            except CassetteMissError as e:
+                raise httpx.ConnectError(str(e), request=request) from e
+            if interaction is None:
+                return None
+            return httpx.Response(
+                interaction.status,
+                headers=interaction.headers,
+                content=interaction.body,
+                request=request,
+            )
+
+        def record(
+            request: httpx.Request, key: str, response: httpx.Response, start_time
+        ) -> httpx.Response:
+            interaction = Interaction(
+                response.status_code,
+                recorded_headers(response.headers),
+                response.content,
+                time.perf_counter() - start_time,
+            )
+            cassette.record(key, request.method, str(request.url), interaction)
+            return httpx.Response(
+                interaction.status,
+                headers=interaction.headers,
+                content=interaction.body,
+                request=request,
+            )
+
+        def cassette_handle_request(transport, request):
+            request.read()
+            key = key_of(request)
+            response = replay(request, key)
+            if response is None:
+                start_time = time.perf_counter()
+                response = handle_request(transport, request)
+                try:
+                    response.read()
+                finally:
+                    response.close()
+                response = record(request, key, response, start_time)
+            return response
+
+        async def cassette_handle_async_request(transport, request):
+            await request.aread()
+            key = key_of(request)
+            response = replay(request, key)
+            if response is None:
+                start_time = time.perf_counter()
+                response = await handle_async_request(transport, request)
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+                response = record(request, key, response, start_time)
+            return response
+
+        httpx.HTTPTransport.handle_request = cassette_handle_request
+        httpx.AsyncHTTPTransport.handle_async_request = cassette_handle_async_request
+
+    def _route_key(self, route) -> str:
+        request = route.request
+        return request_key(
+            request.method,
+            request.url,
+            request.post_data_buffer,
+            request.headers.get("content-type"),
+        )
+
+    def route(self, route) -> None:
+        """Handle a request of a Playwright page (sync API)."""
+        key = self._route_key(route)
+        try:
+            interaction = self.play(key)
+        except CassetteMissError:
+            route.abort("internetdisconnected")
+            return
+        if interaction is None:
+            start_time = time.perf_counter()
+            response = route.fetch()
+            interaction = Interaction(
+                response.status,
+                recorded_headers(response.headers),
+                response.body(),
+                time.perf_counter() - start_time,
+            )
+            self.record(key, route.request.method, route.request.url, interaction)
+        route.fulfill(
+            status=interaction.status,
+            headers=interaction.headers,
+            body=interaction.body,
+        )
+
+    async def aroute(self, route) -> None:
+        """Handle a request of a Playwright page (async API)."""
+        key = self._route_key(route)
+        try:
+            interaction = self.play(key)
+        except CassetteMissError:
+            await route.abort("internetdisconnected")
+            return
+        if interaction is None:
+            start_time = time.perf_counter()
+            response = await route.fetch()
+            interaction = Interaction(
+                response.status,
+                recorded_headers(response.headers),
+                await response.body(),
+                time.perf_counter() - start_time,
+            )
+            self.record(key, route.request.method, route.request.url, interaction)
+        await route.fulfill(
+            status=interaction.status,
+            headers=interaction.headers,
+            body=interaction.body,
+        )
+
+
+cassette = Cassette()
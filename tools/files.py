@@ -3,23 +3,32 @@
 Largely inspired from https://github.dev/aymeric-roucher/GAIA/blob/main/scripts/tools/mdconvert.py
 """
 
-import re
-import html
+import collections
 from typing import Union
 import logging
 from langchain_core.tools import tool
-from bs4 import BeautifulSoup
-import markdownify
-import pdfplumber
-import mammoth
 import os
-import pptx
-import xml.etree.ElementTree as ET
+import time
 import zipfile
-import tempfile
-import requests
 import mimetypes
-from urllib.parse import urlparse
+
+import settings
+
+from .workspace import workspace
+from .tables import (
+    TABULAR_EXTENSIONS,
+    ColumnStats,
+    Sheet,
+    is_empty,
+    iter_sheets,
+    markdown_table,
+)
+from .html_markdown import html_to_markdown
+from .ooxml import docx_to_markdown, pptx_to_markdown
+from .xml_markdown import xml_to_markdown
+from .prefetch import prefetcher
+from .archive import page_archive
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -65,26 +74,8 @@ class HtmlConverter(DocumentConverter):
 
     def _convert(self, html_content) -> Union[None, DocumentConverterResult]:
         """Helper function that converts and HTML string."""
-
-        # Parse the string
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Remove javascript and style blocks
-        for script in soup(["script", "style"]):
-            script.extract()
-
-        # Print only the main content
-        body_elm = soup.find("body")
-        webpage_text = ""
-        if body_elm:
-            webpage_text = markdownify.MarkdownConverter().convert_soup(body_elm)
-        else:
-            webpage_text = markdownify.MarkdownConverter().convert_soup(soup)
-
-        return DocumentConverterResult(
-            title=None if soup.title is None else soup.title.string,
-            text_content=webpage_text,
-        )
+        title, webpage_text = html_to_markdown(html_content)
+        return DocumentConverterResult(title=title, text_content=webpage_text)
 
 
 class PlainTextConverter(DocumentConverter):
@@ -124,6 +115,9 @@ class PdfConverter(DocumentConverter):
         if not self.validate_extension(local_path):
             return None
 
+        import markdownify
+        import pdfplumber
+
         all_text = ""
 
         with pdfplumber.open(local_path) as pdf:
@@ -138,175 +132,132 @@ class PdfConverter(DocumentConverter):
         )
 
 
-class DocxConverter(HtmlConverter):
+class DocxConverter(DocumentConverter):
     extensions: list[str] = ["docx"]
 
     def convert(self, local_path, **kwargs) -> Union[None, DocumentConverterResult]:
         if not self.validate_extension(local_path):
             return None
 
-        result = None
-        with open(local_path, "rb") as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            html_content = result.value
-            result = self._convert(html_content)
-
-        return result
+        return DocumentConverterResult(
+            title=None,
+            text_content=docx_to_markdown(local_path),
+        )
 
 
-class PptxConverter(HtmlConverter):
+class PptxConverter(DocumentConverter):
     extensions: list[str] = ["pptx"]
 
     def convert(self, local_path, **kwargs) -> Union[None, DocumentConverterResult]:
         if not self.validate_extension(local_path):
             return None
 
-        md_content = ""
-
-        presentation = pptx.Presentation(local_path)
-        slide_num = 0
-        for slide in presentation.slides:
-            slide_num += 1
-
-            md_content += f"\n\n<!-- Slide number: {slide_num} -->\n"
-
-            title = slide.shapes.title
-            for shape in slide.shapes:
-                # Pictures
-                if self._is_picture(shape):
-                    # https://github.com/scanny/python-pptx/pull/512#issuecomment-1713100069
-                    alt_text = ""
-                    try:
-                        alt_text = shape._element._nvXxPr.cNvPr.attrib.get("descr", "")
-                    except:  # noqa
-                        pass
-
-                    # A placeholder name
-                    filename = re.sub(r"\W", "", shape.name) + ".jpg"
-                    # try:
-                    #    filename = shape.image.filename
-                    # except:
-                    #    pass
-
-                    md_content += (
-                        "\n!["
-                        + (alt_text if alt_text else shape.name)
-                        + "]("
-                        + filename
-                        + ")\n"
-                    )
-
-                # Tables
-                if self._is_table(shape):
-                    html_table = "<html><body><table>"
-                    first_row = True
-                    for row in shape.table.rows:
-                        html_table += "<tr>"
-                        for cell in row.cells:
-                            if first_row:
-                                html_table += "<th>" + html.escape(cell.text) + "</th>"
-                            else:
-                                html_table += "<td>" + html.escape(cell.text) + "</td>"
-                        html_table += "</tr>"
-                        first_row = False
-                    html_table += "</table></body></html>"
-                    md_content += (
-                        "\n" + self._convert(html_table).text_content.strip() + "\n"
-                    )
-
-                # Text areas
-                elif shape.has_text_frame:
-                    if shape == title:
-                        md_content += "# " + shape.text.lstrip() + " "
-                    else:
-                        md_content += shape.text + " "
-
-            md_content = md_content.strip()
-
-            if slide.has_notes_slide:
-                md_content += "\n\n### Notes:\n"
-                notes_frame = slide.notes_slide.notes_text_frame
-                if notes_frame is not None:
-                    md_content += notes_frame.text
-                md_content = md_content.strip()
-
         return DocumentConverterResult(
             title=None,
-            text_content=md_content.strip(),
+            text_content=pptx_to_markdown(local_path),
         )
 
-    def _is_picture(self, shape):
-        if shape.shape_type == pptx.enum.shapes.MSO_SHAPE_TYPE.PICTURE:
-            return True
-        if shape.shape_type == pptx.enum.shapes.MSO_SHAPE_TYPE.PLACEHOLDER:
-            if hasattr(shape, "image"):
-                return True
-        return False
-
-    def _is_table(self, shape):
-        if shape.shape_type == pptx.enum.shapes.MSO_SHAPE_TYPE.TABLE:
-            return True
-        return False
-
 
 class XmlConverter(DocumentConverter):
+    """Convert XML files in a single streaming pass, up to a character budget."""
+
     extensions: list[str] = ["xml"]
+    max_chars: int = settings.XML_MAX_CHARS
 
     def convert(self, local_path, **kwargs) -> None | DocumentConverterResult:
         if not self.validate_extension(local_path):
             return None
 
-        xml_string = ""
-        with open(local_path) as fh:
-            xml_string = fh.read()
+        markdown = xml_to_markdown(local_path, max_chars=self.max_chars)
+        return DocumentConverterResult(
+            title=None,
+            text_content=markdown.strip(),
+        )
 
-        def extract_table_from_html_like(xml_root):
-            table = xml_root.find(".//table")
-            if table is None:
-                raise ValueError("No table found in the XML")
 
-            headers = [th.text for th in table.find("thead").findall("th")]
-            rows = [
-                [td.text for td in tr.findall("td")]
-                for tr in table.find("tbody").findall("tr")
-            ]
+class SpreadsheetConverter(DocumentConverter):
+    """Summarize tabular files, reading their rows in a single streaming pass.
 
-            # Create markdown table
-            markdown = "| " + " | ".join(headers) + " |\n"
-            markdown += "| " + " | ".join(["---"] * len(headers)) + " |\n"
-            for row in rows:
-                markdown += "| " + " | ".join(row) + " |\n"
-
-        def extract_table_from_wordml(xml_root, namespaces):
-            # Parse the XML content
-            root = xml_root
-            namespace = {"w": "http://schemas.microsoft.com/office/word/2003/wordml"}
-
-            # Extract text content
-            body = root.find("w:body", namespace)
-            paragraphs = body.findall(".//w:p", namespace)
-            text_content = []
-            for para in paragraphs:
-                texts = para.findall(".//w:t", namespace)
-                for text in texts:
-                    text_content.append(text.text)
-
-            return "\n".join(text_content)
-
-        # Parse the XML string
-        root = ET.fromstring(xml_string)
-        namespaces = {"w": "http://schemas.microsoft.com/office/word/2003/wordml"}
-
-        if root.tag.endswith("wordDocument"):
-            markdown = extract_table_from_wordml(root, namespaces)
-        else:
-            markdown = extract_table_from_html_like(root)
+    Small sheets are shown in full. For larger sheets, only the shape, the type and
+    statistics of each column and the first and last rows are shown.
+    """
+
+    extensions: list[str] = TABULAR_EXTENSIONS
+    # Sheets up to this number of rows are shown in full
+    max_full_rows: int = 50
+    preview_rows: int = 5
 
+    def convert(self, local_path, **kwargs) -> Union[None, DocumentConverterResult]:
+        if not self.validate_extension(local_path):
+            return None
+
+        sections = [self._summarize(sheet) for sheet in iter_sheets(local_path)]
         return DocumentConverterResult(
             title=None,
-            text_content=markdown.strip(),
+            text_content="\n\n".join(sections),
         )
 
+    def _summarize(self, sheet: Sheet) -> str:
+        columns = [ColumnStats(name) for name in sheet.header]
+        nb_columns = len(columns)
+        first_rows = []
+        last_rows = collections.deque(maxlen=self.preview_rows)
+        nb_rows = 0
+        for row in sheet.rows:
+            if all(is_empty(value) for value in row):
+                continue
+            row = (list(row) + [None] * nb_columns)[:nb_columns]
+            nb_rows += 1
+            for column, value in zip(columns, row):
+                column.add(value)
+            if len(first_rows) < self.max_full_rows:
+                first_rows.append(row)
+            last_rows.append(row)
+
+        lines = [
+            f"## Sheet: {sheet.name}",
+            f"Shape: {nb_rows} rows x {nb_columns} columns",
+            "",
+            "### Columns",
+            markdown_table(
+                [
+                    "Column",
+                    "Type",
+                    "Non-empty",
+                    "Missing",
+                    "Distinct",
+                    "Min",
+                    "Max",
+                    "Mean",
+                ],
+                [
+                    [
+                        column.name,
+                        column.type,
+                        column.count,
+                        column.missing,
+                        column.distinct,
+                        column.minimum,
+                        column.maximum,
+                        None if column.mean is None else round(column.mean, 4),
+                    ]
+                    for column in columns
+                ],
+            ),
+        ]
+        if nb_rows <= self.max_full_rows:
+            lines += ["", "### Rows", markdown_table(sheet.header, first_rows)]
+        else:
+            lines += [
+                "",
+                f"### First {self.preview_rows} rows",
+                markdown_table(sheet.header, first_rows[: self.preview_rows]),
+                "",
+                f"### Last {self.preview_rows} rows",
+                markdown_table(sheet.header, list(last_rows)),
+            ]
+        return "\n".join(lines)
+
 
 class DocumentConverterFactory:
     _converters: dict[str, DocumentConverter] = {}
@@ -326,51 +277,31 @@ converter_factory.register_converter(PlainTextConverter())
 converter_factory.register_converter(DocxConverter())
 converter_factory.register_converter(PptxConverter())
 converter_factory.register_converter(XmlConverter())
+converter_factory.register_converter(SpreadsheetConverter())
 
 
 def save_resource(url: str) -> str:
-    """Save a resource from a URL to a temporary file.
+    """Save a resource from a URL to the download cache of the workspace.
 
     Args:
         url (str): The URL of the resource.
 
     Returns:
-        str: The path to the temporary file.
+        str: The path to the cached file.
     """
     print("Downloading resource from URL:", url)
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-
-    # Determine filename from URL path
-    parsed_url = urlparse(url)
-    base_name = os.path.basename(parsed_url.path)
-
-    # Guess extension from Content-Type header
-    content_type = response.headers.get("Content-Type")
-    extension = (
-        mimetypes.guess_extension(content_type.split(";")[0]) if content_type else ""
-    )
-
-    if not extension and "." in base_name:
-        # Fall back to using URL extension
-        extension = os.path.splitext(base_name)[1]
-
-    print("Extension guessed from response:", extension)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as tmp_file:
-        # Write content to temporary file
-        for chunk in response.iter_content(chunk_size=8192):
-            tmp_file.write(chunk)
-        tmp_path = tmp_file.name
-        print("File saved to: ", tmp_path)
-        return tmp_path
+    with tracer.span("download", "download", url=url):
+        path = workspace.fetch(url)
+    print("File saved to: ", path)
+    return path
 
 
 @tool
 def load_file_or_url(file_path_or_url: str) -> str:
     """Load a file or a URL and return its contents.
 
-    Use it for PDF, DOCX, HTML, PPTX, XML and any text resource.
+    Use it for PDF, DOCX, HTML, PPTX, XML, spreadsheets (XLSX, XLS, CSV, TSV)
+    and any text resource.
 
     Args:
         file_path_or_url (str): The path to the file or URL.
@@ -380,41 +311,168 @@ def load_file_or_url(file_path_or_url: str) -> str:
     """
     content = ""
     file_path = file_path_or_url
-    # if URL, download first as a temporary file
-    if file_path_or_url.startswith("http"):
-        file_path = save_resource(file_path_or_url)
+    result = None
+    is_url = file_path_or_url.startswith("http")
+    archived_page = None
+    # Downloaded bytes and time taken to fetch the URL, recorded in the archive
+    fetch_bytes = 0
+    fetch_start_time = time.perf_counter()
+    # if URL, use the archived or prefetched page if any, otherwise download it first
+    if is_url:
         content += f"URL: {file_path_or_url}\n"
-        content += f"Downloaded to: {file_path}\n"
+        archived_page = page_archive.get(file_path_or_url)
+        if archived_page is not None:
+            content += f"Content: {archived_page.describe()}\n"
+            result = DocumentConverterResult(
+                title=archived_page.title, text_content=archived_page.text
+            )
+        elif (prefetched_page := prefetcher.pop(file_path_or_url)) is not None:
+            result = DocumentConverterResult(
+                title=prefetched_page.title, text_content=prefetched_page.markdown
+            )
+            fetch_bytes = len(prefetched_page.html.encode())
+            fetch_start_time -= prefetched_page.fetch_duration_s
+        else:
+            file_path = save_resource(file_path_or_url)
+            content += f"Downloaded to: {file_path}\n"
+            fetch_bytes = os.path.getsize(file_path)
 
     extension = file_path.split(".")[-1].lower()
     converter = converter_factory.get_converter(extension)
-    if converter:
-        result = converter.convert(file_path)
-        if result:
-            content += str(result)
-            # limit content to 5000 characters
-            if len(content) > 5000:
-                return content[:5000] + "...TRUNCATED"
-            return content
+    if result is None and converter:
+        with tracer.span(f"convert {extension}", "conversion", path=file_path):
+            result = converter.convert(file_path)
+    if result and is_url and archived_page is None:
+        page_archive.add(
+            file_path_or_url,
+            result.title,
+            result.text_content,
+            fetch_bytes=fetch_bytes,
+            fetch_duration_s=time.perf_counter() - fetch_start_time,
+        )
+    if result:
+        content += str(result)
+        # limit content to 5000 characters
+        if len(content) > 5000:
+            return content[:5000] + "...TRUNCATED"
+        return content
 
     print(f"ERROR: Unable to load file or URL: Unknown format. Extension: {extension}")
     return "Unable to load file or URL: Unknown format"
 
 
+class ZipBombError(Exception):
+    """Raised when a zip member exceeds the size or compression ratio limits."""
+
+
+def _check_zip_member(info: zipfile.ZipInfo) -> None:
+    if info.file_size > settings.ZIP_MAX_MEMBER_BYTES:
+        raise ZipBombError(
+            f"{info.filename} is {info.file_size} bytes once extracted, "
+            f"above the limit of {settings.ZIP_MAX_MEMBER_BYTES} bytes"
+        )
+    if (
+        info.compress_size
+        and info.file_size / info.compress_size > settings.ZIP_MAX_COMPRESSION_RATIO
+    ):
+        raise ZipBombError(
+            f"{info.filename} has a suspicious compression ratio "
+            f"({info.file_size / info.compress_size:.0f}:1)"
+        )
+
+
+def _read_zip_member(zip_file: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Stream a member, without trusting the size declared in the archive."""
+    size = 0
+    with zip_file.open(info) as member_file:
+        for chunk in iter(lambda: member_file.read(1024 * 1024), b""):
+            size += len(chunk)
+            if size > settings.ZIP_MAX_MEMBER_BYTES:
+                raise ZipBombError(
+                    f"{info.filename} is larger than the limit of "
+                    f"{settings.ZIP_MAX_MEMBER_BYTES} bytes once extracted"
+                )
+            yield chunk
+
+
+def extract_zip_member(file_path: str, member: str) -> str:
+    """Extract a single member of a zip file, or get it from the cache.
+
+    Extracted members are cached in the workspace, keyed by the hash of the archive.
+
+    Args:
+        file_path (str): The path to the zip file.
+        member (str): The name of the member in the archive.
+
+    Raises:
+        ZipBombError: If the member exceeds the size or compression ratio limits.
+
+    Returns:
+        str: The path to the extracted member.
+    """
+    key = f"zip://{workspace.file_hash(file_path)}/{member}"
+    path = workspace.lookup(key)
+    if path is not None:
+        return path
+
+    with zipfile.ZipFile(file_path) as zip_file:
+        info = zip_file.getinfo(member)
+        _check_zip_member(info)
+        extension = os.path.splitext(member)[1].lower()
+        return workspace.store(key, _read_zip_member(zip_file, info), extension)
+
+
 @tool
-def unzip(file_path: str) -> list[str]:
-    """Unzip a file and return the list of files in the zip.
-    Always use this to process zip files.
+def unzip(file_path: str) -> list[dict]:
+    """List the files in a zip file, with their size and type, without extracting them.
+    Always use this to process zip files, then use load_zip_member to read a file.
 
     Args:
         file_path (str): The path to the zip file.
 
     Returns:
-        list[str]: The list of files in the zip.
+        list[dict]: The files in the zip, with their name, size in bytes and type.
     """
     with zipfile.ZipFile(file_path) as zip_file:
-        # extract all files from the zip
-        zip_file.extractall("data/zip")
-        filepaths = [os.path.join("data/zip", f) for f in zip_file.namelist()]
-        print("Extracted files:", filepaths)
-        return filepaths
+        members = [
+            {
+                "name": info.filename,
+                "size": info.file_size,
+                "type": mimetypes.guess_type(info.filename)[0] or "unknown",
+            }
+            for info in zip_file.infolist()
+            if not info.is_dir()
+        ]
+    print(f"Zip file {file_path} contains {len(members)} files")
+    return members
+
+
+@tool
+def load_zip_member(file_path: str, member: str) -> str:
+    """Load a single file from a zip file and return its contents.
+
+    Files that cannot be converted to text (e.g. images, audio) are extracted, and
+    their path is returned so that they can be processed with the other tools.
+
+    Args:
+        file_path (str): The path to the zip file.
+        member (str): The name of the file in the zip, as listed by the unzip tool.
+
+    Returns:
+        str: The contents of the file, or the path to the extracted file.
+    """
+    try:
+        path = extract_zip_member(file_path, member)
+    except (KeyError, ZipBombError) as e:
+        return f"Unable to extract {member}: {e}"
+
+    content = f"Extracted to: {path}\n"
+    converter = converter_factory.get_converter(os.path.splitext(member)[1][1:])
+    result = converter.convert(path) if converter else None
+    if not result:
+        return content + "Use the appropriate tool to process this file."
+    content += str(result)
+    # limit content to 5000 characters
+    if len(content) > 5000:
+        return content[:5000] + "...TRUNCATED"
+    return content
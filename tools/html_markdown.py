@@ -0,0 +1,299 @@
+"""Fast HTML to markdown conversion, shared by the file and browser tools.
+
+The page is parsed with lxml and rendered by a single walk over the tree. Boilerplate
+(scripts, styles, navigation, footers, sidebars) is dropped before rendering, and tables
+are rendered compactly since they often make most of the size of a page.
+"""
+
+import re
+
+import lxml.html
+from lxml import etree
+
+# Elements dropped with their content before rendering
+BOILERPLATE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "iframe",
+    "svg",
+    "nav",
+    "footer",
+    "aside",
+]
+
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "body",
+    "center",
+    "dd",
+    "details",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "form",
+    "header",
+    "html",
+    "main",
+    "p",
+    "section",
+    "summary",
+}
+
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_LINE_SPACES_RE = re.compile(r"[ \t]*\n[ \t]*")
+
+# Indentation is rendered with a placeholder so that it survives whitespace cleanup
+_INDENT = "\x01"
+# Preformatted blocks are swapped for a placeholder until the end of the rendering
+_PRE_PLACEHOLDER = "\x02{}\x02"
+_PRE_PLACEHOLDER_RE = re.compile("\x02(\\d+)\x02")
+
+_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE
+)
+# The <meta> declaring the charset must be in the first 1024 bytes, per the HTML spec
+META_CHARSET_BYTES = 1024
+
+
+def decode_html(body: bytes, content_type: str = "") -> str:
+    """Decode an HTML document with its declared charset.
+
+    The charset is read from the Content-Type header, then from the <meta> tags of
+    the document. Without one, the document is decoded as UTF-8 if it is valid, and
+    as Windows-1252 otherwise (requests would decode it as ISO-8859-1, which garbles
+    the UTF-8 pages that do not declare their charset in the header).
+    """
+    match = _CHARSET_RE.search(content_type)
+    charset = match.group(1) if match else None
+    if charset is None:
+        match = _META_CHARSET_RE.search(body[:META_CHARSET_BYTES])
+        charset = match.group(1).decode("ascii") if match else None
+    if charset is not None:
+        try:
+            return body.decode(charset, errors="replace")
+        except LookupError:
+            # Unknown charset
+            pass
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+
+def parse_html(html_content: str | bytes) -> etree._Element | None:
+    """Parse an HTML document and strip its boilerplate.
+
+    Returns:
+        etree._Element | None: The root of the document, or None if it is empty.
+    """
+    if not html_content or not html_content.strip():
+        return None
+    try:
+        root = lxml.html.document_fromstring(html_content)
+    except ValueError:
+        # lxml refuses str documents carrying an XML encoding declaration
+        root = lxml.html.document_fromstring(html_content.encode())
+    except etree.ParserError:
+        return None
+    etree.strip_elements(
+        root,
+        etree.Comment,
+        etree.ProcessingInstruction,
+        *BOILERPLATE_TAGS,
+        with_tail=False,
+    )
+    return root
+
+
+def html_to_markdown(html_content: str | bytes) -> tuple[str | None, str]:
+    """Convert an HTML document to markdown.
+
+    Args:
+        html_content (str | bytes): The HTML document.
+
+    Returns:
+        tuple[str | None, str]: The title of the document and its content as markdown.
+    """
+    root = parse_html(html_content)
+    if root is None:
+        return None, ""
+    title = root.findtext(".//title")
+    if title is not None:
+        title = title.strip() or None
+    body = root.find("body")
+    return title, MarkdownRenderer().render(body if body is not None else root)
+
+
+class MarkdownRenderer:
+    """Render an lxml tree as markdown."""
+
+    def __init__(self):
+        self._pre_blocks: list[str] = []
+
+    def render(self, element: etree._Element) -> str:
+        try:
+            text = self._convert(element)
+        except RecursionError:
+            # Pathologically nested documents: fall back to the raw text
+            text = element.text_content()
+        text = _LINE_SPACES_RE.sub("\n", text)
+        text = _BLANK_LINES_RE.sub("\n\n", text).replace(_INDENT, " ").strip()
+        return _PRE_PLACEHOLDER_RE.sub(
+            lambda match: self._pre_blocks[int(match.group(1))], text
+        )
+
+    def _children(self, element: etree._Element) -> str:
+        parts = []
+        if element.text:
+            parts.append(_WHITESPACE_RE.sub(" ", element.text))
+        for child in element:
+            parts.append(self._convert(child))
+            if child.tail:
+                parts.append(_WHITESPACE_RE.sub(" ", child.tail))
+        return "".join(parts)
+
+    def _inline(self, element: etree._Element) -> str:
+        """Render the content of an element on a single line."""
+        return _WHITESPACE_RE.sub(" ", self._children(element)).strip()
+
+    def _convert(self, element: etree._Element) -> str:
+        tag = element.tag
+        if not isinstance(tag, str):
+            return ""
+        tag = tag.lower()
+
+        if tag in BLOCK_TAGS:
+            return f"\n\n{self._children(element).strip()}\n\n"
+        if tag in HEADING_LEVELS:
+            return f"\n\n{'#' * HEADING_LEVELS[tag]} {self._inline(element)}\n\n"
+        if tag == "a":
+            text = self._inline(element)
+            href = element.get("href", "")
+            if not text or not href or href.startswith(("#", "javascript:")):
+                return text
+            return f"[{text}]({href})"
+        if tag in ("strong", "b"):
+            text = self._inline(element)
+            return f"**{text}**" if text else ""
+        if tag in ("em", "i"):
+            text = self._inline(element)
+            return f"*{text}*" if text else ""
+        if tag == "code":
+            text = element.text_content()
+            return f"`{text}`" if text else ""
+        if tag == "img":
+            src = element.get("src", "")
+            if not src or src.startswith("data:"):
+                return ""
+            return f"![{element.get('alt', '')}]({src})"
+        if tag == "br":
+            return "\n"
+        if tag == "hr":
+            return "\n\n---\n\n"
+        if tag == "pre":
+            self._pre_blocks.append(
+                f"```\n{element.text_content().strip(chr(10))}\n```"
+            )
+            return "\n\n" + _PRE_PLACEHOLDER.format(len(self._pre_blocks) - 1) + "\n\n"
+        if tag == "blockquote":
+            text = _LINE_SPACES_RE.sub("\n", self._children(element).strip())
+            text = _BLANK_LINES_RE.sub("\n\n", text)
+            quoted = "\n".join(f"> {line}".rstrip() for line in text.split("\n"))
+            return f"\n\n{quoted}\n\n"
+        if tag in ("ul", "ol"):
+            return self._list(element, ordered=tag == "ol")
+        if tag == "table":
+            return self._table(element)
+        if tag in ("head", "title", "meta", "link"):
+            return ""
+        return self._children(element)
+
+    def _list(self, element: etree._Element, ordered: bool) -> str:
+        items = []
+        for child in element:
+            if not isinstance(child.tag, str) or child.tag.lower() != "li":
+                continue
+            bullet = f"{len(items) + 1}." if ordered else "-"
+            # Blank lines are dropped to keep the list compact
+            lines = [
+                line
+                for line in _LINE_SPACES_RE.split(self._children(child).strip())
+                if line
+            ] or [""]
+            indent = _INDENT * (len(bullet) + 1)
+            item = f"{bullet} {lines[0]}"
+            item += "".join(f"\n{indent}{line}" for line in lines[1:])
+            items.append(item)
+        if not items:
+            return ""
+        return "\n\n" + "\n".join(items) + "\n\n"
+
+    def _cell(self, cell: etree._Element) -> str:
+        return self._inline(cell).replace("|", "\\|")
+
+    def _table(self, element: etree._Element) -> str:
+        rows = []
+        for row in element.xpath("./tr|./thead/tr|./tbody/tr|./tfoot/tr"):
+            cells = []
+            for cell in row.xpath("./th|./td"):
+                cells.append(self._cell(cell))
+                # Keep the columns aligned when cells span several columns
+                colspan = cell.get("colspan", "1")
+                if colspan.isdigit() and int(colspan) > 1:
+                    cells.extend([""] * (min(int(colspan), 100) - 1))
+            if any(cells):
+                rows.append(cells)
+        if not rows:
+            return ""
+
+        nb_columns = max(len(cells) for cells in rows)
+        lines = []
+        caption = element.find("caption")
+        if caption is not None and self._inline(caption):
+            lines.append(self._inline(caption))
+        for i, cells in enumerate(rows):
+            cells = cells + [""] * (nb_columns - len(cells))
+            lines.append("| " + " | ".join(cells) + " |")
+            if i == 0:
+                lines.append("|" + "---|" * nb_columns)
+        return "\n\n" + "\n".join(lines) + "\n\n"
+
+
+_HEADING_RE = re.compile(r"^(#{1,6}) (.*)$", re.MULTILINE)
+
+
+def markdown_section(markdown: str, section: str) -> str | None:
+    """Extract a section of a markdown document.
+
+    The section starts at the first heading containing the given text (case
+    insensitive), and ends at the next heading of the same or a higher level.
+
+    Returns:
+        str | None: The section, or None if no heading matches.
+    """
+    headings = list(_HEADING_RE.finditer(markdown))
+    for i, heading in enumerate(headings):
+        if section.lower() not in heading.group(2).lower():
+            continue
+        level = len(heading.group(1))
+        end = len(markdown)
+        for next_heading in headings[i + 1 :]:
+            if len(next_heading.group(1)) <= level:
+                end = next_heading.start()
+                break
+        return markdown[heading.start() : end].strip()
+    return None
+
+
+def markdown_headings(markdown: str) -> list[str]:
+    """List the headings of a markdown document."""
+    return [heading.group(0) for heading in _HEADING_RE.finditer(markdown)]
@@ -0,0 +1,209 @@
+"""Shared HTTP client used by the tools.
+
+Reusing a single session keeps connections alive between requests to the same host,
+which avoids paying a TCP/TLS handshake on every fetch. Requests get connect and read
+timeouts, transient errors are retried with a jittered exponential backoff, and
+downloads are streamed to disk with a size limit.
+"""
+
+import dataclasses
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import settings
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Number of hosts kept in the pool, and connections kept per host
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+DEFAULT_TIMEOUT = (settings.HTTP_CONNECT_TIMEOUT_S, settings.HTTP_READ_TIMEOUT_S)
+CHUNK_SIZE = 64 * 1024
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+class DownloadTooLargeError(Exception):
+    """Raised when a download exceeds the maximum allowed size."""
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide HTTP session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.HTTP_MAX_RETRIES,
+                backoff_factor=0.5,
+                backoff_jitter=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+        return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request with the shared session and the default timeouts."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """Send a POST request with the shared session and the default timeouts.
+
+    POST requests are not retried, since they may not be idempotent.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().post(url, **kwargs)
+
+
+def guess_extension(url: str, content_type: str | None) -> str:
+    """Guess the extension of a resource from its Content-Type, or from its URL."""
+    extension = (
+        mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if content_type
+        else None
+    )
+    if not extension:
+        extension = os.path.splitext(urlparse(url).path)[1]
+    return extension or ""
+
+
+def _check_content_length(response: requests.Response, max_bytes: int) -> None:
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise DownloadTooLargeError(
+            f"{response.url} is {int(content_length)} bytes, above the limit of {max_bytes} bytes"
+        )
+
+
+def read_limited(url: str, max_bytes: int = settings.HTTP_MAX_DOWNLOAD_BYTES) -> bytes:
+    """Download a resource in memory, up to a maximum size.
+
+    Raises:
+        DownloadTooLargeError: If the resource is larger than max_bytes.
+    """
+    with get(url, stream=True) as response:
+        response.raise_for_status()
+        return read_response(response, max_bytes)
+
+
+def read_response(
+    response: requests.Response, max_bytes: int = settings.HTTP_MAX_DOWNLOAD_BYTES
+) -> bytes:
+    """Read the body of a streamed response in memory, up to a maximum size.
+
+    Raises:
+        DownloadTooLargeError: If the body is larger than max_bytes.
+    """
+    _check_content_length(response, max_bytes)
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise DownloadTooLargeError(
+                f"{response.url} is larger than the limit of {max_bytes} bytes"
+            )
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def write_response(
+    response: requests.Response,
+    path: str,
+    max_bytes: int = settings.HTTP_MAX_DOWNLOAD_BYTES,
+) -> tuple[int, str]:
+    """Stream the body of a response to a file, up to a maximum size.
+
+    The partial file is removed if the limit is exceeded.
+
+    Raises:
+        DownloadTooLargeError: If the body is larger than max_bytes.
+
+    Returns:
+        tuple[int, str]: The size of the body and its SHA-256 hex digest.
+    """
+    _check_content_length(response, max_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise DownloadTooLargeError(
+                        f"{response.url} is larger than the limit of {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return size, digest.hexdigest()
+
+
+@dataclasses.dataclass
+class Download:
+    path: str
+    content_type: str | None
+    size: int
+
+
+def download(
+    url: str,
+    dest_dir: str | None = None,
+    default_extension: str = "",
+    max_bytes: int = settings.HTTP_MAX_DOWNLOAD_BYTES,
+) -> Download:
+    """Stream a resource to a new file, up to a maximum size.
+
+    The extension of the file is guessed from the Content-Type of the response, or
+    from the URL, so that the file can be dispatched to the right converter.
+
+    Args:
+        url (str): The URL of the resource.
+        dest_dir (str | None, optional): Folder of the file. Defaults to the temporary folder.
+        default_extension (str, optional): Extension used when none can be guessed.
+        max_bytes (int, optional): Maximum size of the resource.
+
+    Raises:
+        DownloadTooLargeError: If the resource is larger than max_bytes.
+
+    Returns:
+        Download: The path to the file, with the content type and size of the resource.
+    """
+    with get(url, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type")
+        extension = guess_extension(url, content_type) or default_extension
+
+        fd, path = tempfile.mkstemp(suffix=extension, dir=dest_dir)
+        os.close(fd)
+        size, _ = write_response(response, path, max_bytes)
+    return Download(path=path, content_type=content_type, size=size)
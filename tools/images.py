@@ -1,80 +1,328 @@
-import os
-import requests
-from PIL import Image
-import io
+"""Ask questions about images with a vision model.
+
+The images are prepared before being sent to the model:
+- they are downscaled to the resolution the model actually uses, since it downscales
+  larger images itself: the extra pixels only cost bandwidth,
+- very large images are split into tiles, sent with a downscaled overview, so that
+  their details are not lost in the downscaling,
+- they are encoded as PNG (transparency, screenshots and diagrams) or JPEG (photos),
+  or sent as is when the file can be used directly, with the matching MIME type.
+
+The answers are cached in the workspace, by hash of the pixels of the image and
+prompt, so that the same image asked about again does not cost another vision call,
+even if it was downloaded from another URL. The hash is exact: images that only look
+alike, e.g. two renderings of different numbers, never share an answer.
+"""
+
 import base64
-from langchain_openai import ChatOpenAI
+import dataclasses
+import hashlib
+import io
+import math
+import os
+import threading
+from typing import TYPE_CHECKING, Any
+
 from langchain_core.tools import tool
 
 import settings
+from .workspace import workspace
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from PIL import Image
 
-def download_image(image_url: str) -> Image:
-    response = requests.get(image_url)
-    return Image.open(io.BytesIO(response.content))
+VISION_MODEL = "gpt-4o"
 
+# The model fits images in a 2048x2048 square, then downscales them to 768 pixels on
+# their shortest side
+MODEL_MAX_SIDE = 2048
+MODEL_MAX_SHORT_SIDE = 768
 
-def analyze_image_url(llm, image_url: str, prompt="What's in this image?") -> str:
-    """Analyzes an image from a URL using the provided LLM.
+# Estimated cost of an image: a base cost, plus a cost per 512x512 tile of the image
+# resized by the model. Low detail images cost the base cost, at most 512x512 pixels.
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+TOKEN_TILE_SIDE = 512
 
-    Args:
-        llm (ChatOpenAI): The LLM to use for analysis.
-        image_url (str): The URL of the image to analyze.
-        prompt (str, optional): The prompt to use for analysis. Defaults to "What's in this image?".
+# Images shrunk more than TILING_SCALE by the model are split into tiles, which are
+# shrunk by about TILE_SCALE
+TILING_SCALE = 0.25
+TILE_SCALE = 0.5
+# Overlap between the tiles, so that text cut by a tile boundary is whole in one tile
+TILE_OVERLAP = 0.05
 
-    Returns:
-        str: The analysis result.
+# Formats accepted by the model, sent without re-encoding when it does not save bytes
+PASSTHROUGH_FORMATS = {"JPEG", "PNG", "WEBP"}
+EXIF_ORIENTATION = 0x0112
+
+_llm: "ChatOpenAI | None" = None
+_llm_lock = threading.Lock()
+
+
+def get_vision_llm() -> "ChatOpenAI":
+    """Return the process-wide vision model, creating it on first use."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_openai import ChatOpenAI
+
+            _llm = ChatOpenAI(
+                model=VISION_MODEL,
+                temperature=0,
+                api_key=settings.OPENAI_API_KEY,
+            )
+        return _llm
+
+
+# -----------------------------------------
+# Preprocessing
+
+
+def model_size(width: int, height: int) -> tuple[int, int]:
+    """The size to which the model resizes an image, in high detail."""
+    scale = min(1.0, MODEL_MAX_SIDE / max(width, height))
+    scale *= min(1.0, MODEL_MAX_SHORT_SIDE / (min(width, height) * scale))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def estimate_tokens(width: int, height: int, detail: str = "high") -> int:
+    """Estimate the number of input tokens of an image."""
+    if detail == "low":
+        return BASE_TOKENS
+    width, height = model_size(width, height)
+    tiles = math.ceil(width / TOKEN_TILE_SIDE) * math.ceil(height / TOKEN_TILE_SIDE)
+    return BASE_TOKENS + TILE_TOKENS * tiles
+
+
+def tile_boxes(width: int, height: int) -> list[tuple[int, int, int, int]]:
+    """The crop boxes of the tiles of an image, or no box if it is not tiled.
+
+    An image is tiled when the model would shrink it by more than TILING_SCALE.
+    The tiles are then sized so that they are shrunk by about TILE_SCALE, and
+    enlarged to keep at most settings.IMAGE_MAX_TILES tiles.
     """
-    response = llm.invoke(
-        [
-            (
-                "human",
-                [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image",
-                        "source_type": "url",
-                        "url": image_url,
-                    },
-                ],
+    if model_size(width, height)[0] / width >= TILING_SCALE:
+        return []
+    tile_side = MODEL_MAX_SHORT_SIDE / TILE_SCALE
+    while True:
+        columns = math.ceil(width / tile_side)
+        rows = math.ceil(height / tile_side)
+        if columns * rows <= settings.IMAGE_MAX_TILES:
+            break
+        tile_side *= 1.25
+    if columns * rows == 1:
+        return []
+
+    boxes = []
+    margin_x = round(width / columns * TILE_OVERLAP)
+    margin_y = round(height / rows * TILE_OVERLAP)
+    for row in range(rows):
+        for column in range(columns):
+            boxes.append(
+                (
+                    max(0, column * width // columns - margin_x),
+                    max(0, row * height // rows - margin_y),
+                    min(width, (column + 1) * width // columns + margin_x),
+                    min(height, (row + 1) * height // rows + margin_y),
+                )
             )
-        ]
+    return boxes
+
+
+def image_hash(file_path: str) -> tuple[str, tuple[int, int]]:
+    """The hash of the pixels of an image file, and the size of the image.
+
+    Only images with the same pixels share a hash, e.g. the same image downloaded
+    from two URLs, or saved again without loss with other metadata.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(file_path) as img:
+        size = img.size
+        img = ImageOps.exif_transpose(img)
+        digest = hashlib.sha256(f"{img.mode} {img.width}x{img.height}\n".encode())
+        digest.update(img.tobytes())
+    return digest.hexdigest(), size
+
+
+def _has_transparency(img: "Image.Image") -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+
+
+def encode_image(img: "Image.Image") -> tuple[bytes, str]:
+    """Encode an image as PNG or JPEG, whichever suits its content.
+
+    Images with transparency or few colors (screenshots, diagrams, charts) are
+    encoded as PNG, which keeps them sharp; other images (photos) as JPEG.
+
+    Returns:
+        tuple[bytes, str]: The encoded image and its MIME type.
+    """
+    buffer = io.BytesIO()
+    if _has_transparency(img):
+        img.convert("RGBA").save(buffer, format="PNG")
+        return buffer.getvalue(), "image/png"
+    img = img.convert("RGB")
+    if img.getcolors(maxcolors=256) is not None:
+        img.save(buffer, format="PNG")
+        return buffer.getvalue(), "image/png"
+    img.save(buffer, format="JPEG", quality=settings.IMAGE_JPEG_QUALITY)
+    return buffer.getvalue(), "image/jpeg"
+
+
+@dataclasses.dataclass
+class ImagePart:
+    """An image, or a tile of an image, ready to be sent to the model."""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+    @property
+    def detail(self) -> str:
+        # In low detail, the model sees the image at 512x512: no loss for small images
+        return "low" if max(self.width, self.height) <= TOKEN_TILE_SIDE else "high"
+
+    def content_block(self) -> dict[str, Any]:
+        data = base64.b64encode(self.data).decode()
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{self.mime_type};base64,{data}",
+                "detail": self.detail,
+            },
+        }
+
+
+@dataclasses.dataclass
+class PreparedImage:
+    """The parts of an image sent to the model, and what they save."""
+
+    parts: list[ImagePart]
+    # The size of the original file, and the tokens it would cost if sent as is
+    original_bytes: int
+    original_tokens: int
+
+    @property
+    def sent_bytes(self) -> int:
+        return sum(len(part.data) for part in self.parts)
+
+    @property
+    def sent_tokens(self) -> int:
+        return sum(
+            estimate_tokens(part.width, part.height, part.detail) for part in self.parts
+        )
+
+
+def _resized_part(img: "Image.Image") -> ImagePart:
+    from PIL import Image
+
+    size = model_size(*img.size)
+    if size != img.size:
+        img = img.resize(size, Image.LANCZOS)
+    data, mime_type = encode_image(img)
+    return ImagePart(data, mime_type, *size)
+
+
+def prepare_image(file_path: str) -> PreparedImage:
+    """Downscale, tile and encode an image file for the model."""
+    from PIL import Image, ImageOps
+
+    original_bytes = os.path.getsize(file_path)
+    with Image.open(file_path) as img:
+        source_format = img.format
+        width, height = img.size
+        # Whether the model can be sent the file as is
+        can_passthrough = (
+            source_format in PASSTHROUGH_FORMATS
+            and img.getexif().get(EXIF_ORIENTATION, 1) == 1
+            and not getattr(img, "is_animated", False)
+        )
+        tiled = bool(tile_boxes(width, height))
+        if not tiled and source_format == "JPEG":
+            # Decode the JPEG at a reduced scale, close to the size sent
+            img.draft("RGB", model_size(width, height))
+        img = ImageOps.exif_transpose(img)
+        if tiled:
+            # A downscaled overview of the image, then its tiles
+            parts = [_resized_part(img)]
+            parts.extend(_resized_part(img.crop(box)) for box in tile_boxes(*img.size))
+        else:
+            part = _resized_part(img)
+            if can_passthrough and original_bytes <= len(part.data):
+                with open(file_path, "rb") as f:
+                    part = ImagePart(f.read(), Image.MIME[source_format], width, height)
+            parts = [part]
+
+    return PreparedImage(
+        parts=parts,
+        original_bytes=original_bytes,
+        original_tokens=estimate_tokens(width, height),
     )
-    return response.text()
 
 
-def analyze_image_file(llm, file_path: str, prompt="What's in this image?") -> str:
-    """Analyzes an image from a file using the provided LLM.
+# -----------------------------------------
+# Vision calls
+
+
+def _cache_key(image_hash: str, prompt: str) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+    return f"vision://{VISION_MODEL}/{image_hash}/{prompt_hash}"
+
+
+def analyze_image_file(
+    file_path: str, prompt="What's in this image?", llm: "ChatOpenAI | None" = None
+) -> str:
+    """Analyzes an image from a file, reusing the cached answer if any.
 
     Args:
-        llm (ChatOpenAI): The LLM to use for analysis.
         file_path (str): The path to the image file to analyze.
         prompt (str, optional): The prompt to use for analysis. Defaults to "What's in this image?".
+        llm (ChatOpenAI | None, optional): The LLM to use for analysis. Defaults to the vision model.
 
     Returns:
         str: The analysis result.
     """
-    img = Image.open(file_path)
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    image_data = base64.b64encode(buffered.getvalue()).decode()
+    pixels_hash, size = image_hash(file_path)
+    key = _cache_key(pixels_hash, prompt)
+    cached_path = workspace.lookup(key)
+    if cached_path is not None:
+        print(
+            f"Image {file_path}: cached answer, saved a vision call of "
+            f"{os.path.getsize(file_path)} bytes and ~{estimate_tokens(*size)} tokens"
+        )
+        with open(cached_path, encoding="utf-8") as f:
+            return f.read()
+
+    image = prepare_image(file_path)
+    saved_tokens = image.original_tokens - image.sent_tokens
+    print(
+        f"Image {file_path}: {len(image.parts)} part(s), {image.sent_bytes} bytes "
+        f"instead of {image.original_bytes}, ~{image.sent_tokens} tokens instead of "
+        f"~{image.original_tokens} (saved {image.original_bytes - image.sent_bytes} "
+        + (
+            f"bytes and ~{saved_tokens} tokens)"
+            if saved_tokens >= 0
+            else f"bytes, ~{-saved_tokens} more tokens for the tiles)"
+        )
+    )
+    llm = llm or get_vision_llm()
     response = llm.invoke(
         [
             {
                 "role": "user",
                 "content": [
                     {"type": "text", "text": prompt},
-                    {
-                        "type": "image",
-                        "source_type": "base64",
-                        "data": image_data,
-                        "mime_type": "image/jpeg",
-                    },
+                    *(part.content_block() for part in image.parts),
                 ],
             }
         ],
     )
-    return response.text()
+    answer = response.text()
+    workspace.store(key, [answer.encode("utf-8")], extension=".txt")
+    return answer
 
 
 @tool
@@ -94,18 +342,12 @@ def analyze_image(
         str: The analysis result.
     """
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            api_key=settings.OPENAI_API_KEY,
-        )
-
-        if file_path:
-            return analyze_image_file(llm, file_path, prompt)
-        elif image_url:
-            return analyze_image_url(llm, image_url, prompt)
-        else:
+        if image_url and not file_path:
+            # Downloaded to be prepared, and reused from the download cache
+            file_path = workspace.fetch(image_url, default_extension=".png")
+        if not file_path:
             raise ValueError("Either file_path or image_url must be provided")
+        return analyze_image_file(file_path, prompt)
     except Exception as e:
         print(f"Error describing image: {e}")
         return f"Error: {str(e)}"
@@ -116,6 +358,14 @@ if __name__ == "__main__":
     prompt = input("Enter a prompt: ")
 
     if os.path.exists(image_url_or_file_path):
-        print(analyze_image(prompt=prompt, file_path=image_url_or_file_path))
+        print(
+            analyze_image.invoke(
+                {"prompt": prompt, "file_path": image_url_or_file_path}
+            )
+        )
     else:
-        print(analyze_image(prompt=prompt, image_url=image_url_or_file_path))
+        print(
+            analyze_image.invoke(
+                {"prompt": prompt, "image_url": image_url_or_file_path}
+            )
+        )
@@ -0,0 +1,216 @@
+"""Reuse the results of identical tool calls.
+
+The model often repeats a tool call while answering a question (the same web search,
+or loading the same file twice). The tools wrapped by `memoize_tools` return the
+result of the previous identical call instead of running again.
+
+Two calls are identical when they have the same canonical arguments: the defaults of
+the tool are filled in, the strings are stripped, and the arguments are sorted. The
+results are kept for the current question, unless a tool is given a "run" scope,
+and optionally for a limited time. Exceptions and results starting with "Error" are
+not kept, so that a failed call can be retried.
+"""
+
+import dataclasses
+import json
+import threading
+import time
+from typing import Any, Callable, Literal, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool
+
+Scope = Literal["question", "run"]
+
+
+@dataclasses.dataclass
+class ToolCacheStats:
+    calls: int = 0
+    hits: int = 0
+    hits_by_tool: dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class _Entry:
+    result: Any
+    scope: Scope
+    expires_at: float | None
+
+
+class ToolCallCache:
+    """Results of the tool calls, by tool and canonical arguments.
+
+    The results and the statistics are scoped to a question: call `reset` when the
+    question ends.
+    """
+
+    def __init__(self):
+        self.stats = ToolCacheStats()
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tool_name: str, key: str) -> tuple[bool, Any]:
+        """Return whether a result is cached for a call, and the result."""
+        with self._lock:
+            self.stats.calls += 1
+            entry = self._entries.get((tool_name, key))
+            if entry is None:
+                return False, None
+            if entry.expires_at is not None and entry.expires_at < time.monotonic():
+                del self._entries[(tool_name, key)]
+                return False, None
+            self.stats.hits += 1
+            self.stats.hits_by_tool[tool_name] = (
+                self.stats.hits_by_tool.get(tool_name, 0) + 1
+            )
+            return True, entry.result
+
+    def put(
+        self,
+        tool_name: str,
+        key: str,
+        result: Any,
+        scope: Scope = "question",
+        ttl_s: float | None = None,
+    ) -> None:
+        if isinstance(result, str) and result.startswith("Error"):
+            return
+        expires_at = None if ttl_s is None else time.monotonic() + ttl_s
+        with self._lock:
+            self._entries[(tool_name, key)] = _Entry(result, scope, expires_at)
+
+    def reset(self) -> ToolCacheStats:
+        """Drop the results scoped to the question, and return its statistics."""
+        with self._lock:
+            stats = self.stats
+            self.stats = ToolCacheStats()
+            self._entries = {
+                call: entry
+                for call, entry in self._entries.items()
+                if entry.scope == "run"
+            }
+        return stats
+
+
+tool_cache = ToolCallCache()
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+class MemoizedTool(BaseTool):
+    """A tool that reuses the results of the identical calls of another tool."""
+
+    tool: BaseTool
+    cache: ToolCallCache
+    scope: Scope = "question"
+    ttl_s: Optional[float] = None
+    # The function of the tool, from which the prompt renders its signature
+    func: Optional[Callable] = None
+
+    def __init__(self, tool: BaseTool, **kwargs):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            # The schema inferred from _run would be the one of this wrapper
+            args_schema=tool.args_schema or tool.get_input_schema(),
+            return_direct=tool.return_direct,
+            func=getattr(tool, "func", None),
+            tool=tool,
+            **kwargs,
+        )
+
+    def _key(self, args: tuple, kwargs: dict) -> str:
+        arguments = {}
+        schema = self.args_schema
+        if isinstance(schema, type) and hasattr(schema, "model_fields"):
+            # Calls that omit an argument are the same as those that give its default
+            for name, field in schema.model_fields.items():
+                if not field.is_required():
+                    arguments[name] = field.get_default(call_default_factory=True)
+        arguments.update(kwargs)
+        return json.dumps(
+            {"args": _canonical(args), "kwargs": _canonical(arguments)},
+            sort_keys=True,
+            default=str,
+        )
+
+    def _run(
+        self,
+        *args,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs,
+    ) -> Any:
+        key = self._key(args, kwargs)
+        found, result = self.cache.get(self.name, key)
+        if found:
+            return result
+        result = self.tool.run(
+            args[0] if args else kwargs,
+            callbacks=run_manager.get_child() if run_manager else None,
+        )
+        self.cache.put(self.name, key, result, self.scope, self.ttl_s)
+        return result
+
+    async def _arun(
+        self,
+        *args,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+        **kwargs,
+    ) -> Any:
+        key = self._key(args, kwargs)
+        found, result = self.cache.get(self.name, key)
+        if found:
+            return result
+        result = await self.tool.arun(
+            args[0] if args else kwargs,
+            callbacks=run_manager.get_child() if run_manager else None,
+        )
+        self.cache.put(self.name, key, result, self.scope, self.ttl_s)
+        return result
+
+
+def memoize_tools(
+    tools: list[BaseTool],
+    exclude: set[str] = frozenset(),
+    ttl_s: dict[str, float] | None = None,
+    run_scoped: set[str] = frozenset(),
+    cache: ToolCallCache = tool_cache,
+) -> list[BaseTool]:
+    """Wrap tools so that they reuse the results of identical calls.
+
+    Args:
+        tools (list[BaseTool]): The tools.
+        exclude (set[str], optional): Names of the tools left as they are, e.g. those
+            with side effects or that depend on a state.
+        ttl_s (dict[str, float] | None, optional): Time to live of the results, by
+            tool name. By default, the results are kept for the whole scope.
+        run_scoped (set[str], optional): Names of the tools whose results are kept
+            across questions, instead of for the current question.
+        cache (ToolCallCache, optional): The cache of the results.
+
+    Returns:
+        list[BaseTool]: The tools, wrapped unless excluded.
+    """
+    ttl_s = ttl_s or {}
+    return [
+        tool
+        if tool.name in exclude
+        else MemoizedTool(
+            tool,
+            cache=cache,
+            scope="run" if tool.name in run_scoped else "question",
+            ttl_s=ttl_s.get(tool.name),
+        )
+        for tool in tools
+    ]
@@ -1,10 +1,7 @@
 import ast
 import logging
 
-import stockfish
-import pint
 from langchain_core.tools import tool
-from langchain_experimental.utilities import PythonREPL
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +33,8 @@ def run_python(code: str | None = None, file_path: str | None = None) -> str:
                 code = f.read()
                 logger.debug(f"Executing code from file: {file_path}")
 
+        from langchain_experimental.utilities import PythonREPL
+
         repl = PythonREPL()
         output = repl.run(command=code, timeout=30)
         if output:
@@ -63,6 +62,8 @@ def chess(fen: str, depth: int = 20) -> str:
         str: The best move
 
     """
+    import stockfish
+
     engine = stockfish.Stockfish(depth=depth)
     engine.set_position(fen)
     return engine.get_best_move()
@@ -85,6 +86,8 @@ def convert_unit(value: float, from_unit: str, to_unit: str) -> float:
     Returns:
         float: The converted value.
     """
+    import pint
+
     ureg = pint.UnitRegistry()
     return ureg.convert(value, from_unit, to_unit)
 
@@ -0,0 +1,416 @@
+"""Direct conversion of Word (.docx) and PowerPoint (.pptx) files to markdown.
+
+The XML parts of the documents are read from the archive and walked once with lxml,
+and the markdown is written to lists of strings joined at the end, instead of going
+through an intermediate HTML document.
+
+Large decks are converted by several threads: lxml releases the GIL while parsing,
+which is a large part of the conversion of a slide.
+"""
+
+import itertools
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree
+
+from .tables import markdown_row
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+NOTES_SLIDE_RELATIONSHIP = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+)
+
+# Tags compared in the inner loops
+W_P, W_R, W_T, W_TBL, W_TR, W_TC = (
+    W + tag for tag in ("p", "r", "t", "tbl", "tr", "tc")
+)
+W_VAL = W + "val"
+W_HYPERLINK = W + "hyperlink"
+W_BREAKS = (W + "br", W + "cr")
+# Block containers whose content is rendered as if it was in the body
+W_BLOCK_CONTAINERS = (W + "sdt", W + "sdtContent", W + "customXml")
+# Inline elements whose text is not part of the document
+W_SKIPPED_INLINE = (W + "pPr", W + "del", W + "moveFrom", W + "rPr")
+A_P, A_R, A_T, A_BR, A_FLD = (A + tag for tag in ("p", "r", "t", "br", "fld"))
+P_SP, P_PIC, P_GRAPHIC_FRAME, P_GROUP = (
+    P + tag for tag in ("sp", "pic", "graphicFrame", "grpSp")
+)
+
+# Decks from this number of slides are converted by several threads
+PARALLEL_MIN_SLIDES = 50
+MAX_WORKERS = 4
+
+_HEADING_RE = re.compile(r"^heading\s*(\d)$")
+TITLE_PLACEHOLDERS = ("title", "ctrTitle")
+
+
+def _read_xml(archive: zipfile.ZipFile, part: str) -> etree._Element | None:
+    try:
+        return etree.fromstring(archive.read(part))
+    except KeyError:
+        return None
+
+
+def _read_relationships(
+    archive: zipfile.ZipFile, part: str
+) -> dict[str, tuple[str, str]]:
+    """Read the relationships of a part: their type and target, by id.
+
+    The targets of internal relationships are resolved to part names.
+    """
+    folder, name = posixpath.split(part)
+    root = _read_xml(archive, posixpath.join(folder, "_rels", name + ".rels"))
+    if root is None:
+        return {}
+    relationships = {}
+    for relationship in root:
+        target = relationship.get("Target", "")
+        if relationship.get("TargetMode") != "External":
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+        relationships[relationship.get("Id")] = (relationship.get("Type"), target)
+    return relationships
+
+
+def _markdown_grid(rows: list[list[str]]) -> str:
+    """Render table rows as markdown, the first one being the header."""
+    if not rows:
+        return ""
+    nb_columns = max(len(row) for row in rows)
+    rows = [row + [""] * (nb_columns - len(row)) for row in rows]
+    lines = [markdown_row(rows[0]), "|" + "---|" * nb_columns]
+    lines.extend(markdown_row(row) for row in rows[1:])
+    return "\n".join(lines)
+
+
+def _is_on(element: etree._Element | None) -> bool:
+    """Whether a boolean property (e.g. w:b) is set."""
+    return element is not None and element.get(W_VAL) not in ("0", "false")
+
+
+def _emphasize(text: str, bold: bool, italic: bool) -> str:
+    marker = ("**" if bold else "") + ("*" if italic else "")
+    content = text.strip()
+    if not marker or not content:
+        return text
+    # Markdown emphasis cannot start or end with a space
+    start = text[: len(text) - len(text.lstrip())]
+    end = text[len(text.rstrip()) :]
+    return f"{start}{marker}{content}{marker[::-1]}{end}"
+
+
+# -----------------------------------------
+# Word documents
+
+
+class _DocxRenderer:
+    def __init__(self, archive: zipfile.ZipFile):
+        self.relationships = _read_relationships(archive, "word/document.xml")
+        self.heading_levels = self._heading_levels(archive)
+        self.list_formats = self._list_formats(archive)
+        self.parts: list[str] = []
+        self.previous_is_list_item = False
+
+    @staticmethod
+    def _heading_levels(archive: zipfile.ZipFile) -> dict[str, int]:
+        """The heading level of the paragraph styles, by style id."""
+        root = _read_xml(archive, "word/styles.xml")
+        if root is None:
+            return {}
+        levels = {}
+        for style in root.iter(W + "style"):
+            name_element = style.find(W + "name")
+            if name_element is None:
+                continue
+            name = name_element.get(W_VAL, "").lower()
+            match = _HEADING_RE.match(name)
+            if match:
+                levels[style.get(W + "styleId")] = int(match.group(1))
+            elif name == "title":
+                levels[style.get(W + "styleId")] = 1
+        return levels
+
+    @staticmethod
+    def _list_formats(archive: zipfile.ZipFile) -> dict[tuple[str, str], str]:
+        """The number format (bullet, decimal...) of the lists, by (numId, ilvl)."""
+        root = _read_xml(archive, "word/numbering.xml")
+        if root is None:
+            return {}
+        abstract_formats: dict[str, dict[str, str]] = {}
+        for abstract in root.iter(W + "abstractNum"):
+            levels = abstract_formats.setdefault(abstract.get(W + "abstractNumId"), {})
+            for level in abstract.iter(W + "lvl"):
+                number_format = level.find(W + "numFmt")
+                if number_format is not None:
+                    levels[level.get(W + "ilvl")] = number_format.get(W_VAL)
+        formats = {}
+        for num in root.iter(W + "num"):
+            abstract_id = num.find(W + "abstractNumId")
+            if abstract_id is None:
+                continue
+            levels = abstract_formats.get(abstract_id.get(W_VAL), {})
+            for level, number_format in levels.items():
+                formats[(num.get(W + "numId"), level)] = number_format
+        return formats
+
+    def render(self, body: etree._Element) -> str:
+        self._blocks(body)
+        return "".join(self.parts)
+
+    def _add_block(self, text: str, is_list_item: bool = False) -> None:
+        if self.parts:
+            # Keep the items of a list together
+            both_items = is_list_item and self.previous_is_list_item
+            self.parts.append("\n" if both_items else "\n\n")
+        self.parts.append(text)
+        self.previous_is_list_item = is_list_item
+
+    def _blocks(self, container: etree._Element) -> None:
+        for child in container:
+            if child.tag == W_P:
+                self._paragraph(child)
+            elif child.tag == W_TBL:
+                self._add_block(self._table(child))
+            elif child.tag in W_BLOCK_CONTAINERS:
+                self._blocks(child)
+
+    def _paragraph(self, paragraph: etree._Element) -> None:
+        text = self._inline(paragraph).strip()
+        if not text:
+            return
+        properties = paragraph.find(W + "pPr")
+        if properties is None:
+            self._add_block(text)
+            return
+
+        style = properties.find(W + "pStyle")
+        if style is not None and style.get(W_VAL) in self.heading_levels:
+            level = self.heading_levels[style.get(W_VAL)]
+            self._add_block("#" * level + " " + " ".join(text.split()))
+            return
+
+        numbering = properties.find(W + "numPr")
+        if numbering is not None:
+            num_id = numbering.find(W + "numId")
+            indent = numbering.find(W + "ilvl")
+            num_id = num_id.get(W_VAL) if num_id is not None else None
+            indent = indent.get(W_VAL, "0") if indent is not None else "0"
+            number_format = self.list_formats.get((num_id, indent), "bullet")
+            marker = "-" if number_format in ("bullet", "none") else "1."
+            item = "  " * int(indent) + marker + " " + text.replace("\n", " ")
+            self._add_block(item, is_list_item=True)
+            return
+        self._add_block(text)
+
+    def _inline(self, element: etree._Element) -> str:
+        """Render the runs of a paragraph, with their emphasis and hyperlinks."""
+        runs: list[tuple[str, bool, bool]] = []
+        self._collect_runs(element, runs)
+        # Word often splits text with the same formatting into several runs
+        return "".join(
+            _emphasize("".join(run[0] for run in group), bold, italic)
+            for (bold, italic), group in itertools.groupby(
+                runs, key=lambda run: (run[1], run[2])
+            )
+        )
+
+    def _collect_runs(
+        self, element: etree._Element, runs: list[tuple[str, bool, bool]]
+    ) -> None:
+        for child in element:
+            tag = child.tag
+            if tag == W_R:
+                runs.append(self._run(child))
+            elif tag == W_HYPERLINK:
+                text = self._inline(child)
+                relationship = self.relationships.get(child.get(R + "id"))
+                if relationship is not None and text.strip():
+                    text = f"[{text.strip()}]({relationship[1]})"
+                runs.append((text, False, False))
+            elif tag in W_SKIPPED_INLINE or not isinstance(tag, str):
+                # Skip the deleted text, the properties and the comments
+                continue
+            else:
+                # Tracked insertions, smart tags, fields, content controls...
+                self._collect_runs(child, runs)
+
+    @staticmethod
+    def _run(run: etree._Element) -> tuple[str, bool, bool]:
+        """The text of a run, and whether it is bold and italic."""
+        parts = []
+        for child in run:
+            tag = child.tag
+            if tag == W_T:
+                parts.append(child.text or "")
+            elif tag == W + "tab":
+                parts.append("\t")
+            elif tag in W_BREAKS:
+                if child.get(W + "type") != "page":
+                    parts.append("\n")
+            elif tag == W + "noBreakHyphen":
+                parts.append("-")
+        text = "".join(parts)
+        properties = run.find(W + "rPr")
+        if properties is None:
+            return text, False, False
+        return text, _is_on(properties.find(W + "b")), _is_on(properties.find(W + "i"))
+
+    def _table(self, table: etree._Element) -> str:
+        rows = []
+        for row in table.findall(W_TR):
+            cells = []
+            for cell in row.findall(W_TC):
+                # The paragraphs of nested tables are part of the text of the cell
+                text = " ".join(self._inline(paragraph) for paragraph in cell.iter(W_P))
+                cells.append(" ".join(text.split()))
+                span = cell.find(f"{W}tcPr/{W}gridSpan")
+                if span is not None:
+                    cells.extend([""] * (int(span.get(W_VAL, "1")) - 1))
+            rows.append(cells)
+        return _markdown_grid(rows)
+
+
+def docx_to_markdown(path: str) -> str:
+    """Convert a Word document to markdown.
+
+    Headings, lists, bold and italic text, hyperlinks and tables are kept.
+    """
+    with zipfile.ZipFile(path) as archive:
+        renderer = _DocxRenderer(archive)
+        root = etree.fromstring(archive.read("word/document.xml"))
+    body = root.find(W + "body")
+    if body is None:
+        return ""
+    return renderer.render(body)
+
+
+# -----------------------------------------
+# PowerPoint presentations
+
+
+def _text_body(element: etree._Element) -> str:
+    """The text of the paragraphs of a shape or table cell."""
+    paragraphs = []
+    for paragraph in element.iter(A_P):
+        parts = []
+        for child in paragraph:
+            if child.tag == A_R or child.tag == A_FLD:
+                text = child.find(A_T)
+                parts.append((text.text or "") if text is not None else "")
+            elif child.tag == A_BR:
+                parts.append("\n")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs).strip()
+
+
+def _placeholder_type(shape: etree._Element) -> str | None:
+    placeholder = shape.find(f".//{P}nvPr/{P}ph")
+    if placeholder is None:
+        return None
+    # Placeholders without a type are body placeholders
+    return placeholder.get("type", "body")
+
+
+def _slide_shapes(tree: etree._Element, parts: list[str]) -> None:
+    for shape in tree:
+        tag = shape.tag
+        if tag == P_SP:
+            text_body = shape.find(P + "txBody")
+            text = _text_body(text_body) if text_body is not None else ""
+            if not text:
+                continue
+            if _placeholder_type(shape) in TITLE_PLACEHOLDERS:
+                parts.append("# " + " ".join(text.split()))
+            else:
+                parts.append(text)
+        elif tag == P_PIC:
+            properties = shape.find(f"{P}nvPicPr/{P}cNvPr")
+            name = properties.get("name", "") if properties is not None else ""
+            alt_text = properties.get("descr", "") if properties is not None else ""
+            # A placeholder file name
+            filename = re.sub(r"\W", "", name) + ".jpg"
+            parts.append(f"![{alt_text or name}]({filename})")
+        elif tag == P_GRAPHIC_FRAME:
+            table = shape.find(f".//{A}tbl")
+            if table is not None:
+                rows = [
+                    [" ".join(_text_body(cell).split()) for cell in row.iter(A + "tc")]
+                    for row in table.iter(A + "tr")
+                ]
+                parts.append(_markdown_grid(rows))
+        elif tag == P_GROUP:
+            _slide_shapes(shape, parts)
+
+
+def _convert_slide(number: int, slide_xml: bytes, notes_xml: bytes | None) -> str:
+    parts = [f"<!-- Slide number: {number} -->"]
+    tree = etree.fromstring(slide_xml).find(f"{P}cSld/{P}spTree")
+    if tree is not None:
+        _slide_shapes(tree, parts)
+    if notes_xml is not None:
+        notes = [
+            _text_body(shape)
+            for shape in etree.fromstring(notes_xml).iter(P_SP)
+            if _placeholder_type(shape) == "body"
+        ]
+        parts.append("### Notes:\n" + "\n".join(note for note in notes if note))
+    return "\n".join(parts)
+
+
+def _read_slides(path: str) -> list[tuple[int, bytes, bytes | None]]:
+    """Read the XML of the slides and their notes, in the order of the deck."""
+    slides = []
+    with zipfile.ZipFile(path) as archive:
+        relationships = _read_relationships(archive, "ppt/presentation.xml")
+        presentation = etree.fromstring(archive.read("ppt/presentation.xml"))
+        for number, slide_id in enumerate(presentation.iter(P + "sldId"), start=1):
+            slide_part = relationships[slide_id.get(R + "id")][1]
+            notes_part = next(
+                (
+                    target
+                    for relationship_type, target in _read_relationships(
+                        archive, slide_part
+                    ).values()
+                    if relationship_type == NOTES_SLIDE_RELATIONSHIP
+                ),
+                None,
+            )
+            slides.append(
+                (
+                    number,
+                    archive.read(slide_part),
+                    archive.read(notes_part) if notes_part else None,
+                )
+            )
+    return slides
+
+
+def pptx_to_markdown(path: str, max_workers: int | None = None) -> str:
+    """Convert a PowerPoint presentation to markdown, slide by slide.
+
+    Args:
+        path (str): Path to the .pptx file.
+        max_workers (int | None, optional): Number of threads converting the slides
+            of large decks. Defaults to the number of CPUs, up to MAX_WORKERS.
+
+    Returns:
+        str: The markdown content.
+    """
+    slides = _read_slides(path)
+    max_workers = max_workers or min(os.cpu_count() or 1, MAX_WORKERS)
+    if len(slides) >= PARALLEL_MIN_SLIDES and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sections = list(executor.map(_convert_slide, *zip(*slides)))
+    else:
+        sections = [_convert_slide(*slide) for slide in slides]
+    return "\n\n".join(sections)
@@ -0,0 +1,185 @@
+"""Speculative prefetch of web search results.
+
+After a web search, the agent usually opens one of the top results in its next step.
+The prefetcher fetches and converts those pages in the background while the model is
+thinking, so that the browser and file tools can use them without waiting, or wait
+for the end of a fetch already running instead of starting another one.
+"""
+
+import contextlib
+import dataclasses
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import settings
+from .html_markdown import decode_html, html_to_markdown
+from .tracing import tracer
+from .http_client import get_session
+
+
+@dataclasses.dataclass
+class PrefetchedPage:
+    url: str
+    html: str
+    title: str | None
+    markdown: str
+    fetch_duration_s: float
+
+
+@dataclasses.dataclass
+class PrefetchStats:
+    scheduled: int = 0
+    fetched: int = 0
+    failed: int = 0
+    used: int = 0
+    bytes_fetched: int = 0
+    latency_saved_s: float = 0.0
+
+
+class Prefetcher:
+    """Fetch and convert pages in background threads, within a byte budget.
+
+    The bytes of the fetches that are aborted or fail are given back to the budget.
+    The budget, the prefetched pages and the statistics are scoped to a question:
+    call `reset` when the question ends to cancel the pending fetches.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.PREFETCH_SEARCH_RESULTS,
+        top_n: int = settings.PREFETCH_TOP_N,
+        max_bytes: int = settings.PREFETCH_MAX_BYTES,
+        max_workers: int = 4,
+        timeout_s: float = 10,
+    ):
+        self.enabled = enabled
+        self.top_n = top_n
+        self.max_bytes = max_bytes
+        self.timeout_s = timeout_s
+        self.stats = PrefetchStats()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="prefetch"
+        )
+        self._lock = threading.Lock()
+        self._futures: dict[str, Future] = {}
+        self._pages: dict[str, PrefetchedPage] = {}
+        # Bytes of the budget taken by the fetches running or kept
+        self._budget_used = 0
+        # Incremented on reset, so that fetches of a previous question are dropped
+        self._generation = 0
+
+    def schedule(self, urls: list[str]) -> None:
+        """Start prefetching the first `top_n` URLs, if enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for url in urls[: self.top_n]:
+                if url in self._futures or self._budget_used >= self.max_bytes:
+                    continue
+                self.stats.scheduled += 1
+                self._futures[url] = self._executor.submit(
+                    self._fetch, url, self._generation
+                )
+
+    def schedule_search_results(self, search_results: dict) -> None:
+        """Prefetch the top results returned by the web search tool."""
+        if not isinstance(search_results, dict):
+            return
+        self.schedule(
+            [
+                result["url"]
+                for result in search_results.get("results", [])
+                if result.get("url")
+            ]
+        )
+
+    def _fetch(self, url: str, generation: int) -> None:
+        # The chunks downloaded, whose bytes are taken from the budget
+        chunks: list[bytes] = []
+        try:
+            page = self._download(url, generation, chunks)
+        except Exception as e:
+            # Not raised by the future, which nobody waits for
+            print(f"Prefetch of {url} failed: {e}")
+            page = None
+            with self._lock:
+                if generation == self._generation:
+                    self.stats.failed += 1
+        with self._lock:
+            if generation != self._generation:
+                return
+            if page is None:
+                self._budget_used -= sum(len(chunk) for chunk in chunks)
+            else:
+                self._pages[url] = page
+                self.stats.fetched += 1
+
+    def _download(
+        self, url: str, generation: int, chunks: list[bytes]
+    ) -> PrefetchedPage | None:
+        """Fetch and convert a page, or return None if it is not HTML or is aborted."""
+        start_time = time.perf_counter()
+        with get_session().get(url, timeout=self.timeout_s, stream=True) as response:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code != 200 or "html" not in content_type:
+                return None
+            for chunk in response.iter_content(chunk_size=65536):
+                with self._lock:
+                    if generation != self._generation:
+                        return None
+                    if self._budget_used + len(chunk) > self.max_bytes:
+                        return None
+                    self._budget_used += len(chunk)
+                    self.stats.bytes_fetched += len(chunk)
+                chunks.append(chunk)
+
+        html = decode_html(b"".join(chunks), content_type)
+        with tracer.span("convert html", "conversion", url=url, prefetch=True):
+            title, markdown = html_to_markdown(html)
+        return PrefetchedPage(
+            url=url,
+            html=html,
+            title=title,
+            markdown=markdown,
+            fetch_duration_s=time.perf_counter() - start_time,
+        )
+
+    def pop(self, url: str) -> PrefetchedPage | None:
+        """Return the prefetched page for a URL, waiting for it if it is being fetched.
+
+        Only the part of the fetch the caller did not wait for counts as saved.
+        """
+        request_time = time.perf_counter()
+        with self._lock:
+            future = self._futures.get(url)
+        if future is not None and future.running():
+            with contextlib.suppress(Exception):
+                future.result(timeout=self.timeout_s)
+        waited_s = time.perf_counter() - request_time
+        with self._lock:
+            page = self._pages.pop(url, None)
+            if page is not None:
+                self.stats.used += 1
+                self.stats.latency_saved_s += max(0.0, page.fetch_duration_s - waited_s)
+            return page
+
+    def reset(self) -> PrefetchStats:
+        """Cancel the pending fetches and drop the unused pages.
+
+        Returns:
+            PrefetchStats: The statistics of the question that just ended.
+        """
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            stats = self.stats
+            self._futures = {}
+            self._pages = {}
+            self._budget_used = 0
+            self._generation += 1
+            self.stats = PrefetchStats()
+        return stats
+
+
+prefetcher = Prefetcher()
@@ -1,14 +1,292 @@
-from langchain_tavily import TavilySearch
+"""Web search, with several queries run concurrently and a disk cache.
+
+A question often needs several phrasings of a search. The web search tool takes a list
+of queries and sends them concurrently to the search backend, so that they cost one
+step of the agent and about one round-trip. Their results are merged: a page found
+by several queries is returned once, with the queries that found it.
+
+The responses of the backend are cached in the workspace by query and parameters, for
+a limited time, so that a search repeated in another question or another run does
+not call the backend again.
+
+The backend is Tavily, or a local fake backend for tests and offline benchmarks,
+selected with the SEARCH_BACKEND setting.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+from langchain_core.tools import tool
 
 import settings
+from .http_client import post
+from .prefetch import prefetcher
+from .workspace import workspace
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+
+class SearchBackend:
+    """A search engine, returning responses in the format of the Tavily API:
+    {"query": ..., "results": [{"url": ..., "title": ..., "content": ..., "score": ...}]}
+    """
+
+    name: str
+
+    def search(self, query: str, max_results: int, topic: str) -> dict:
+        raise NotImplementedError
+
+
+class TavilyBackend(SearchBackend):
+    name = "tavily"
+
+    def __init__(self, api_key: str | None = settings.TAVILY_API_KEY):
+        self.api_key = api_key
+
+    def search(self, query: str, max_results: int, topic: str) -> dict:
+        response = post(
+            TAVILY_SEARCH_URL,
+            json={"query": query, "max_results": max_results, "topic": topic},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        if response.status_code != 200:
+            raise ValueError(
+                f"Tavily search failed with status {response.status_code}: "
+                f"{response.text[:200]}"
+            )
+        return response.json()
+
+
+class FakeSearchBackend(SearchBackend):
+    """A deterministic search engine, with a simulated latency.
+
+    Each word of a query matches a page, so that different phrasings of a search
+    return some of the same pages, as a real search engine does.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.5):
+        self.latency_s = latency_s
+        self.nb_calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str, max_results: int, topic: str) -> dict:
+        with self._lock:
+            self.nb_calls += 1
+        time.sleep(self.latency_s)
+        words = sorted(
+            set(re.findall(r"\w+", query.lower())),
+            key=lambda word: zlib.crc32(word.encode()),
+        )
+        return {
+            "query": query,
+            "results": [
+                {
+                    "url": f"https://example.com/{topic}/{word}",
+                    "title": f"About {word}",
+                    "content": f"A page about {word}.",
+                    "score": round(1 - rank / (len(words) + 1), 3),
+                }
+                for rank, word in enumerate(words[:max_results])
+            ],
+        }
+
+
+def get_backend(name: str = settings.SEARCH_BACKEND) -> SearchBackend:
+    if name == "tavily":
+        return TavilyBackend()
+    if name == "fake":
+        return FakeSearchBackend()
+    raise ValueError(f"Unknown search backend: {name}")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so that the same page found by several queries is merged."""
+    parts = urlsplit(url)
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path.rstrip("/") or "/",
+            parts.query,
+            "",
+        )
+    )
+
+
+class SearchCache:
+    """Responses of a search backend, stored in the workspace for a limited time."""
+
+    def __init__(self, ttl_s: float = settings.SEARCH_CACHE_TTL_S):
+        self.ttl_s = ttl_s
+
+    def _key(self, backend: str, query: str, params: dict) -> str:
+        digest = hashlib.sha256(
+            json.dumps([query.casefold(), params], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"search://{backend}/{digest}"
+
+    def get(self, backend: str, query: str, params: dict) -> dict | None:
+        if self.ttl_s <= 0:
+            return None
+        path = workspace.lookup(self._key(backend, query, params))
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        if time.time() - entry["searched_at"] > self.ttl_s:
+            return None
+        return entry["response"]
+
+    def put(self, backend: str, query: str, params: dict, response: dict) -> None:
+        if self.ttl_s <= 0:
+            return
+        content = json.dumps({"searched_at": time.time(), "response": response})
+        workspace.store(
+            self._key(backend, query, params),
+            [content.encode("utf-8")],
+            extension=".json",
+        )
+
+
+class WebSearch:
+    """Run several search queries concurrently, and merge their results."""
+
+    def __init__(
+        self,
+        backend: SearchBackend | None = None,
+        cache: SearchCache | None = None,
+        max_workers: int = settings.SEARCH_MAX_WORKERS,
+    ):
+        self.backend = backend or get_backend()
+        self.cache = cache or SearchCache()
+        self.max_workers = max_workers
+
+    def search_one(self, query: str, max_results: int, topic: str) -> dict:
+        """Search a query, using the cached response if it is recent enough."""
+        params = {"max_results": max_results, "topic": topic}
+        response = self.cache.get(self.backend.name, query, params)
+        if response is None:
+            response = self.backend.search(query, max_results, topic)
+            if response.get("results"):
+                self.cache.put(self.backend.name, query, params, response)
+        return response
+
+    def search(
+        self,
+        queries: list[str],
+        max_results: int = settings.SEARCH_MAX_RESULTS,
+        topic: str = "general",
+    ) -> dict:
+        """Search several queries concurrently.
+
+        Args:
+            queries (list[str]): The queries. Duplicates are searched once.
+            max_results (int, optional): The maximum number of results per query.
+            topic (str, optional): "general", "news" or "finance".
+
+        Returns:
+            dict: The results, deduplicated by URL, with the queries that found each
+                of them, and the error of each query that failed.
+        """
+        # Queries that only differ by case or spacing are searched once
+        unique_queries: dict[str, str] = {}
+        for query in map(normalize_query, queries):
+            if query:
+                unique_queries.setdefault(query.casefold(), query)
+        queries = list(unique_queries.values())
+        responses: dict[str, dict] = {}
+        errors: dict[str, str] = {}
+
+        def search_query(query: str) -> None:
+            try:
+                responses[query] = self.search_one(query, max_results, topic)
+            except Exception as e:
+                errors[query] = str(e)
+
+        if len(queries) <= 1:
+            list(map(search_query, queries))
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(queries)),
+                thread_name_prefix="search",
+            ) as executor:
+                list(executor.map(search_query, queries))
+
+        # Results ordered by their best rank, then by their best score
+        merged: dict[str, dict] = {}
+        for query in queries:
+            for rank, result in enumerate(responses.get(query, {}).get("results", [])):
+                url = normalize_url(result["url"])
+                if url not in merged:
+                    merged[url] = {**result, "rank": rank, "queries": []}
+                entry = merged[url]
+                entry["queries"].append(query)
+                entry["rank"] = min(entry["rank"], rank)
+                if result.get("score", 0) > entry.get("score", 0):
+                    entry.update(content=result["content"], score=result["score"])
+        results = sorted(
+            merged.values(), key=lambda entry: (entry["rank"], -entry.get("score", 0))
+        )
+        for entry in results:
+            del entry["rank"]
+
+        search_results = {"queries": queries, "results": results}
+        if errors:
+            search_results["errors"] = errors
+        return search_results
+
+
+_web_search: WebSearch | None = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> WebSearch:
+    """Return the web search of the agent, creating it on first use."""
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            _web_search = WebSearch()
+        return _web_search
+
+
+@tool("web_search")
+def web_search_tool(queries: list[str], topic: str = "general") -> dict | str:
+    """Search the web with one or more queries, run concurrently.
 
-# -----------------------------------------
-# Web Search
+    Give several phrasings of the search at once (e.g. with synonyms, the names of
+    the entities, or in other languages) rather than searching them one by one.
 
+    Args:
+        queries (list[str]): The search queries, up to 5.
+        topic (str, optional): "general", "news" or "finance". Defaults to "general".
 
-web_search_tool = TavilySearch(
-    max_results=5,
-    topic="general",
-    include_relevant_snippets=True,
-    api_key=settings.TAVILY_API_KEY,
-)
+    Returns:
+        dict | str: The results of all the queries, deduplicated by URL, each with
+            its url, title, content and the queries that found it.
+    """
+    queries = queries[: settings.SEARCH_MAX_QUERIES]
+    if not any(query.strip() for query in queries):
+        return "Error: give at least one search query."
+    search_results = get_web_search().search(queries, topic=topic)
+    if not search_results["results"]:
+        errors = search_results.get("errors")
+        if errors:
+            return f"Error: the search failed: {errors}"
+        return (
+            f"No search results found for {queries}. Try other queries, with fewer "
+            "or more general words."
+        )
+    prefetcher.schedule_search_results(search_results)
+    return search_results
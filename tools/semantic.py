@@ -1,6 +1,4 @@
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.tools import BaseTool
+from langchain_core.tools import BaseTool
 from textwrap import shorten, dedent
 from .files import load_file_or_url
 
@@ -18,6 +16,9 @@ class SemanticSectionRetrieverFromText(BaseTool):
     )
 
     def _retriever(self, raw_text: str, query: str, k: int = 3) -> list[dict]:
+        from langchain_community.embeddings import OpenAIEmbeddings
+        from langchain_community.vectorstores import FAISS
+
         # 1. chunk
         window = 500
         stride = 250
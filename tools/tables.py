@@ -0,0 +1,221 @@
+"""Streaming readers for tabular files (CSV, TSV, Excel).
+
+Rows are read one at a time (csv module, openpyxl in read-only mode, xlrd on demand),
+so that large files can be summarized or loaded elsewhere without building the full
+table in memory.
+"""
+
+import csv
+import dataclasses
+import datetime
+import os
+import re
+from typing import Any, Iterator
+
+TABULAR_EXTENSIONS = ["csv", "tsv", "xlsx", "xlsm", "xls"]
+
+# Numbers with comma thousands separators, e.g. 1,234,567.89
+_THOUSANDS_RE = re.compile(r"^[-+]?\d{1,3}(,\d{3})+(\.\d*)?$")
+
+
+@dataclasses.dataclass
+class Sheet:
+    name: str
+    header: list[str]
+    # Rows are produced lazily, and can only be iterated once
+    rows: Iterator[list[Any]]
+
+
+def _header(values: list[Any]) -> list[str]:
+    """Name the columns, replacing empty and duplicate names.
+
+    The names are compared ignoring the case, as SQLite does for column names.
+    """
+    header = []
+    used: set[str] = set()
+    for i, value in enumerate(values):
+        name = str(value).strip() if value is not None else ""
+        name = name or f"column_{i + 1}"
+        while name.casefold() in used:
+            name += "_"
+        used.add(name.casefold())
+        header.append(name)
+    return header
+
+
+def _sheet(name: str, rows: Iterator[list[Any]]) -> Sheet | None:
+    first_row = next(rows, None)
+    if first_row is None:
+        return None
+    return Sheet(name=name, header=_header(list(first_row)), rows=rows)
+
+
+def _iter_csv(path: str, delimiter: str) -> Iterator[Sheet]:
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        if delimiter == ",":
+            # Sniff the dialect of .csv files, which are not always comma separated
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                pass
+        name = os.path.splitext(os.path.basename(path))[0]
+        sheet = _sheet(name, iter(csv.reader(f, delimiter=delimiter)))
+        if sheet is not None:
+            yield sheet
+
+
+def _iter_xlsx(path: str) -> Iterator[Sheet]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = (list(row) for row in worksheet.iter_rows(values_only=True))
+            sheet = _sheet(worksheet.title, rows)
+            if sheet is not None:
+                yield sheet
+    finally:
+        workbook.close()
+
+
+def _iter_xls(path: str) -> Iterator[Sheet]:
+    import xlrd
+
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        for index in range(workbook.nsheets):
+            worksheet = workbook.sheet_by_index(index)
+            rows = (worksheet.row_values(i) for i in range(worksheet.nrows))
+            sheet = _sheet(worksheet.name, rows)
+            if sheet is not None:
+                yield sheet
+            workbook.unload_sheet(index)
+    finally:
+        workbook.release_resources()
+
+
+def iter_sheets(path: str) -> Iterator[Sheet]:
+    """Iterate over the sheets of a tabular file, reading their rows lazily.
+
+    The first row of each sheet is used as its header.
+
+    Args:
+        path (str): Path to a CSV, TSV or Excel file.
+
+    Returns:
+        Iterator[Sheet]: The sheets of the file (a single one for CSV and TSV files).
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "csv":
+        return _iter_csv(path, ",")
+    if extension == "tsv":
+        return _iter_csv(path, "\t")
+    if extension in ("xlsx", "xlsm"):
+        return _iter_xlsx(path)
+    if extension == "xls":
+        return _iter_xls(path)
+    raise ValueError(f"Unsupported tabular file: {path}")
+
+
+def parse_number(value: Any) -> float | None:
+    """Return the numeric value of a cell, if it has one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if _THOUSANDS_RE.match(text):
+            text = text.replace(",", "")
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    return None
+
+
+def is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def format_cell(value: Any) -> str:
+    """Format a cell value for a markdown table."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def markdown_row(values: list) -> str:
+    return "| " + " | ".join(format_cell(value) for value in values) + " |"
+
+
+def markdown_table(header: list, rows: list[list]) -> str:
+    lines = [markdown_row(header), "|" + "---|" * len(header)]
+    lines.extend(markdown_row(row) for row in rows)
+    return "\n".join(lines)
+
+
+class ColumnStats:
+    """Summary statistics of a column, computed in a single pass."""
+
+    # Distinct values are only counted up to this number
+    MAX_DISTINCT = 1000
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.missing = 0
+        self.numbers = 0
+        self.dates = 0
+        self.total = 0.0
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+        self._distinct: set = set()
+
+    def add(self, value: Any) -> None:
+        if is_empty(value):
+            self.missing += 1
+            return
+        self.count += 1
+        if len(self._distinct) < self.MAX_DISTINCT:
+            self._distinct.add(value)
+        if isinstance(value, (datetime.date, datetime.time)):
+            self.dates += 1
+            return
+        number = parse_number(value)
+        if number is None:
+            return
+        self.numbers += 1
+        self.total += number
+        if self.minimum is None or number < self.minimum:
+            self.minimum = number
+        if self.maximum is None or number > self.maximum:
+            self.maximum = number
+
+    @property
+    def distinct(self) -> str:
+        if len(self._distinct) >= self.MAX_DISTINCT:
+            return f">={self.MAX_DISTINCT}"
+        return str(len(self._distinct))
+
+    @property
+    def type(self) -> str:
+        if self.count == 0:
+            return "empty"
+        if self.numbers == self.count:
+            return "number"
+        if self.dates == self.count:
+            return "date"
+        if self.numbers or self.dates:
+            return "mixed"
+        return "text"
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.numbers if self.numbers else None
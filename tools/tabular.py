@@ -0,0 +1,290 @@
+"""SQL queries over tabular files (CSV, TSV, Excel).
+
+A tabular file is loaded once into an indexed SQLite database, which is cached in the
+workspace under the hash of the file. Later queries on the same file, even from
+another question, only open the database instead of parsing the file again.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable
+
+from langchain_core.tools import tool
+
+import settings
+from .tables import iter_sheets, markdown_table, parse_number
+from .workspace import workspace
+
+# Columns are indexed up to this number, to bound the loading time of wide sheets
+MAX_INDEXED_COLUMNS = 32
+INSERT_BATCH_SIZE = 10_000
+# The progress handler is called every this number of SQLite virtual machine steps
+PROGRESS_STEPS = 10_000
+
+_NUMBER_START = set("0123456789+-.")
+# Integers with leading zeros (e.g. zip codes, identifiers) are kept as text
+_LEADING_ZERO_RE = re.compile(r"^[-+]?0\d")
+
+_SQL_TYPES = {int: "integer", float: "real", str: "text"}
+
+# Table describing the columns of the other tables, filled when loading the file
+COLUMNS_TABLE = "_columns"
+
+# Serializes the loading of the files, so that a file is only loaded once
+_load_lock = threading.Lock()
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query runs longer than the timeout."""
+
+
+def _table_name(name: str, used: set[str]) -> str:
+    table = re.sub(r"\W+", "_", name.strip()).strip("_").lower() or "sheet"
+    if table[0].isdigit():
+        table = "sheet_" + table
+    while table in used:
+        table += "_"
+    used.add(table)
+    return table
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _sql_value(value: Any) -> Any:
+    """Convert a cell to the value stored in the database."""
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if (
+            text[0] not in _NUMBER_START
+            or not (text[-1].isdigit() or text[-1] == ".")
+            or "_" in text
+            or _LEADING_ZERO_RE.match(text)
+        ):
+            return text
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        if "," not in text:
+            try:
+                return float(text)
+            except ValueError:
+                return text
+        number = parse_number(text)
+        if number is None:
+            return text
+        return int(number) if number.is_integer() and "." not in text else number
+    if value is None or isinstance(value, (int, float)):
+        return int(value) if isinstance(value, bool) else value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _batches(
+    rows: Iterable[list], column_types: list[set[type]]
+) -> Iterable[list[list]]:
+    """Convert the rows in batches, collecting the types of the values of each column."""
+    nb_columns = len(column_types)
+    batch = []
+    for row in rows:
+        values = [_sql_value(value) for value in row[:nb_columns]]
+        if all(value is None for value in values):
+            continue
+        values += [None] * (nb_columns - len(values))
+        batch.append(values)
+        if len(batch) == INSERT_BATCH_SIZE:
+            _add_types(column_types, batch)
+            yield batch
+            batch = []
+    if batch:
+        _add_types(column_types, batch)
+        yield batch
+
+
+def _add_types(column_types: list[set[type]], batch: list[list]) -> None:
+    for types, column in zip(column_types, zip(*batch)):
+        types.update(map(type, column))
+
+
+def _type_names(types: set[type]) -> str:
+    return ", ".join(sorted(_SQL_TYPES[t] for t in types if t in _SQL_TYPES)) or "null"
+
+
+def _build_database(file_path: str, db_path: str) -> None:
+    """Load all the sheets of a tabular file into a SQLite database."""
+    extension = os.path.splitext(file_path)[1].lower()
+    connection = sqlite3.connect(db_path)
+    try:
+        # The database is a cache that can be rebuilt: no need for a journal
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        used_names: set[str] = set()
+        with connection:
+            connection.execute(
+                f"CREATE TABLE {COLUMNS_TABLE} "
+                "(table_name TEXT, column_name TEXT, types TEXT)"
+            )
+            for sheet in iter_sheets(file_path):
+                # CSV and TSV files have a single sheet, named after the file
+                name = "data" if extension in (".csv", ".tsv") else sheet.name
+                table_name = _table_name(name, used_names)
+                table = _quote(table_name)
+                columns = [_quote(column) for column in sheet.header]
+                connection.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+                insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+                column_types: list[set[type]] = [set() for _ in columns]
+                for batch in _batches(sheet.rows, column_types):
+                    connection.executemany(insert, batch)
+                connection.executemany(
+                    f"INSERT INTO {COLUMNS_TABLE} VALUES (?, ?, ?)",
+                    [
+                        (table_name, column, _type_names(types))
+                        for column, types in zip(sheet.header, column_types)
+                    ],
+                )
+                for i, column in enumerate(columns[:MAX_INDEXED_COLUMNS]):
+                    index = _quote(f"{table_name}_{i}")
+                    connection.execute(f"CREATE INDEX {index} ON {table} ({column})")
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+
+def load_database(file_path: str) -> str:
+    """Return the path to the SQLite database of a tabular file, loading it if needed.
+
+    Args:
+        file_path (str): Path to a CSV, TSV or Excel file.
+
+    Returns:
+        str: The path to the database, in the workspace.
+    """
+    key = f"sqlite://{workspace.file_hash(file_path)}"
+    with _load_lock:
+        db_path = workspace.lookup(key)
+        if db_path is not None:
+            return db_path
+
+        start_time = time.perf_counter()
+        tmp_path = workspace.new_blob_path(".sqlite")
+        try:
+            # SQLite creates a new database in the empty file
+            _build_database(file_path, tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        db_path = workspace.store_file(key, tmp_path, ".sqlite")
+        print(
+            f"Loaded {file_path} into {db_path} "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
+        return db_path
+
+
+def _connect_read_only(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    connection.execute("PRAGMA query_only = ON")
+    return connection
+
+
+def describe_database(db_path: str) -> str:
+    """Describe the tables of a database: columns, types and number of rows."""
+    connection = _connect_read_only(db_path)
+    try:
+        columns: dict[str, list[list[str]]] = {}
+        for table, column, types in connection.execute(
+            f"SELECT table_name, column_name, types FROM {COLUMNS_TABLE} ORDER BY rowid"
+        ):
+            columns.setdefault(table, []).append([column, types])
+        sections = []
+        for table, table_columns in columns.items():
+            (nb_rows,) = connection.execute(
+                f"SELECT COUNT(*) FROM {_quote(table)}"
+            ).fetchone()
+            sections.append(
+                f"## Table: {table}\nRows: {nb_rows}\n\n"
+                + markdown_table(["Column", "Types"], table_columns)
+            )
+        return "\n\n".join(sections)
+    finally:
+        connection.close()
+
+
+def run_query(
+    db_path: str,
+    sql: str,
+    max_rows: int = settings.TABULAR_MAX_ROWS,
+    timeout_s: float = settings.TABULAR_QUERY_TIMEOUT_S,
+) -> str:
+    """Run a read-only SQL query on a database.
+
+    Args:
+        db_path (str): Path to the database.
+        sql (str): The SQL query.
+        max_rows (int, optional): Maximum number of rows returned.
+        timeout_s (float, optional): Maximum duration of the query.
+
+    Raises:
+        QueryTimeoutError: If the query runs longer than timeout_s.
+
+    Returns:
+        str: The result of the query, as a markdown table.
+    """
+    connection = _connect_read_only(db_path)
+    deadline = time.monotonic() + timeout_s
+    # Returning a non-zero value interrupts the query
+    connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+    try:
+        cursor = connection.execute(sql)
+        if cursor.description is None:
+            return "The query did not return any rows."
+        header = [column[0] for column in cursor.description]
+        rows = cursor.fetchmany(max_rows + 1)
+    except sqlite3.OperationalError as e:
+        if str(e) == "interrupted":
+            raise QueryTimeoutError(
+                f"The query took more than {timeout_s} seconds"
+            ) from e
+        raise
+    finally:
+        connection.close()
+
+    result = markdown_table(header, rows[:max_rows])
+    if len(rows) > max_rows:
+        result += f"\n\nOnly the first {max_rows} rows are shown."
+    return result
+
+
+@tool
+def query_table(file_path: str, sql: str | None = None) -> str:
+    """Run a SQL (SQLite) query on a spreadsheet or CSV file.
+
+    The file is loaded into a SQLite database: CSV and TSV files in a table named
+    `data`, Excel files in one table per sheet, named after the sheet in lowercase.
+    Column names are those of the header row, quote them with double quotes.
+    Call this tool without a query first to get the tables and their columns.
+
+    Args:
+        file_path (str): Path to a .csv, .tsv, .xlsx, .xlsm or .xls file.
+        sql (str | None, optional): A read-only SQL query. Defaults to None, to
+            describe the tables.
+
+    Returns:
+        str: The result of the query, or the description of the tables.
+    """
+    try:
+        db_path = load_database(file_path)
+        if not sql:
+            return describe_database(db_path)
+        return run_query(db_path, sql)
+    except (sqlite3.Error, QueryTimeoutError, ValueError) as e:
+        return f"The query failed: {e}"
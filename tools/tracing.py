@@ -0,0 +1,151 @@
+"""Timeline of a run, exported in the Chrome trace event format.
+
+When started, the tracer records spans for the questions, the LLM and tool calls, the
+downloads, the document conversions and the browser navigations. The trace can be
+opened offline in Perfetto (https://ui.perfetto.dev) or chrome://tracing, to see the
+idle gaps, the serialization points and the stragglers of a run.
+
+Spans are tagged with the task_id and the level of the question they belong to.
+Spans measured on a thread are shown on the track of the thread. Spans whose start
+and end are reported by callbacks, possibly on different threads (the LLM and tool
+calls), are shown on tracks of their own.
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any
+
+# Tags of the spans of the current question
+_question_tags: contextvars.ContextVar[dict[str, Any]] = contextvars.ContextVar(
+    "question_tags", default={}
+)
+
+
+class Tracer:
+    """Recorder of trace events, disabled until `start` is called."""
+
+    def __init__(self):
+        self.enabled = False
+        self._events: list[dict] = []
+        self._thread_names: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._start_time = 0.0
+
+    def start(self) -> None:
+        """Start recording, dropping the events recorded so far."""
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+            self._start_time = time.perf_counter()
+            self.enabled = True
+
+    def _timestamp_us(self, perf_time: float | None = None) -> float:
+        if perf_time is None:
+            perf_time = time.perf_counter()
+        return round((perf_time - self._start_time) * 1e6, 1)
+
+    def _add(self, event: dict) -> None:
+        thread = threading.current_thread()
+        event.update(pid=os.getpid(), tid=thread.ident)
+        with self._lock:
+            self._thread_names.setdefault(thread.ident, thread.name)
+            self._events.append(event)
+
+    def tags(self) -> dict[str, Any]:
+        """Return the tags of the current question."""
+        return _question_tags.get()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any):
+        """Record the code run in the block as a span on the current thread."""
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": self._timestamp_us(start_time),
+                    "dur": round((time.perf_counter() - start_time) * 1e6, 1),
+                    "args": {**self.tags(), **args},
+                }
+            )
+
+    @contextlib.contextmanager
+    def question(self, task_id: str, level: int):
+        """Record a question, and tag the spans recorded while answering it."""
+        token = _question_tags.set({"task_id": task_id, "level": level})
+        try:
+            with self.span(f"question {task_id}", "question"):
+                yield
+        finally:
+            _question_tags.reset(token)
+
+    def begin(self, name: str, category: str, **args: Any) -> int | None:
+        """Start a span that may end on another thread.
+
+        Returns:
+            int | None: The id of the span, to pass to `end`, or None if disabled.
+        """
+        if not self.enabled:
+            return None
+        span_id = next(self._ids)
+        self._add(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "b",
+                "id": span_id,
+                "ts": self._timestamp_us(),
+                "args": args,
+            }
+        )
+        return span_id
+
+    def end(self, span_id: int | None, name: str, category: str, **args: Any) -> None:
+        """End a span started with `begin`."""
+        if span_id is None or not self.enabled:
+            return
+        self._add(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "e",
+                "id": span_id,
+                "ts": self._timestamp_us(),
+                "args": args,
+            }
+        )
+
+    def save(self, path: str) -> None:
+        """Write the events recorded since `start` to a JSON trace file."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in thread_names.items()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        print(f"Trace of {len(events)} events saved to {path}")
+
+
+tracer = Tracer()
@@ -0,0 +1,282 @@
+"""Transcription of long audio and video files, in chunks transcribed concurrently.
+
+A long file is split with ffmpeg at silences, so that no word is cut, into chunks of
+roughly equal duration: as many as the concurrency allows, so that the transcription
+takes about the time of the longest chunk. The chunks are downmixed to a compact mono
+MP3, which keeps them under the size limit of the transcription API. The segments of
+each chunk are then shifted by the start time of the chunk.
+
+Short files are transcribed in one request, as are all files when ffmpeg is not
+installed.
+
+The transcripts are kept in the workspace by the transcript store, so that a video is
+only transcribed once.
+"""
+
+import dataclasses
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import settings
+from .workspace import workspace
+
+# Size limit of the files sent to the transcription API
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Encoding of the chunks: mono 16 kHz MP3 at 64 kbit/s is about 29 MB per hour, and
+# is enough for speech recognition
+CHUNK_ENCODING = [
+    "-vn",
+    "-ac",
+    "1",
+    "-ar",
+    "16000",
+    "-c:a",
+    "libmp3lame",
+    "-b:a",
+    "64k",
+]
+
+# What ffmpeg considers a silence, and the minimum duration of a silence
+SILENCE_NOISE = "-35dB"
+SILENCE_MIN_DURATION_S = 0.4
+
+# Chunks end at the silence closest to their target end, within this fraction of
+# their target duration
+CUT_TOLERANCE = 0.25
+
+DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+SILENCE_PATTERN = re.compile(r"silence_(start|end): (-?\d+(?:\.\d+)?)")
+
+
+@dataclasses.dataclass
+class Segment:
+    """A transcribed segment, with its start and end times in seconds."""
+
+    start: float
+    end: float
+    text: str
+
+
+@dataclasses.dataclass
+class Transcript:
+    """A transcript as plain text and as subtitles, and the source that produced it."""
+
+    text: str
+    srt: str
+    # "youtube_captions" or "whisper"
+    source: str
+    title: str | None = None
+
+
+class TranscriptStore:
+    """Transcripts stored in the workspace, and kept across runs.
+
+    They are pinned in the workspace, so that its quota never evicts them: a
+    transcript costs far more to produce again than a download.
+
+    The transcripts are stored under keys such as "youtube:<video id>" for YouTube
+    videos, "sha256:<content hash>" for media files, or "url:<url>" for media
+    downloaded from a URL, so that they can be found before any download.
+    """
+
+    def get(self, key: str) -> Transcript | None:
+        path = workspace.lookup(f"transcript://{key}")
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return Transcript(**json.load(f))
+
+    def put(self, keys: list[str], transcript: Transcript) -> None:
+        """Store a transcript under one or more keys."""
+        content = json.dumps(dataclasses.asdict(transcript)).encode("utf-8")
+        for key in keys:
+            workspace.store(
+                f"transcript://{key}", [content], extension=".json", pinned=True
+            )
+
+
+transcript_store = TranscriptStore()
+
+
+def has_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def _run_ffmpeg(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def detect_silences(path: str) -> tuple[float, list[tuple[float, float]]]:
+    """Find the silences of a media file, in a single decoding pass.
+
+    Returns:
+        tuple[float, list[tuple[float, float]]]: The duration of the file, and the
+            start and end times of its silences, in seconds.
+    """
+    process = _run_ffmpeg(
+        "-i",
+        path,
+        "-vn",
+        "-af",
+        f"silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_DURATION_S}",
+        "-f",
+        "null",
+        "-",
+    )
+    match = DURATION_PATTERN.search(process.stderr)
+    if match is None:
+        raise ValueError(f"Could not read the duration of {path}")
+    hours, minutes, seconds = match.groups()
+    duration_s = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    start = None
+    for kind, time_s in SILENCE_PATTERN.findall(process.stderr):
+        if kind == "start":
+            start = max(0.0, float(time_s))
+        elif start is not None:
+            silences.append((start, float(time_s)))
+            start = None
+    if start is not None:
+        # The file ends with a silence
+        silences.append((start, duration_s))
+    return duration_s, silences
+
+
+def plan_chunks(
+    duration_s: float,
+    silences: list[tuple[float, float]],
+    nb_chunks: int,
+    max_chunk_s: float = settings.TRANSCRIPTION_CHUNK_MAX_S,
+) -> list[tuple[float, float]]:
+    """Split a file into chunks of about equal duration, cut in the middle of silences.
+
+    Args:
+        duration_s (float): The duration of the file.
+        silences (list[tuple[float, float]]): The start and end times of its silences.
+        nb_chunks (int): The number of chunks wanted.
+        max_chunk_s (float, optional): The maximum duration of a chunk, cut without
+            a silence if needed.
+
+    Returns:
+        list[tuple[float, float]]: The start and end times of the chunks.
+    """
+    target_s = min(duration_s / max(1, nb_chunks), max_chunk_s)
+    cuts = [(start + end) / 2 for start, end in silences]
+    chunks = []
+    start = 0.0
+    while duration_s - start > target_s * (1 + CUT_TOLERANCE):
+        target_end = start + target_s
+        candidates = [
+            cut
+            for cut in cuts
+            if abs(cut - target_end) <= target_s * CUT_TOLERANCE
+            and cut - start <= max_chunk_s
+        ]
+        end = min(candidates, key=lambda cut: abs(cut - target_end), default=None)
+        if end is None:
+            end = min(target_end, start + max_chunk_s)
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration_s))
+    return chunks
+
+
+def extract_chunk(path: str, start_s: float, end_s: float, output_path: str) -> None:
+    """Extract a chunk of a media file as a compact mono MP3."""
+    _run_ffmpeg(
+        # Seek before the input, which is fast and accurate when transcoding
+        "-ss",
+        f"{start_s:.3f}",
+        "-i",
+        path,
+        "-t",
+        f"{end_s - start_s:.3f}",
+        *CHUNK_ENCODING,
+        "-y",
+        output_path,
+    )
+
+
+def transcribe_media(
+    path: str,
+    transcribe_file: Callable[[str], list[Segment]],
+    max_workers: int = settings.TRANSCRIPTION_MAX_WORKERS,
+) -> list[Segment]:
+    """Transcribe a media file, in chunks transcribed concurrently if it is long.
+
+    Args:
+        path (str): The path to the audio or video file.
+        transcribe_file (Callable[[str], list[Segment]]): Transcribes a file that
+            fits in a single request.
+        max_workers (int, optional): The maximum number of concurrent requests.
+
+    Returns:
+        list[Segment]: The transcribed segments, with times relative to the file.
+    """
+    if not has_ffmpeg():
+        # Without ffmpeg, the file can only be sent as is
+        return transcribe_file(path)
+
+    duration_s, silences = detect_silences(path)
+    if (
+        duration_s <= settings.TRANSCRIPTION_CHUNK_MIN_S
+        and os.path.getsize(path) <= MAX_UPLOAD_BYTES
+    ):
+        return transcribe_file(path)
+
+    nb_chunks = max(
+        1, min(max_workers, int(duration_s // settings.TRANSCRIPTION_CHUNK_MIN_S))
+    )
+    chunks = plan_chunks(duration_s, silences, nb_chunks)
+    print(
+        f"Transcribing {path} ({duration_s:.0f}s) in {len(chunks)} chunks, "
+        f"{min(max_workers, len(chunks))} at a time"
+    )
+
+    with tempfile.TemporaryDirectory(dir=workspace.scratch_dir()) as folder:
+
+        def transcribe_chunk(index: int) -> list[Segment]:
+            start_s, end_s = chunks[index]
+            chunk_path = os.path.join(folder, f"chunk-{index:04d}.mp3")
+            extract_chunk(path, start_s, end_s, chunk_path)
+            segments = transcribe_file(chunk_path)
+            os.remove(chunk_path)
+            return [
+                Segment(
+                    start=segment.start + start_s,
+                    end=min(segment.end + start_s, end_s),
+                    text=segment.text,
+                )
+                for segment in segments
+            ]
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="transcription"
+        ) as executor:
+            results = list(executor.map(transcribe_chunk, range(len(chunks))))
+    return [segment for segments in results for segment in segments]
+
+
+def compress_audio(path: str, output_path: str) -> str:
+    """Downmix an audio file to a compact mono MP3, if ffmpeg is available.
+
+    Returns:
+        str: The path to the compressed file, or the original path.
+    """
+    if not has_ffmpeg():
+        return path
+    _run_ffmpeg("-i", path, *CHUNK_ENCODING, "-y", output_path)
+    return output_path
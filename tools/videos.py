@@ -1,22 +1,16 @@
+import dataclasses
 import logging
-import os
 import re
 from typing import Optional
 from datetime import timedelta
 import textwrap
 
 from langchain_core.tools import tool
-from youtube_transcript_api import (
-    YouTubeTranscriptApi,
-    TranscriptsDisabled,
-    NoTranscriptFound,
-)
-from yt_dlp import YoutubeDL
-from openai import OpenAI
-from openai.types.audio import TranscriptionSegment
-import requests
 
 import settings
+from .cassette import cassette
+from .transcription import Segment, Transcript, transcribe_media, transcript_store
+from .workspace import workspace
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +28,32 @@ def get_youtube_video_id(url: str) -> Optional[str]:
     return None
 
 
-def get_youtube_transcript(youtube_url: str) -> Optional[str]:
+def get_youtube_transcript(youtube_url: str) -> Optional[Transcript]:
     """Retrieve transcript from YouTube video if available."""
+    from youtube_transcript_api import (
+        YouTubeTranscriptApi,
+        TranscriptsDisabled,
+        NoTranscriptFound,
+    )
+
     video_id = get_youtube_video_id(youtube_url)
     if not video_id:
         return None
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return " ".join([item["text"] for item in transcript])
+        items = YouTubeTranscriptApi.get_transcript(video_id)
+        segments = [
+            Segment(
+                start=item["start"],
+                end=item["start"] + item["duration"],
+                text=item["text"],
+            )
+            for item in items
+        ]
+        return Transcript(
+            text=" ".join(segment.text for segment in segments),
+            srt=segments_to_srt(segments),
+            source="youtube_captions",
+        )
     except (TranscriptsDisabled, NoTranscriptFound):
         return None
     except Exception as e:
@@ -58,7 +70,7 @@ def sec_to_srt_time(seconds: float) -> str:
     return f"{hrs:02}:{mins:02}:{secs:02},{millis:03}"
 
 
-def segments_to_srt(segments: list[TranscriptionSegment], line_length: int = 42) -> str:
+def segments_to_srt(segments: list[Segment], line_length: int = 42) -> str:
     """segments = response.segments or result['segments']"""
     srt_lines = []
     for idx, seg in enumerate(segments, 1):
@@ -73,44 +85,33 @@ def segments_to_srt(segments: list[TranscriptionSegment], line_length: int = 42)
 
 
 def transcribe_video_with_whisper(
-    video_path_or_url: str, api_key: Optional[str] = None
-) -> Optional[str]:
+    file_path: str, api_key: Optional[str] = None
+) -> list[Segment]:
     """Transcribe video using OpenAI Whisper API."""
+    from openai import OpenAI
+
     api_key = api_key or settings.OPENAI_API_KEY
-    if video_path_or_url.startswith("http://") or video_path_or_url.startswith(
-        "https://"
-    ):
-        # Download video to temp file
-        import tempfile
-
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-            response = requests.get(video_path_or_url)
-            tmp.write(response.content)
-            tmp_path = tmp.name
-        file_path = tmp_path
-    else:
-        file_path = video_path_or_url
-    try:
-        with open(file_path, "rb") as f:
-            client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key)
+
+    def transcribe_file(path: str) -> list[Segment]:
+        with open(path, "rb") as f:
             transcript = client.audio.transcriptions.create(
                 model="whisper-1",
                 file=f,
                 response_format="verbose_json",
                 timestamp_granularities=["segment"],
             )
-            srt_text = segments_to_srt(transcript.segments)
-            return srt_text
-            # return (
-            #     transcript.text if hasattr(transcript, "text") else transcript["text"]
-            # )
+        return [
+            Segment(start=segment.start, end=segment.end, text=segment.text)
+            for segment in transcript.segments or []
+        ]
+
+    try:
+        # Long files are split in chunks transcribed concurrently
+        return transcribe_media(file_path, transcribe_file)
     except Exception as e:
         print(f"Whisper transcription error: {e}")
         raise e
-        return None
-    finally:
-        if video_path_or_url.startswith("http") and os.path.exists(file_path):
-            os.remove(file_path)
 
 
 def download_youtube_video(url: str) -> tuple[str, str]:
@@ -123,6 +124,17 @@ def download_youtube_video(url: str) -> tuple[str, str]:
         tuple[str, str]: Path to the downloaded video and the video title
 
     """
+    # yt-dlp has its own HTTP stack, so its downloads are recorded as files
+    return cassette.record_download(
+        f"yt-dlp:{url}",
+        lambda: _download_youtube_video(url),
+        workspace.scratch_dir(),
+    )
+
+
+def _download_youtube_video(url: str) -> tuple[str, str]:
+    from yt_dlp import YoutubeDL
+
     print(f"Downloading video from {url}...")
     ydl_opts = {
         "format": "bestaudio/best",  # choose best available audio
@@ -135,7 +147,7 @@ def download_youtube_video(url: str) -> tuple[str, str]:
             }
         ],
         "quiet": True,  # suppress verbose CLI output
-        "paths": {"home": "data"},
+        "paths": {"home": workspace.scratch_dir()},
         # "progress_hooks": [my_hook],      # optional: see § Progress hooks
     }
 
@@ -147,11 +159,23 @@ def download_youtube_video(url: str) -> tuple[str, str]:
         return filepath, title
 
 
+def format_transcript(transcript: Transcript) -> str:
+    """The transcript returned to the agent: captions as text, Whisper as SRT."""
+    content = transcript.srt if transcript.source == "whisper" else transcript.text
+    if transcript.title:
+        return f"Title: {transcript.title}\n\nTranscript: {content}"
+    return content
+
+
 def get_transcript(
     video_file_path: Optional[str] = None, video_url: Optional[str] = None
 ) -> str:
     """Obtain a transcript from a video file or URL.
 
+    The transcript store is checked before any download or transcription: by video
+    id for YouTube videos, by URL for other videos, and by content hash once the
+    media file is available.
+
     Args:
         video_file_path (Optional[str], optional): Path to a video file.
         video_url (Optional[str], optional): URL to a video.
@@ -167,24 +191,49 @@ def get_transcript(
     transcript = None
     title = None
 
+    video_id = None
     if video_url and ("youtube.com" in video_url or "youtu.be" in video_url):
+        video_id = get_youtube_video_id(video_url)
+    keys = []
+    if video_id:
+        keys.append(f"youtube:{video_id}")
+    elif video_url and not video_file_path:
+        keys.append(f"url:{video_url}")
+    for key in keys:
+        transcript = transcript_store.get(key)
+        if transcript is not None:
+            print(f"Transcript found in the store: {key} ({transcript.source})")
+            return format_transcript(transcript)
+
+    if video_id:
         print(f"Fetching transcript from YouTube URL: {video_url}")
         transcript = get_youtube_transcript(video_url)
         if transcript is None:
             # revert to downloading the video
             video_file_path, title = download_youtube_video(video_url)
-            video_url = None
+    elif not video_file_path:
+        # Download the video, or reuse it from the download cache
+        video_file_path = workspace.fetch(video_url, default_extension=".mp4")
 
-    path_or_url = video_file_path or video_url
-    print(f"Transcribing video: {path_or_url}")
-    transcript = transcribe_video_with_whisper(path_or_url)
     if transcript is None:
-        return "Failed to transcribe video with Whisper."
-
-    if title:
-        return f"Title: {title}\n\nTranscript: {transcript}"
-
-    return transcript
+        key = f"sha256:{workspace.file_hash(video_file_path)}"
+        keys.append(key)
+        transcript = transcript_store.get(key)
+        if transcript is not None:
+            print(f"Transcript found in the store: {key} ({transcript.source})")
+            if title and not transcript.title:
+                transcript = dataclasses.replace(transcript, title=title)
+        else:
+            print(f"Transcribing video: {video_file_path}")
+            segments = transcribe_video_with_whisper(video_file_path)
+            transcript = Transcript(
+                text=" ".join(segment.text.strip() for segment in segments),
+                srt=segments_to_srt(segments),
+                source="whisper",
+                title=title,
+            )
+    transcript_store.put(keys, transcript)
+    return format_transcript(transcript)
 
 
 @tool
@@ -232,7 +281,6 @@ def get_video_transcript(
     except Exception as e:
         print(f"Error analyzing video: {e}")
         raise e
-        return f"Error: {str(e)}"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+"""Managed workspace for the files downloaded and produced by the tools.
+
+The workspace has two parts:
+- a content-addressed download cache: each downloaded resource is stored once, under
+  the hash of its content, and indexed by URL with its ETag/Last-Modified validators so
+  that it can be revalidated with a conditional request instead of downloaded again.
+  A resource without validators is reused until its Cache-Control max-age, or a
+  default max age, has passed, and then downloaded again.
+  Files produced by the tools (e.g. extracted from archives) are indexed by a key in
+  the same store. The cache is kept under a disk quota by evicting the least recently
+  used blobs, except those used by the current question, whose paths the agent may
+  still hold, and those pinned when stored (e.g. transcripts, which are costly to
+  produce again).
+- per-question scratch folders, for files extracted or converted while answering a
+  question. They are removed when the question ends.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Iterable
+
+import settings
+from . import http_client
+
+# Prefix of the files being written to the blobs folder
+TMP_PREFIX = "tmp-"
+# Age after which such a file is considered left behind by a crashed process
+TMP_MAX_AGE_S = 24 * 3600
+
+
+def _max_age(cache_control: str | None) -> float | None:
+    """Return the max-age of a Cache-Control header, 0 if it must not be reused."""
+    for directive in (cache_control or "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name in ("no-cache", "no-store"):
+            return 0
+        if name == "max-age":
+            with contextlib.suppress(ValueError):
+                return max(0, int(value.strip('" ')))
+    return None
+
+
+class Workspace:
+    def __init__(
+        self,
+        root: str = settings.WORKSPACE_DIR,
+        max_bytes: int = settings.WORKSPACE_MAX_BYTES,
+        max_age_s: float = settings.WORKSPACE_MAX_AGE_S,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.scratch_root = os.path.join(root, "scratch")
+        self.index_path = os.path.join(root, "index.db")
+        self._scratch_dir: str | None = None
+        # Blobs returned during the current question, never evicted until it ends
+        self._question_blobs: set[str] = set()
+        # Hash of the local files, memoized by (path, size, modification time)
+        self._file_hashes: dict[tuple[str, int, float], str] = {}
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _init(self) -> None:
+        """Create the folders and the index on first use."""
+        if self._initialized:
+            return
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.scratch_root, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    pinned INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    blob TEXT NOT NULL REFERENCES blobs (name),
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS urls_blob ON urls (blob);
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(urls)")}
+            if "expires_at" not in columns:
+                # Index created before the expiry of the downloads without validators
+                connection.execute("ALTER TABLE urls ADD COLUMN expires_at REAL")
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(blobs)")}
+            if "pinned" not in columns:
+                # Index created before the blobs could be pinned
+                connection.execute(
+                    "ALTER TABLE blobs ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0"
+                )
+        self._remove_stale_tmp_files()
+        self._initialized = True
+
+    def _remove_stale_tmp_files(self) -> None:
+        now = time.time()
+        for entry in os.scandir(self.blobs_dir):
+            if entry.name.startswith(TMP_PREFIX):
+                with contextlib.suppress(OSError):
+                    if now - entry.stat().st_mtime > TMP_MAX_AGE_S:
+                        os.remove(entry.path)
+
+    def _new_tmp_file(self, extension: str = "") -> tuple[int, str]:
+        return tempfile.mkstemp(prefix=TMP_PREFIX, suffix=extension, dir=self.blobs_dir)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    # -----------------------------------------
+    # Download cache
+
+    def fetch(self, url: str, default_extension: str = "") -> str:
+        """Return the path to a local copy of a resource, downloading it if needed.
+
+        A cached copy is revalidated with the ETag/Last-Modified validators received
+        with it, when the server provided any. Otherwise, it is downloaded again once
+        expired.
+
+        Args:
+            url (str): The URL of the resource.
+            default_extension (str, optional): Extension used when none can be guessed.
+
+        Returns:
+            str: The path to the local copy, in the blob store.
+        """
+        entry = self._lookup(url)
+        headers = {}
+        if entry is not None:
+            blob, etag, last_modified, expires_at = entry
+            if not etag and not last_modified:
+                # Nothing to revalidate with: reuse the copy until it expires
+                if expires_at is not None and time.time() < expires_at:
+                    self._touch(blob)
+                    return self.blob_path(blob)
+                entry = None
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        with http_client.get(url, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                if entry is None:
+                    # Its empty body must not be stored as the resource
+                    raise ValueError(
+                        f"Unexpected 304 Not Modified for {url}, without a cached copy"
+                    )
+                self._touch(entry[0])
+                return self.blob_path(entry[0])
+            response.raise_for_status()
+            extension = (
+                http_client.guess_extension(url, response.headers.get("Content-Type"))
+                or default_extension
+            )
+            fd, tmp_path = self._new_tmp_file(extension)
+            os.close(fd)
+            try:
+                size, digest = http_client.write_response(response, tmp_path)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(tmp_path)
+                raise
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            max_age_s = _max_age(response.headers.get("Cache-Control"))
+
+        if max_age_s is None:
+            max_age_s = self.max_age_s
+        return self._add_blob(
+            url,
+            tmp_path,
+            size,
+            digest + extension,
+            etag,
+            last_modified,
+            time.time() + max_age_s,
+        )
+
+    def lookup(self, key: str) -> str | None:
+        """Return the path of the blob stored under a key, if any."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        self._touch(entry[0])
+        return self.blob_path(entry[0])
+
+    def store(
+        self,
+        key: str,
+        chunks: Iterable[bytes],
+        extension: str = "",
+        pinned: bool = False,
+    ) -> str:
+        """Store content produced by the tools (e.g. extracted files) in the blob store.
+
+        Args:
+            key (str): Key of the content, e.g. a pseudo-URL identifying its origin.
+            chunks (Iterable[bytes]): The content.
+            extension (str, optional): Extension of the stored file.
+            pinned (bool, optional): Whether the content is never evicted. It still
+                counts in the quota.
+
+        Returns:
+            str: The path to the stored file.
+        """
+        self._init()
+        fd, tmp_path = self._new_tmp_file(extension)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self._add_blob(
+            key, tmp_path, size, digest.hexdigest() + extension, pinned=pinned
+        )
+
+    def store_file(self, key: str, path: str, extension: str = "") -> str:
+        """Move a file produced by the tools (e.g. a database) to the blob store.
+
+        Args:
+            key (str): Key of the content, e.g. a pseudo-URL identifying its origin.
+            path (str): Path to the file, which must be in the blobs folder. It is
+                removed if it cannot be stored.
+            extension (str, optional): Extension of the stored file.
+
+        Returns:
+            str: The path to the stored file.
+        """
+        try:
+            return self._add_blob(
+                key, path, os.path.getsize(path), self.file_hash(path) + extension
+            )
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            raise
+
+    def file_hash(self, path: str) -> str:
+        """Return the SHA-256 hex digest of a local file."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        if key not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._file_hashes[key] = digest.hexdigest()
+        return self._file_hashes[key]
+
+    def new_blob_path(self, extension: str = "") -> str:
+        """Return the path of a new temporary file in the blobs folder.
+
+        The file is meant to be moved to the blob store with `store_file`, or
+        removed by the caller if it cannot be written. Files left behind by a crashed
+        process are removed after a day.
+        """
+        self._init()
+        fd, path = self._new_tmp_file(extension)
+        os.close(fd)
+        return path
+
+    def _lookup(
+        self, key: str
+    ) -> tuple[str, str | None, str | None, float | None] | None:
+        with self._lock:
+            self._init()
+            with self._connect() as connection:
+                entry = connection.execute(
+                    "SELECT blob, etag, last_modified, expires_at FROM urls "
+                    "WHERE url = ?",
+                    (key,),
+                ).fetchone()
+        if entry is None or not os.path.exists(self.blob_path(entry[0])):
+            return None
+        return entry
+
+    def _add_blob(
+        self,
+        key: str,
+        tmp_path: str,
+        size: int,
+        blob: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        expires_at: float | None = None,
+        pinned: bool = False,
+    ) -> str:
+        """Move a file to the blob store, index it under a key and enforce the quota."""
+        with self._lock:
+            if os.path.exists(self.blob_path(blob)):
+                # Same content already stored under another key
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.blob_path(blob))
+            self._use(blob)
+            with self._connect() as connection:
+                # A blob stays pinned when its content is stored again under a key
+                # that is not
+                connection.execute(
+                    "INSERT INTO blobs (name, size, last_access, pinned) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+                    "size = excluded.size, last_access = excluded.last_access, "
+                    "pinned = MAX(pinned, excluded.pinned)",
+                    (blob, size, time.time(), int(pinned)),
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO urls (url, blob, etag, last_modified, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, etag, last_modified, expires_at),
+                )
+            self._enforce_quota()
+        return self.blob_path(blob)
+
+    def blob_path(self, blob: str) -> str:
+        return os.path.join(self.blobs_dir, blob)
+
+    def _use(self, blob: str) -> None:
+        if self._scratch_dir is not None:
+            self._question_blobs.add(blob)
+
+    def _touch(self, blob: str) -> None:
+        with self._lock, self._connect() as connection:
+            self._use(blob)
+            connection.execute(
+                "UPDATE blobs SET last_access = ? WHERE name = ?", (time.time(), blob)
+            )
+
+    def _enforce_quota(self) -> None:
+        """Evict the least recently used blobs until the cache fits in its quota.
+
+        The blobs used by the current question are kept, even over the quota, since
+        the agent may still open them, and so are the pinned blobs.
+        """
+        with self._connect() as connection:
+            (total_size,) = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+            if total_size <= self.max_bytes:
+                return
+            for name, size in connection.execute(
+                "SELECT name, size FROM blobs WHERE NOT pinned ORDER BY last_access"
+            ).fetchall():
+                if total_size <= self.max_bytes:
+                    break
+                if name in self._question_blobs:
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.blob_path(name))
+                connection.execute("DELETE FROM urls WHERE blob = ?", (name,))
+                connection.execute("DELETE FROM blobs WHERE name = ?", (name,))
+                total_size -= size
+
+    # -----------------------------------------
+    # Scratch folders
+
+    def begin_question(self, name: str | None = None) -> str:
+        """Create the scratch folder of a new question.
+
+        Returns:
+            str: The path to the scratch folder.
+        """
+        self.end_question()
+        self._init()
+        self._scratch_dir = os.path.join(self.scratch_root, name or uuid.uuid4().hex)
+        os.makedirs(self._scratch_dir, exist_ok=True)
+        return self._scratch_dir
+
+    def end_question(self) -> None:
+        """Remove the scratch folder of the current question, and unpin its blobs."""
+        if self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+        with self._lock:
+            self._question_blobs = set()
+
+    def scratch_dir(self) -> str:
+        """Return the scratch folder of the current question, creating one if needed."""
+        if self._scratch_dir is None:
+            return self.begin_question()
+        return self._scratch_dir
+
+
+workspace = Workspace()
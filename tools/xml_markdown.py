@@ -0,0 +1,217 @@
+"""Streaming conversion of XML files to markdown.
+
+The file is parsed with iterparse, and each element is removed from the tree once it
+has been converted, so that the memory used does not grow with the size of the file.
+The conversion stops as soon as the output reaches a character budget.
+
+Three kinds of documents are handled:
+- WordML (Word 2003 XML) documents: the text of each paragraph.
+- record-style XML, where an element is repeated with flat fields (e.g. the rows of
+  an export, or the tr of an HTML-like table): a compact markdown table, and the
+  text of the other elements, e.g. the title of the collection.
+- any other XML: the text of each element, prefixed by its tag.
+"""
+
+import collections
+import itertools
+import xml.etree.ElementTree as ET
+from typing import Iterator
+
+import settings
+from .tables import markdown_row
+
+WORDML_NAMESPACE = "http://schemas.microsoft.com/office/word/2003/wordml"
+WORDML_PARAGRAPH = f"{{{WORDML_NAMESPACE}}}p"
+WORDML_TEXT = f"{{{WORDML_NAMESPACE}}}t"
+
+# Number of elements read before choosing the record element and the columns
+SNIFF_ELEMENTS = 2000
+
+# An ended element, with its parent and its depth (0 for the root)
+Event = tuple[ET.Element, ET.Element | None, int]
+
+
+def local_name(tag: str) -> str:
+    """Remove the namespace from a tag or attribute name."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_events(path: str) -> Iterator[tuple[str, Event]]:
+    """Parse a file, yielding the root element when it starts, then the ended elements."""
+    stack: list[ET.Element] = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if not stack:
+                yield "root", (element, None, 0)
+            stack.append(element)
+        else:
+            stack.pop()
+            yield "end", (element, stack[-1] if stack else None, len(stack))
+
+
+def _release(element: ET.Element, parent: ET.Element | None) -> None:
+    """Remove a converted element from the tree.
+
+    Its previous siblings have already been removed, so this is a constant time
+    operation.
+    """
+    element.clear()
+    if parent is not None:
+        parent.remove(element)
+
+
+def _is_flat(element: ET.Element) -> bool:
+    """Whether an element has fields: leaf children, or only attributes."""
+    if len(element):
+        return all(len(child) == 0 for child in element)
+    return bool(element.attrib)
+
+
+def _text(element: ET.Element) -> str:
+    return " ".join((element.text or "").split())
+
+
+def _fields(element: ET.Element) -> dict[str, str]:
+    """The attributes and leaf children of a record element, by name."""
+    fields = {local_name(name): value for name, value in element.attrib.items()}
+    children: dict[str, list[str]] = {}
+    for child in element:
+        children.setdefault(local_name(child.tag), []).append(_text(child))
+    for name, values in children.items():
+        fields["@" + name if name in fields else name] = "; ".join(values)
+    return fields
+
+
+def _wordml_lines(events: Iterator[Event]) -> Iterator[str]:
+    for element, parent, _ in events:
+        if element.tag == WORDML_PARAGRAPH:
+            text = "".join(t.text or "" for t in element.iter(WORDML_TEXT))
+            if text.strip():
+                yield text
+            _release(element, parent)
+
+
+def _text_lines(events: Iterator[Event]) -> Iterator[str]:
+    for element, parent, _ in events:
+        text = _text(element)
+        if text:
+            yield f"{local_name(element.tag)}: {text}"
+        _release(element, parent)
+
+
+def _record_lines(events: Iterator[Event]) -> Iterator[str]:
+    # Read the beginning of the file to find the repeated flat element
+    buffered = list(itertools.islice(events, SNIFF_ELEMENTS))
+    counts = collections.Counter(
+        (depth, element.tag)
+        for element, _, depth in buffered
+        if depth > 0 and _is_flat(element)
+    )
+    candidates = [key for key, count in counts.items() if count >= 2]
+    if not candidates:
+        yield from _text_lines(itertools.chain(buffered, events))
+        return
+    # The most repeated element, the shallowest one in case of a tie
+    record_depth, record_tag = max(candidates, key=lambda key: (counts[key], -key[0]))
+    records = [
+        element
+        for element, _, depth in buffered
+        if depth == record_depth and element.tag == record_tag
+    ]
+
+    # HTML-like rows (tr/td) have cells with the same tag: their columns are
+    # positional. Records with a single field are named after it instead.
+    positional = all(
+        len(record) and len({child.tag for child in record}) == 1 for record in records
+    ) and any(len(record) > 1 for record in records)
+    header_row = None
+    if positional:
+        header_row = next(
+            (
+                element
+                for element, _, _ in buffered
+                if len(element)
+                and all(local_name(child.tag) == "th" for child in element)
+            ),
+            None,
+        )
+        if header_row is not None:
+            header = [_text(cell) for cell in header_row]
+        else:
+            nb_columns = max(len(record) for record in records)
+            header = [f"column_{i + 1}" for i in range(nb_columns)]
+    else:
+        header = list(dict.fromkeys(name for r in records for name in _fields(r)))
+
+    in_table = False
+    for element, parent, depth in itertools.chain(buffered, events):
+        if depth > record_depth:
+            # Part of a record, converted with it, or of another element, whose
+            # descendants are converted with it
+            continue
+        if depth == record_depth and element.tag == record_tag:
+            if not in_table:
+                yield f"## {local_name(record_tag)} records"
+                yield markdown_row(header)
+                yield "|" + "---|" * len(header)
+                in_table = True
+            if element is header_row:
+                pass
+            elif positional:
+                cells = [_text(cell) for cell in element]
+                yield markdown_row(cells + [""] * (len(header) - len(cells)))
+            else:
+                fields = _fields(element)
+                yield markdown_row([fields.get(name) for name in header])
+        else:
+            # Keep the context around the records, e.g. the title of a catalog or
+            # the metadata of an RSS channel, as in _text_lines
+            lines = [
+                f"{local_name(node.tag)}: {text}"
+                for node in element.iter()
+                if (text := _text(node))
+            ]
+            if lines and in_table:
+                yield ""
+                in_table = False
+            yield from lines
+        _release(element, parent)
+
+
+def iter_xml_lines(path: str) -> Iterator[str]:
+    """Convert an XML file to lines of markdown, reading it as they are consumed."""
+    events = _iter_events(path)
+    first = next(events, None)
+    if first is None:
+        return
+    root = first[1][0]
+    ended = (event for _, event in events)
+    if root.tag == f"{{{WORDML_NAMESPACE}}}wordDocument":
+        yield from _wordml_lines(ended)
+    else:
+        yield from _record_lines(ended)
+
+
+def xml_to_markdown(path: str, max_chars: int | None = settings.XML_MAX_CHARS) -> str:
+    """Convert an XML file to markdown, within a character budget.
+
+    Args:
+        path (str): Path to the XML file.
+        max_chars (int | None, optional): Maximum size of the output. The rest of
+            the file is not parsed. None to convert the whole file.
+
+    Returns:
+        str: The markdown content.
+    """
+    lines = []
+    nb_chars = 0
+    lines_iterator = iter_xml_lines(path)
+    for line in lines_iterator:
+        nb_chars += len(line) + 1
+        if max_chars is not None and nb_chars > max_chars:
+            lines.append(f"...TRUNCATED after {max_chars} characters")
+            break
+        lines.append(line)
+    # Stop parsing, and close the file
+    lines_iterator.close()
+    return "\n".join(lines)